@@ -1,11 +1,12 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
-from django.core.cache import cache
+
+from .revocation import RevocationFilter
 
 class SecureJWTAuthentication(JWTAuthentication):
     """
     Extends JWT Authentication to support:
-    1. Forceful Logout (Revocation via Redis Blocklist)
+    1. Forceful Logout (Revocation via Redis Blocklist, prefiltered per process)
     2. Device Locking (Optional future scope)
     """
     def get_validated_token(self, raw_token):
@@ -15,7 +16,7 @@ class SecureJWTAuthentication(JWTAuthentication):
             raise InvalidToken("Token is invalid or expired")
 
         jti = validated_token.get('jti')
-        if jti and cache.get(f"blocklist:{jti}"):
+        if jti and RevocationFilter.is_revoked(jti):
             raise AuthenticationFailed("This session has been logged out.")
-            
-        return validated_token
\ No newline at end of file
+
+        return validated_token
@@ -0,0 +1,175 @@
+"""
+Revoked JWT ids, checked per request without a Redis round trip.
+
+LogoutAPIView writes `blocklist:{jti}` (the authoritative marker, in the cache)
+and appends the jti to a revocation log in Redis:
+
+- {revoked_jti}:seq   counter, bumped once per revocation
+- {revoked_jti}:log   sorted set jti -> seq (what each process replays)
+- {revoked_jti}:exp   sorted set jti -> token exp (expired ids are pruned)
+
+Every process holds a Bloom filter of the logged ids. At most every
+REVOCATION_CHECK_INTERVAL seconds it reads the counter and pulls only the ids
+logged since its last sync. A jti that misses the filter is not revoked; a hit
+is confirmed with a GET of the marker (false positives cost one GET, never a
+rejected token). A logout therefore takes effect everywhere within
+REVOCATION_CHECK_INTERVAL seconds, and at once in the process that served it.
+If the log cannot be read, every check goes to the marker as before.
+"""
+import math
+import time
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.utils.pools import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SEQ_KEY = "{revoked_jti}:seq"
+LOG_KEY = "{revoked_jti}:log"
+EXP_KEY = "{revoked_jti}:exp"
+
+# KEYS: seq, log, exp
+# ARGV: jti, exp, now
+REVOKE_LUA = """
+local seq = redis.call("incr", KEYS[1])
+redis.call("zadd", KEYS[2], seq, ARGV[1])
+redis.call("zadd", KEYS[3], ARGV[2], ARGV[1])
+local expired = redis.call("zrangebyscore", KEYS[3], "-inf", ARGV[3], "LIMIT", 0, 100)
+if #expired > 0 then
+    redis.call("zrem", KEYS[2], unpack(expired))
+    redis.call("zrem", KEYS[3], unpack(expired))
+end
+return seq
+"""
+
+MIN_CAPACITY = 10_000
+ERROR_RATE = 0.001
+LOAD_PAGE = 10_000
+
+_lock = threading.Lock()
+_state = {"filter": None, "seq": 0, "checked_at": None, "built_at": None}
+_scripts = {}
+
+
+def marker_key(jti):
+    return f"blocklist:{jti}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; sized for `capacity` ids at `error_rate`."""
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+    @property
+    def full(self):
+        return self.count > self.capacity
+
+
+class RevocationFilter:
+
+    @staticmethod
+    def revoke(jti, exp):
+        """Marks `jti` revoked until `exp` (epoch seconds) and publishes it to every process."""
+        now = int(time.time())
+        ttl = int(exp - now)
+        if ttl <= 0:
+            return
+        cache.set(marker_key(jti), "true", timeout=ttl)
+
+        if not settings.REDIS_URL:
+            return
+        script = _scripts.get("revoke")
+        if script is None:
+            script = _scripts["revoke"] = get_redis_client().register_script(REVOKE_LUA)
+        # The marker is already set, so a process that has not synced yet still
+        # falls through to it once the jti reaches its filter
+        script(keys=[SEQ_KEY, LOG_KEY, EXP_KEY], args=[jti, int(exp), now])
+
+        with _lock:  # adds are read-modify-write on the bit array
+            bloom = _state["filter"]
+            if bloom is not None:
+                bloom.add(jti)
+
+    @staticmethod
+    def is_revoked(jti):
+        bloom = RevocationFilter._filter() if settings.REDIS_URL else None
+        if bloom is not None and jti not in bloom:
+            return False
+        return bool(cache.get(marker_key(jti)))
+
+    @staticmethod
+    def _filter():
+        """The synced filter, or None when the log cannot be read (callers check the marker)."""
+        now = time.monotonic()
+        checked_at = _state["checked_at"]
+        if checked_at is not None and now - checked_at < settings.REVOCATION_CHECK_INTERVAL:
+            return _state["filter"]
+
+        with _lock:
+            checked_at = _state["checked_at"]
+            if checked_at is not None and now - checked_at < settings.REVOCATION_CHECK_INTERVAL:
+                return _state["filter"]
+            try:
+                RevocationFilter._sync(get_redis_client(), now)
+            except Exception as e:
+                logger.warning(f"Revocation log unavailable, checking blocklist per request: {e}")
+                # Drop the filter so nothing is missed meanwhile; rebuilt on the next interval
+                _state.update(filter=None, seq=0, checked_at=now)
+                return None
+            return _state["filter"]
+
+    @staticmethod
+    def _sync(client, now):
+        seq = int(client.get(SEQ_KEY) or 0)
+        bloom, local_seq, built_at = _state["filter"], _state["seq"], _state["built_at"]
+
+        rebuild = (
+            bloom is None
+            or seq < local_seq  # counter lost (flush / failover)
+            or bloom.full
+            or now - built_at >= settings.REVOCATION_REBUILD_INTERVAL  # sheds pruned ids
+        )
+        if rebuild:
+            bloom = RevocationFilter._load(client)
+        elif seq > local_seq:
+            for jti in client.zrangebyscore(LOG_KEY, f"({local_seq}", seq):
+                bloom.add(jti)
+
+        _state.update(filter=bloom, seq=seq, checked_at=now)
+        if rebuild:
+            _state["built_at"] = now
+
+    @staticmethod
+    def _load(client):
+        total = client.zcard(LOG_KEY)
+        bloom = BloomFilter(max(MIN_CAPACITY, total * 2))
+        for start in range(0, total, LOAD_PAGE):
+            for jti in client.zrange(LOG_KEY, start, start + LOAD_PAGE - 1):
+                bloom.add(jti)
+        logger.info(f"Revocation filter built with {bloom.count} ids ({len(bloom.bits) // 1024} KiB)")
+        return bloom
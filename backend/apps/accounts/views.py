@@ -1,14 +1,12 @@
 import uuid
-import time
 import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.throttling import AnonRateThrottle
+from apps.utils.throttling import AnonRateThrottle
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
 from rest_framework_simplejwt.exceptions import TokenError
-from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -22,8 +20,10 @@ from .serializers import (
     PasswordResetConfirmSerializer
 )
 from .services import AccountService
+from .revocation import RevocationFilter
 from apps.notifications.services import OTPService 
 from .models import UserDevice 
+from apps.utils.pools import get_redis_client
 
 User = get_user_model()
 
@@ -91,7 +91,8 @@ class WebSocketTicketAPIView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
         ticket = str(uuid.uuid4())
-        cache.set(f"ws_ticket:{ticket}", request.user.id, timeout=30)
+        # Raw key (no cache prefix/pickling) so LiveTrackingConsumer can GETDEL it directly.
+        get_redis_client().set(f"ws_ticket:{ticket}", request.user.id, ex=30)
         return Response({"ticket": ticket})
 
 
@@ -106,16 +107,12 @@ class LogoutAPIView(APIView):
                     raw_token = parts[1]
                     try:
                         token = UntypedToken(raw_token)
-                        jti = token['jti']
-                        exp = token['exp']
-                        ttl = int(exp - time.time())
-                        if ttl > 0: cache.set(f"blocklist:{jti}", "true", timeout=ttl)
+                        RevocationFilter.revoke(token['jti'], token['exp'])
                     except TokenError: pass
             refresh_token = request.data.get("refresh")
             if refresh_token:
                 token = RefreshToken(refresh_token)
-                jti = token['jti']
-                cache.set(f"blocklist:{jti}", "true", timeout=86400 * 7)
+                RevocationFilter.revoke(token['jti'], token['exp'])
             return Response({"status": "logged_out"})
         except Exception:
             return Response({"error": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,16 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.throttling import UserRateThrottle
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.db.models import Q
 from apps.catalog.models import Product
 from apps.orders.models import Order
+from apps.utils.throttling import AIAssistantThrottle
 import urllib.parse
 
-class AIAssistantThrottle(UserRateThrottle):
-    scope = 'ai_assistant' 
-
 class AIShoppingAssistantView(APIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [AIAssistantThrottle]
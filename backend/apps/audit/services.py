@@ -1,21 +1,22 @@
 from django.utils import timezone
-from .models import AuditLog
+from .tasks import write_audit_logs
 
 class AuditService:
     """
     Centralized Audit Logging.
-    Writes immutable logs for compliance and debugging.
+    Writes immutable logs for compliance and debugging. Rows are queued after
+    the caller's transaction commits and bulk-inserted by write_audit_logs.
     """
 
     @staticmethod
     def log(action, reference_id, user, metadata):
-        AuditLog.objects.create(
-            user=user,
-            action=action,
-            reference_id=reference_id,
-            metadata=metadata,
-            created_at=timezone.now()
-        )
+        write_audit_logs.enqueue({
+            "user_id": user.pk if user is not None else None,
+            "action": action,
+            "reference_id": str(reference_id),
+            "metadata": metadata,
+            "created_at": timezone.now(),
+        })
 
     @staticmethod
     def order_created(order):
@@ -0,0 +1,27 @@
+import logging
+from celery import shared_task
+from django.utils.dateparse import parse_datetime
+
+from apps.utils.batching import BatchTask
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(base=BatchTask, stream="batch:audit", batch_size=1000)
+def write_audit_logs(payloads):
+    """
+    Batch consumer for AuditService.log: one INSERT per batch. created_at is
+    the time of the audited action, not of the write.
+    """
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            user_id=payload["user_id"],
+            action=payload["action"],
+            reference_id=payload["reference_id"],
+            metadata=payload["metadata"],
+            created_at=parse_datetime(payload["created_at"]),
+        )
+        for payload in payloads
+    ])
+    logger.info(f"Wrote {len(payloads)} audit logs")
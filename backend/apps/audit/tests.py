@@ -0,0 +1,19 @@
+from unittest import mock
+
+import redis
+from django.test import TestCase
+
+from .models import AuditLog
+from .services import AuditService
+
+
+class AuditBatchFallbackTests(TestCase):
+    def test_logs_written_inline_when_redis_is_down(self):
+        with mock.patch("apps.utils.batching.get_redis_client", side_effect=redis.ConnectionError("down")):
+            with self.captureOnCommitCallbacks(execute=True):
+                AuditService.log("order_created", 42, None, {"total": "100.00"})
+
+        log = AuditLog.objects.get(reference_id="42")
+        self.assertEqual(log.action, "order_created")
+        self.assertEqual(log.metadata, {"total": "100.00"})
+        self.assertIsNotNone(log.created_at)
@@ -15,6 +15,7 @@ class AuditLogListAPIView(APIView):
     """
     permission_classes = [IsAdminUser]
     pagination_class = AuditPagination
+    use_read_replica = True
 
     def get(self, request):
         qs = AuditLog.objects.select_related('user').all().order_by("-created_at")
@@ -8,6 +8,7 @@ from django.db.models.functions import Concat
 from import_export import resources, fields, widgets
 from import_export.admin import ImportExportModelAdmin
 from .models import Product, Category, Brand, Banner, FlashSale
+from .services import CategoryTreeService
 
 # ==========================================
 # CUSTOM FORM FIELD FOR CATEGORY DROPDOWN
@@ -229,8 +230,10 @@ class CategoryAdmin(ImportExportModelAdmin):
         """
         Categories ko Folder 📂 aur File 📄 ke structure mein dikhayega.
         """
-        if obj.parent:
-            if obj.parent.parent:
+        node = CategoryTreeService.get_tree().get(obj.id)
+        depth = node.depth if node else 0
+        if depth:
+            if depth > 1:
                 # Agar yeh Sub-Sub Category hai (3rd level)
                 return format_html('<span style="margin-left: 40px; color: gray;">└── ➖ {}</span>', obj.name)
             # Agar yeh Sub Category hai (2nd level)
@@ -242,26 +245,27 @@ class CategoryAdmin(ImportExportModelAdmin):
     hierarchy_name.short_description = "Category Structure"
 
     def parent_name(self, obj):
-        return obj.parent.name if obj.parent else format_html('<b style="color:blue;">ROOT</b>')
+        parent = CategoryTreeService.get_tree().get(obj.parent_id)
+        return parent.name if parent else format_html('<b style="color:blue;">ROOT</b>')
     parent_name.short_description = "Parent"
 
     def total_products(self, obj):
         """
         Root category mein Total Products (Direct + Subcategory ke) show karega.
         Subcategory mein sirf uske khud ke products dikhayega.
+        Counts come from the cached category tree, not two COUNTs per row.
         """
-        from .models import Product # Import taaki error na aaye
-        
+        node = CategoryTreeService.get_tree().get(obj.id)
+        if node is None:
+            return format_html('<span style="color: #dc3545;">0 SKUs</span>')
+
         # 1. Category ke apne (direct) products ka count
-        direct_count = Product.objects.filter(category=obj).count()
+        direct_count = node.direct_products
         
-        if not obj.parent:
-            # 2. Agar yeh ROOT (Main) category hai, toh uske sub-categories ke products bhi nikalenge
-            sub_categories = Category.objects.filter(parent=obj)
-            sub_count = Product.objects.filter(category__in=sub_categories).count()
-            
-            # Total = Direct products + Sub-category ke products
-            total = direct_count + sub_count
+        if not obj.parent_id:
+            # 2. ROOT category: poore subtree (sub + sub-sub categories) ke products
+            total = node.total_products
+            sub_count = total - direct_count
             
             return format_html(
                 '<b style="color: #28a745; font-size: 13px;">📦 {} Total SKUs</b><br>'
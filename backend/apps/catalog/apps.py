@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.catalog'
\ No newline at end of file
+    name = 'apps.catalog'
+
+    def ready(self):
+        import apps.catalog.signals
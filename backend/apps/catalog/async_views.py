@@ -0,0 +1,306 @@
+"""
+Async request path for the hot catalog reads.
+
+Under UvicornWorker a sync DRF view is pushed through asgiref's thread-sensitive
+executor. These views keep the request on the event loop: Redis stock counters
+go through the asyncio client and DB reads through the async ORM. Query building
+and payload shaping are shared with the sync views in views.py, so both paths
+return the same JSON.
+"""
+from adrf.views import APIView as AsyncAPIView
+from django.core.paginator import InvalidPage, Paginator
+from django.contrib.gis.geos import Point
+from django.db.models import F, OuterRef, Subquery, DecimalField
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from .models import Product
+from .serializers import ProductValuesSerializer, FlashSaleSerializer
+from .services import CategoryTreeService
+from .views import (
+    SkuListAPIView, SkuDetailAPIView, StorefrontCatalogAPIView,
+    GlobalSearchAPIView, SearchSuggestAPIView, BannerListAPIView, FlashSaleListAPIView,
+    _request_location, _apply_availability, _build_price_map, _pick_detail_price,
+    _apply_listing_prices, _mark_unavailable,
+)
+from apps.inventory.models import InventoryItem
+from apps.inventory.services import InventoryService
+from apps.warehouse.models import Warehouse
+from apps.utils.http_cache import versioned_resource, BANNERS, FLASH_SALES
+
+
+async def _serviceable_warehouses(lat, lng):
+    """[(warehouse_id, warehouse_type)] whose delivery zone contains the point."""
+    user_location = Point(float(lng), float(lat), srid=4326)
+    rows = Warehouse.objects.filter(
+        is_active=True, delivery_zone__contains=user_location
+    ).values_list('id', 'warehouse_type')
+    return [row async for row in rows]
+
+
+async def _request_warehouses(request):
+    """Location headers first, then the warehouse resolved by LocationContextMiddleware."""
+    lat, lng = _request_location(request)
+    if lat and lng:
+        return await _serviceable_warehouses(lat, lng)
+    warehouse = getattr(request, 'warehouse', None)
+    return [(warehouse.id, warehouse.warehouse_type)] if warehouse else []
+
+
+async def _apaginate(view, queryset):
+    """
+    Async counterpart of GenericAPIView.paginate_queryset.
+    COUNT and the page slice go through the async ORM; links and the response
+    envelope still come from the view's pagination class.
+    """
+    paginator = view.paginator
+    if paginator is None:
+        return None
+
+    request = view.request
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+
+    try:
+        page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    page.object_list = [obj async for obj in page.object_list]
+
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+
+    paginator.page = page
+    paginator.request = request
+    return page.object_list
+
+
+class AsyncSkuListAPIView(AsyncAPIView, SkuListAPIView):
+    """Listing Page (Search/Category) on the event loop. Same filters/ordering as SkuListAPIView."""
+
+    async def get(self, request, *args, **kwargs):
+        self.category_tree = await CategoryTreeService.aget_tree()
+        qs = self.base_queryset()
+
+        lat, lng = _request_location(request)
+        warehouse_ids = []
+        if request.query_params.get('ordering') in self.price_orderings and lat and lng:
+            warehouse_ids = [wh_id for wh_id, _ in await _serviceable_warehouses(lat, lng)]
+
+        serializer = ProductValuesSerializer(self.get_serializer_context())
+        queryset = serializer.values(self.filter_queryset(self.order_queryset(qs, warehouse_ids)))
+        page = await _apaginate(self, queryset)
+        products = page if page is not None else [p async for p in queryset]
+
+        serializer.context['eta_map'] = await InventoryService.aget_delivery_etas([p['sku'] for p in products])
+        data = serializer.serialize(products)
+        response = self.get_paginated_response(data) if page is not None else Response(data)
+
+        if request.query_params.get('ordering') not in self.price_orderings:
+            await self._ainject_warehouse_prices(response.data, request)
+        return response
+
+    async def _ainject_warehouse_prices(self, data, request):
+        results = data.get('results') if isinstance(data, dict) else data
+        if not results: return
+
+        skus = [item.get('sku') for item in results]
+        if not skus: return
+
+        warehouses = await _request_warehouses(request)
+        if not warehouses:
+            _mark_unavailable(results)
+            return
+
+        stock_map = await InventoryService.aget_stock_by_warehouse_type(warehouses, skus)
+
+        price_rows = InventoryItem.objects.filter(
+            sku__in=skus,
+            bin__rack__aisle__zone__warehouse_id__in=[wh_id for wh_id, _ in warehouses]
+        ).values_list('sku', 'price', 'bin__rack__aisle__zone__warehouse__warehouse_type')
+
+        _apply_listing_prices(results, stock_map, _build_price_map([row async for row in price_rows]))
+
+
+class AsyncSkuDetailAPIView(AsyncAPIView, SkuDetailAPIView):
+    """Product Detail Page on the event loop. Same payload as SkuDetailAPIView."""
+
+    async def aget_object(self):
+        lookup_val = self.kwargs.get('id')
+        queryset = self.get_queryset()
+
+        obj = await queryset.filter(sku=lookup_val).afirst()
+
+        if not obj and lookup_val.isdigit():
+            obj = await queryset.filter(id=int(lookup_val)).afirst()
+
+        if not obj:
+            raise NotFound(f"No Product matches the identifier: {lookup_val}")
+
+        return obj
+
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+
+        warehouses = await _request_warehouses(request)
+        sku_stock = (await InventoryService.aget_stock_by_warehouse_type(warehouses, [instance.sku]))[instance.sku]
+
+        price_rows = InventoryItem.objects.filter(
+            sku=instance.sku,
+            bin__rack__aisle__zone__warehouse_id__in=[wh_id for wh_id, _ in warehouses]
+        ).values_list('price', 'bin__rack__aisle__zone__warehouse__warehouse_type')
+        sale_price = _pick_detail_price([row async for row in price_rows], getattr(instance, 'mrp', 0))
+
+        context = self.get_serializer_context()
+        context['eta_map'] = await InventoryService.aget_delivery_etas([instance.sku])
+        data = self.get_serializer(instance, context=context).data
+        _apply_availability(data, sku_stock)
+
+        data['sale_price'] = sale_price
+        if data.get('effective_price') is None:
+            data['effective_price'] = sale_price
+
+        return Response(data)
+
+
+class AsyncStorefrontCatalogAPIView(AsyncAPIView, StorefrontCatalogAPIView):
+    """
+    Home Page Feed on the event loop.
+    Stock and ETAs for the whole page are fetched once instead of per category.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("X-Location-Lat", OpenApiTypes.DOUBLE, location=OpenApiParameter.HEADER, description="User Latitude"),
+            OpenApiParameter("X-Location-Lng", OpenApiTypes.DOUBLE, location=OpenApiParameter.HEADER, description="User Longitude"),
+            OpenApiParameter("lat", OpenApiTypes.DOUBLE, required=False, description="Fallback Latitude"),
+            OpenApiParameter("lon", OpenApiTypes.DOUBLE, required=False, description="Fallback Longitude"),
+            OpenApiParameter("city", OpenApiTypes.STR, required=False),
+            OpenApiParameter("page", OpenApiTypes.INT, required=False, description="Page number for infinite scroll"),
+        ],
+    )
+    async def get(self, request):
+        lat, lon = _request_location(request)
+
+        warehouses = await _serviceable_warehouses(lat, lon) if lat and lon else []
+        if not warehouses:
+            return Response({"serviceable": False, "message": "Location not serviceable"}, status=200)
+
+        warehouse_ids = [wh_id for wh_id, _ in warehouses]
+        skus_in_stock = InventoryItem.objects.filter(
+            bin__rack__aisle__zone__warehouse_id__in=warehouse_ids,
+            total_stock__gt=F('reserved_stock')
+        ).values_list('sku', flat=True).distinct()
+
+        all_categories = (await CategoryTreeService.aget_tree()).active_roots()
+        paginator = Paginator(all_categories, 4)
+
+        try:
+            page_obj = paginator.page(request.query_params.get('page', 1))
+        except Exception:
+            return Response({
+                "serviceable": True,
+                "categories": [],
+                "has_next": False
+            })
+
+        price_subquery = InventoryItem.objects.filter(
+            sku=OuterRef('sku'),
+            bin__rack__aisle__zone__warehouse_id__in=warehouse_ids
+        ).values('price')[:1]
+
+        serializer = ProductValuesSerializer({'request': request})
+        sections = []
+        for cat in page_obj.object_list:
+            products = serializer.values(Product.objects.filter(
+                category_id__in=cat.descendant_ids,
+                sku__in=skus_in_stock,
+                is_active=True
+            ).annotate(
+                effective_price=Subquery(
+                    price_subquery,
+                    output_field=DecimalField(max_digits=10, decimal_places=2)
+                )
+            ))[:6]
+            products = [p async for p in products]
+            if products:
+                sections.append((cat, products))
+
+        skus = list({p['sku'] for _, products in sections for p in products})
+        stock_map = await InventoryService.aget_stock_by_warehouse_type(warehouses, skus)
+        serializer.context['eta_map'] = await InventoryService.aget_delivery_etas(skus)
+
+        feed = []
+        for cat, products in sections:
+            p_data = serializer.serialize(products)
+
+            for p in p_data:
+                _apply_availability(p, stock_map.get(p['sku'], {'express_stock': 0, 'standard_stock': 0}))
+
+                if p.get('effective_price') is None:
+                    p['effective_price'] = p.get('mrp')
+                    p['sale_price'] = p.get('mrp')
+
+            feed.append({
+                "id": cat.id,
+                "name": cat.name,
+                "slug": cat.slug,
+                "icon": request.build_absolute_uri(cat.icon) if cat.icon and not str(cat.icon).startswith('http') else cat.icon,
+                "products": p_data
+            })
+
+        return Response({
+            "serviceable": True,
+            "categories": feed,
+            "has_next": page_obj.has_next()
+        })
+
+
+class AsyncGlobalSearchAPIView(AsyncAPIView, GlobalSearchAPIView):
+
+    async def get(self, request):
+        self.category_tree = await CategoryTreeService.aget_tree()
+        products = self.search_queryset(request)
+        if products is None:
+            return Response([])
+
+        serializer = ProductValuesSerializer({'request': request})
+        products = [p async for p in serializer.values(products)]
+        serializer.context['eta_map'] = await InventoryService.aget_delivery_etas([p['sku'] for p in products])
+        return Response(serializer.serialize(products))
+
+
+class AsyncSearchSuggestAPIView(AsyncAPIView, SearchSuggestAPIView):
+
+    async def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2: return Response([])
+
+        tree = await CategoryTreeService.aget_tree()
+        product_results, brand_results = self.suggest_querysets(query, tree)
+        brands = [b async for b in brand_results]
+        products = [p async for p in product_results]
+        return Response(self.build_suggestions(request, brands, products, tree))
+
+
+class AsyncBannerListAPIView(AsyncAPIView, BannerListAPIView):
+
+    @versioned_resource(BANNERS)
+    async def get(self, request, *args, **kwargs):
+        banners = [b async for b in self.get_queryset()]
+        return Response(self.get_serializer(banners, many=True).data)
+
+
+class AsyncFlashSaleListAPIView(AsyncAPIView, FlashSaleListAPIView):
+
+    @versioned_resource(FLASH_SALES, bucket_seconds=60)
+    async def get(self, request):
+        sales = [sale async for sale in self.active_sales()]
+        return Response(FlashSaleSerializer(sales, many=True, context={'request': request}).data)
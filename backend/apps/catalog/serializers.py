@@ -2,6 +2,7 @@ from rest_framework import serializers
 from decimal import Decimal
 from .models import Category, Product, Brand, Banner, FlashSale
 from apps.inventory.models import InventoryItem
+from apps.utils.values_serializers import ValuesSerializer
 
 
 
@@ -86,6 +87,11 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         Product ke liye sabse fast available stock ka ETA return karta hai.
         """
+        # Views that serialize lists pass a prefetched map (see InventoryService.get_delivery_etas)
+        eta_map = self.context.get('eta_map')
+        if eta_map is not None:
+            return eta_map.get(obj.sku, "Out of Stock")
+
         # Hum check karte hain ki is product ka kaunsa stock available hai
         inventory_item = InventoryItem.objects.filter(
             sku=obj.sku, 
@@ -113,6 +119,35 @@ class ProductSerializer(serializers.ModelSerializer):
         return obj.mrp
 
 
+
+class ProductValuesSerializer(ValuesSerializer):
+    """
+    ProductSerializer for list pages, fed by values() rows.
+    Expects context['eta_map'] (InventoryService.get_delivery_etas).
+    """
+    serializer_class = ProductSerializer
+    extra_values = ('image',)
+
+    def get_estimated_delivery(self, row):
+        return self.context['eta_map'].get(row['sku'], "Out of Stock")
+
+    def get_image_url(self, row):
+        image = row['image']
+        if not image:
+            return None
+        if image.startswith('http'):
+            return image
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(image)
+        return image
+
+    def get_sale_price(self, row):
+        effective_price = row.get('effective_price')
+        if effective_price is not None:
+            return effective_price
+        return row['mrp']
+
 class CategorySerializer(serializers.ModelSerializer):
     """
     Full serializer for Detail Views (optional usage).
@@ -0,0 +1,242 @@
+import time
+import logging
+import threading
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+# Bumped (after commit) by catalog signals on every Category / Product write
+VERSION_KEY = "catalog_version"
+
+CATEGORY_FIELDS = ('id', 'parent_id', 'name', 'slug', 'icon', 'is_active', 'sort_order')
+
+
+class CategoryNode:
+    __slots__ = (
+        'id', 'parent_id', 'name', 'slug', 'icon', 'is_active', 'sort_order',
+        'depth', 'path', 'children', 'descendant_ids', 'direct_products', 'total_products',
+    )
+
+    def __init__(self, id, parent_id, name, slug, icon, is_active, sort_order):
+        self.id = id
+        self.parent_id = parent_id
+        self.name = name
+        self.slug = slug
+        self.icon = icon
+        self.is_active = is_active
+        self.sort_order = sort_order
+        self.depth = 0
+        self.path = (id,)            # ancestor ids, root first, self last
+        self.children = ()           # child nodes in (sort_order, name) order
+        self.descendant_ids = frozenset((id,))  # self included
+        self.direct_products = 0
+        self.total_products = 0      # self + whole subtree
+
+
+class CategoryTree:
+    """Immutable snapshot of every category; shared read-only between threads."""
+
+    def __init__(self, category_rows, product_counts):
+        self.nodes = {row[0]: CategoryNode(*row) for row in category_rows}
+        self.by_slug = {node.slug: node for node in self.nodes.values()}
+
+        children = {}
+        for node in self.nodes.values():
+            node.direct_products = product_counts.get(node.id, 0)
+            if node.parent_id in self.nodes:
+                children.setdefault(node.parent_id, []).append(node)
+
+        ordering = attrgetter('sort_order', 'name')
+        for node in self.nodes.values():
+            node.children = tuple(sorted(children.get(node.id, ()), key=ordering))
+
+        self.roots = tuple(sorted(
+            (n for n in self.nodes.values() if n.parent_id not in self.nodes), key=ordering
+        ))
+        for root in self.roots:
+            self._walk(root, ())
+
+        self.ordered = tuple(sorted(self.nodes.values(), key=ordering))
+
+    def _walk(self, node, path):
+        # Iterative on purpose: a parent cycle saved through raw SQL must not blow the stack
+        stack = [(node, path)]
+        post_order = []
+        while stack:
+            current, parent_path = stack.pop()
+            current.path = parent_path + (current.id,)
+            current.depth = len(parent_path)
+            post_order.append(current)
+            stack.extend((child, current.path) for child in current.children)
+
+        for current in reversed(post_order):
+            descendants = {current.id}
+            total = current.direct_products
+            for child in current.children:
+                descendants |= child.descendant_ids
+                total += child.total_products
+            current.descendant_ids = frozenset(descendants)
+            current.total_products = total
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+    def ancestors(self, category_id):
+        """Nodes from the root down to the parent."""
+        node = self.nodes.get(category_id)
+        return [self.nodes[i] for i in node.path[:-1]] if node else []
+
+    def descendant_ids(self, category_id):
+        node = self.nodes.get(category_id)
+        return node.descendant_ids if node else frozenset()
+
+    def descendant_ids_for_slug(self, slug):
+        node = self.by_slug.get(slug)
+        return node.descendant_ids if node else frozenset()
+
+    def active_roots(self):
+        return [node for node in self.roots if node.is_active]
+
+    def active_at_depth(self, depth):
+        return [node for node in self.ordered if node.is_active and node.depth == depth]
+
+    def active(self):
+        return [node for node in self.ordered if node.is_active]
+
+    def ids_named(self, text, levels_up=0):
+        """Categories whose ancestor `levels_up` above them (0 = itself) has `text` in its name."""
+        text = text.casefold()
+        matched = set()
+        for node in self.nodes.values():
+            if len(node.path) > levels_up:
+                ancestor = self.nodes[node.path[-1 - levels_up]]
+                if text in ancestor.name.casefold():
+                    matched.add(node.id)
+        return matched
+
+    def ids_under_name(self, text):
+        """Categories that match `text` themselves or through any ancestor (replaces category__parent__..__name joins)."""
+        text = text.casefold()
+        matched = set()
+        for node in self.nodes.values():
+            if any(text in self.nodes[i].name.casefold() for i in node.path):
+                matched.add(node.id)
+        return matched
+
+
+_state = {"tree": None, "version": None, "checked_at": None}
+_lock = threading.Lock()
+
+
+class CategoryTreeService:
+    """
+    Whole category tree (ancestor paths, descendant sets, product counts) held
+    per process. Rebuilt when catalog_version moves; the version is polled at
+    most every CATEGORY_TREE_CHECK_INTERVAL seconds.
+    """
+
+    @staticmethod
+    def _product_counts(rows):
+        return {category_id: count for category_id, count in rows}
+
+    @staticmethod
+    def _count_rows():
+        return Product.objects.order_by().values('category_id').annotate(n=Count('id')).values_list('category_id', 'n')
+
+    @staticmethod
+    def _fresh_tree(now):
+        tree, checked_at = _state["tree"], _state["checked_at"]
+        if tree is not None and checked_at is not None and now - checked_at < settings.CATEGORY_TREE_CHECK_INTERVAL:
+            return tree
+        return None
+
+    @staticmethod
+    def _current_tree(version, now):
+        """The held tree if it is still at `version` (and marks it checked)."""
+        tree = _state["tree"]
+        if tree is not None and version == _state["version"]:
+            _state["checked_at"] = now
+            return tree
+        return None
+
+    @staticmethod
+    def _remote_version():
+        try:
+            version = cache.get(VERSION_KEY)
+            if version is None:
+                cache.add(VERSION_KEY, 1, timeout=None)
+                version = cache.get(VERSION_KEY)
+            return version
+        except Exception as e:
+            logger.warning(f"Catalog version unavailable, reusing category tree: {e}")
+            return _state["version"]
+
+    @staticmethod
+    async def _aremote_version():
+        try:
+            version = await cache.aget(VERSION_KEY)
+            if version is None:
+                await cache.aadd(VERSION_KEY, 1, timeout=None)
+                version = await cache.aget(VERSION_KEY)
+            return version
+        except Exception as e:
+            logger.warning(f"Catalog version unavailable, reusing category tree: {e}")
+            return _state["version"]
+
+    @staticmethod
+    def _store(tree, version, now):
+        _state.update(tree=tree, version=version, checked_at=now)
+        return tree
+
+    @staticmethod
+    def get_tree() -> CategoryTree:
+        now = time.monotonic()
+        tree = CategoryTreeService._fresh_tree(now)
+        if tree is not None:
+            return tree
+
+        with _lock:
+            tree = CategoryTreeService._fresh_tree(now)
+            if tree is not None:
+                return tree
+
+            version = CategoryTreeService._remote_version()
+            tree = CategoryTreeService._current_tree(version, now)
+            if tree is not None:
+                return tree
+
+            tree = CategoryTree(
+                Category.objects.order_by().values_list(*CATEGORY_FIELDS),
+                CategoryTreeService._product_counts(CategoryTreeService._count_rows()),
+            )
+            logger.info(f"Category tree rebuilt: {len(tree.nodes)} categories (version {version})")
+            return CategoryTreeService._store(tree, version, now)
+
+    @staticmethod
+    async def aget_tree() -> CategoryTree:
+        now = time.monotonic()
+        tree = CategoryTreeService._fresh_tree(now)
+        if tree is not None:
+            return tree
+
+        version = await CategoryTreeService._aremote_version()
+        tree = CategoryTreeService._current_tree(version, now)
+        if tree is not None:
+            return tree
+
+        categories = [row async for row in Category.objects.order_by().values_list(*CATEGORY_FIELDS)]
+        counts = CategoryTreeService._product_counts([row async for row in CategoryTreeService._count_rows()])
+        tree = CategoryTree(categories, counts)
+        logger.info(f"Category tree rebuilt: {len(tree.nodes)} categories (version {version})")
+        return CategoryTreeService._store(tree, version, now)
+
+    @staticmethod
+    def invalidate():
+        """Drops this process's copy; other processes notice the version bump within the check interval."""
+        _state.update(tree=None, version=None, checked_at=None)
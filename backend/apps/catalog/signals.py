@@ -1,7 +1,9 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
-from .models import Product, Category
+from django.db import transaction
+from .models import Product, Category, Brand, Banner, FlashSale
+from apps.utils.http_cache import bump_version_on_commit, CATEGORIES, BRANDS, BANNERS, FLASH_SALES
 
 @receiver(post_save, sender=Product)
 @receiver(post_delete, sender=Product)
@@ -9,9 +11,51 @@ from .models import Product, Category
 @receiver(post_delete, sender=Category)
 def invalidate_catalog_cache(sender, instance, **kwargs):
     """
-    Bumps the Catalog Version Key.
+    Bumps the Catalog Version Key (after commit, so other processes never rebuild
+    the category tree from uncommitted data).
     """
+    transaction.on_commit(_bump_catalog_version)
+
+
+def _bump_catalog_version():
     try:
         cache.incr("catalog_version")
     except ValueError:
-        cache.set("catalog_version", 1, timeout=None)
\ No newline at end of file
+        cache.set("catalog_version", 1, timeout=None)
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_etags(sender, instance, **kwargs):
+    bump_version_on_commit(CATEGORIES)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance, **kwargs):
+    """
+    Product saves only move the counts, which follow the version bump within
+    CATEGORY_TREE_CHECK_INTERVAL; a category edit is dropped here at once.
+    """
+    from .services import CategoryTreeService
+    transaction.on_commit(CategoryTreeService.invalidate)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def bump_brand_etags(sender, instance, **kwargs):
+    bump_version_on_commit(BRANDS)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def bump_banner_etags(sender, instance, **kwargs):
+    bump_version_on_commit(BANNERS)
+
+
+@receiver(post_save, sender=FlashSale)
+@receiver(post_delete, sender=FlashSale)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_flash_sale_etags(sender, instance, **kwargs):
+    """Flash sale cards show the product's name, image and MRP."""
+    bump_version_on_commit(FLASH_SALES)
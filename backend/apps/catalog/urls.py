@@ -2,33 +2,35 @@ from django.urls import path
 from .views import (
     NavbarCategoryAPIView,
     HomeCategoryAPIView,
-    SkuListAPIView,
-    SkuDetailAPIView,
     CategoryListAPIView,
-    BannerListAPIView,
     BrandListAPIView,
-    FlashSaleListAPIView,
-    GlobalSearchAPIView,
-    SearchSuggestAPIView,
-    StorefrontCatalogAPIView,
+)
+from .async_views import (
+    AsyncSkuListAPIView,
+    AsyncSkuDetailAPIView,
+    AsyncStorefrontCatalogAPIView,
+    AsyncBannerListAPIView,
+    AsyncFlashSaleListAPIView,
+    AsyncGlobalSearchAPIView,
+    AsyncSearchSuggestAPIView,
 )
 
 urlpatterns = [
     path('categories/parents/', NavbarCategoryAPIView.as_view(), name='navbar-categories'),
     path('categories/children/', HomeCategoryAPIView.as_view(), name='home-categories'),
     
-    path('skus/', SkuListAPIView.as_view()),
-    path('skus/<str:id>/', SkuDetailAPIView.as_view()), 
-    path('products/<str:id>/', SkuDetailAPIView.as_view()), 
+    path('skus/', AsyncSkuListAPIView.as_view()),
+    path('skus/<str:id>/', AsyncSkuDetailAPIView.as_view()), 
+    path('products/<str:id>/', AsyncSkuDetailAPIView.as_view()), 
     path('categories/', CategoryListAPIView.as_view()),
     
-    path('storefront/', StorefrontCatalogAPIView.as_view()), 
-    path('home/feed/', StorefrontCatalogAPIView.as_view()),
+    path('storefront/', AsyncStorefrontCatalogAPIView.as_view()), 
+    path('home/feed/', AsyncStorefrontCatalogAPIView.as_view()),
 
-    path('banners/', BannerListAPIView.as_view()),
+    path('banners/', AsyncBannerListAPIView.as_view()),
     path('brands/', BrandListAPIView.as_view()),
-    path('flash-sales/', FlashSaleListAPIView.as_view()),
+    path('flash-sales/', AsyncFlashSaleListAPIView.as_view()),
     
-    path('search/', GlobalSearchAPIView.as_view()),
-    path('search/suggest/', SearchSuggestAPIView.as_view()),
+    path('search/', AsyncGlobalSearchAPIView.as_view()),
+    path('search/suggest/', AsyncSearchSuggestAPIView.as_view()),
 ]
\ No newline at end of file
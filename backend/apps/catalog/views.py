@@ -8,20 +8,142 @@ from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
 from django.core.paginator import Paginator
 import re
+import operator
+from functools import reduce
 from django.db.models import Case, When, Value, IntegerField
 from .models import Category, Product, Banner, Brand, FlashSale
 from .serializers import (
-    CategorySerializer, ProductSerializer, BannerSerializer, 
+    CategorySerializer, ProductSerializer, ProductValuesSerializer, BannerSerializer, 
     BrandSerializer, FlashSaleSerializer, 
-    SimpleCategorySerializer, NavigationCategorySerializer, HomeCategorySerializer
+    SimpleCategorySerializer
 )
 from rest_framework.exceptions import NotFound
 from django.db.models import Q
 from apps.warehouse.services import WarehouseService
 from apps.inventory.models import InventoryItem
+from apps.inventory.services import InventoryService
 from rest_framework.pagination import PageNumberPagination
 from django.contrib.gis.geos import Point
 from apps.warehouse.models import Warehouse
+from apps.utils.http_cache import versioned_resource, CATEGORIES, BANNERS, BRANDS, FLASH_SALES
+from .services import CategoryTreeService
+
+
+def _request_location(request):
+    lat = request.headers.get('X-Location-Lat') or request.query_params.get('lat')
+    lng = request.headers.get('X-Location-Lng') or request.query_params.get('lon')
+    return lat, lng
+
+
+def _apply_availability(item, sku_stock):
+    """Express (dark store) stock wins; standard (mega) stock is the 1-2 day fallback."""
+    exp_stock = sku_stock['express_stock']
+    std_stock = sku_stock['standard_stock']
+
+    # Agar dark store me 1 bhi item hai, toh pehle wo dikhao
+    if exp_stock > 0:
+        item['available_stock'] = exp_stock
+        item['delivery_type'] = 'dark_store'
+        item['delivery_eta'] = item.get('estimated_delivery', '10 Mins') # UPDATED HERE
+        item['has_more_in_mega'] = std_stock > 0 # Frontend me tag lagane ke liye (ex: "+ More in 1-2 Days")
+    elif std_stock > 0:
+        item['available_stock'] = std_stock
+        item['delivery_type'] = 'mega'
+        item['delivery_eta'] = item.get('estimated_delivery', '1-2 Days') # UPDATED HERE
+        item['has_more_in_mega'] = False
+    else:
+        item['available_stock'] = 0
+        item['delivery_type'] = 'unavailable'
+        item['delivery_eta'] = 'Out of Stock'
+        item['has_more_in_mega'] = False
+
+
+def _build_price_map(price_rows):
+    """(sku, price, warehouse_type) rows -> {sku: price}, dark store price first."""
+    price_map = {}
+    for sku, price, wh_type in price_rows:
+        if wh_type == 'dark_store':
+            price_map[sku] = price # Dark store price ki priority
+        elif wh_type == 'mega':
+            if not price_map.get(sku):
+                price_map[sku] = price
+        else:
+            price_map.setdefault(sku, 0)
+    return price_map
+
+
+def _pick_detail_price(price_rows, default):
+    """(price, warehouse_type) rows for one SKU -> sale price, dark store first."""
+    sale_price = default
+    dark_store_priced = False
+    for price, wh_type in price_rows:
+        if wh_type == 'dark_store':
+            sale_price = price
+            dark_store_priced = True
+        elif wh_type == 'mega' and not dark_store_priced:
+            sale_price = price
+    return sale_price
+
+
+def _apply_listing_prices(results, stock_map, price_map):
+    for item in results:
+        sku = item.get('sku')
+        if sku in price_map:
+            _apply_availability(item, stock_map[sku])
+            if item['available_stock'] > 0:
+                item['sale_price'] = price_map[sku]
+        else:
+            item['available_stock'] = 0
+            item['delivery_eta'] = 'Unavailable'
+            item['has_more_in_mega'] = False
+
+
+def _mark_unavailable(results):
+    for item in results:
+        item['available_stock'] = 0
+        item['delivery_eta'] = 'Unavailable'
+        item['has_more_in_mega'] = False
+
+
+def _icon_url(request, icon):
+    if not icon:
+        return None
+    if icon.startswith('http'):
+        return icon
+    return request.build_absolute_uri(icon)
+
+
+class CategoryTreeMixin:
+    """Category lookups go through one tree per request; async views preload it with aget_tree()."""
+    category_tree = None
+
+    def get_category_tree(self):
+        if self.category_tree is None:
+            self.category_tree = CategoryTreeService.get_tree()
+        return self.category_tree
+
+
+class CategoryTreeSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter where a term also matches products filed under a category whose
+    name (or any ancestor's name) contains it, resolved from the category tree
+    instead of joining category__parent__parent.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        tree = view.get_category_tree()
+        conditions = (
+            reduce(operator.or_, (Q(**{f"{field}__icontains": term}) for field in search_fields))
+            | Q(category_id__in=tree.ids_under_name(term))
+            for term in search_terms
+        )
+        return queryset.filter(reduce(operator.and_, conditions))
 
 
 class SkuPagination(PageNumberPagination):
@@ -38,11 +160,19 @@ class NavbarCategoryAPIView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = [] 
 
+    @versioned_resource(CATEGORIES)
     def get(self, request):
-        # Yahan .prefetch_related('subcategories') add kiya gaya hai
-        queryset = Category.objects.filter(is_active=True, parent__isnull=True).prefetch_related('subcategories').order_by('sort_order', 'name')
-        serializer = NavigationCategorySerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        # Same shape as NavigationCategorySerializer, built from the cached tree
+        return Response([
+            {
+                "id": node.id,
+                "name": node.name,
+                "slug": node.slug,
+                "icon_url": _icon_url(request, node.icon),
+                "subcategories": [{"id": c.id, "name": c.name, "slug": c.slug} for c in node.children],
+            }
+            for node in CategoryTreeService.get_tree().active_roots()
+        ])
 
 
 class HomeCategoryAPIView(APIView):
@@ -52,18 +182,24 @@ class HomeCategoryAPIView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = [] 
 
+    @versioned_resource(CATEGORIES)
     def get(self, request):
-        queryset = Category.objects.filter(
-            is_active=True, 
-            parent__isnull=False,        
-            parent__parent__isnull=True  
-        ).select_related('parent').order_by('sort_order', 'name')
-
-        serializer = HomeCategorySerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
-
-
-class SkuListAPIView(generics.ListAPIView):
+        # Same shape as HomeCategorySerializer, built from the cached tree
+        tree = CategoryTreeService.get_tree()
+        return Response([
+            {
+                "id": node.id,
+                "name": node.name,
+                "slug": node.slug,
+                "icon_url": _icon_url(request, node.icon),
+                "parent": node.parent_id,
+                "parent_name": tree.get(node.parent_id).name,
+            }
+            for node in tree.active_at_depth(1)
+        ])
+
+
+class SkuListAPIView(CategoryTreeMixin, generics.ListAPIView):
     """
     Listing Page (Search/Category).
     Supports sorting by Price which requires Warehouse Context.
@@ -71,25 +207,38 @@ class SkuListAPIView(generics.ListAPIView):
     """
     permission_classes = [AllowAny]
     authentication_classes = [] 
+    use_read_replica = True
     serializer_class = ProductSerializer
     pagination_class = SkuPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, CategoryTreeSearchFilter, filters.OrderingFilter]
     
     filterset_fields = ['is_active', 'is_returnable'] 
     
-    search_fields = ['name', 'sku', 'description', 'category__name', 'category__parent__name','category__parent__parent__name', 'search_tags']
+    # Category names (at any level) are matched by CategoryTreeSearchFilter
+    search_fields = ['name', 'sku', 'description', 'search_tags']
     ordering_fields = ['effective_price', 'created_at']
+    price_orderings = ['price_asc', 'price_desc', 'effective_price', '-effective_price']
 
     def get_queryset(self):
-        qs = Product.objects.filter(is_active=True).select_related('category')
+        qs = self.base_queryset()
+        
+        lat, lng = _request_location(self.request)
+        
+        warehouse_ids = []
+        if self.request.query_params.get('ordering') in self.price_orderings and lat and lng:
+            user_location = Point(float(lng), float(lat), srid=4326)
+            warehouse_ids = list(Warehouse.objects.filter(
+                is_active=True, delivery_zone__contains=user_location
+            ).values_list('id', flat=True))
+
+        return self.order_queryset(qs, warehouse_ids)
+
+    def base_queryset(self):
+        qs = Product.objects.filter(is_active=True)
         
         category_slug = self.request.query_params.get('category__slug')
         if category_slug:
-            qs = qs.filter(
-                Q(category__slug=category_slug) | 
-                Q(category__parent__slug=category_slug) |
-                Q(category__parent__parent__slug=category_slug)
-            )
+            qs = qs.filter(category_id__in=self.get_category_tree().descendant_ids_for_slug(category_slug))
 
         brands = self.request.query_params.get('brand')
         if brands:
@@ -102,21 +251,17 @@ class SkuListAPIView(generics.ListAPIView):
         if dietary:
             qs = qs.filter(dietary_preference=dietary.upper())
 
+        return qs
+
+    def order_queryset(self, qs, warehouse_ids):
+        """Price sorting uses the serviceable warehouses' batch price when there are any."""
         ordering = self.request.query_params.get('ordering')
-        
-        lat = self.request.headers.get('X-Location-Lat') or self.request.query_params.get('lat')
-        lng = self.request.headers.get('X-Location-Lng') or self.request.query_params.get('lon')
-        
-        serviceable_warehouses = None
-        if lat and lng:
-            user_location = Point(float(lng), float(lat), srid=4326)
-            serviceable_warehouses = Warehouse.objects.filter(is_active=True, delivery_zone__contains=user_location)
 
-        if ordering in ['price_asc', 'price_desc', 'effective_price', '-effective_price']:
-            if serviceable_warehouses and serviceable_warehouses.exists():
+        if ordering in self.price_orderings:
+            if warehouse_ids:
                 price_subquery = InventoryItem.objects.filter(
                     sku=OuterRef('sku'),
-                    bin__rack__aisle__zone__warehouse__in=serviceable_warehouses
+                    bin__rack__aisle__zone__warehouse_id__in=warehouse_ids
                 ).values('price')[:1]
             else:
                 price_subquery = InventoryItem.objects.filter(
@@ -140,9 +285,16 @@ class SkuListAPIView(generics.ListAPIView):
         return qs
 
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        ordering = request.query_params.get('ordering')
-        if ordering not in ['price_asc', 'price_desc', 'effective_price', '-effective_price']:
+        serializer = ProductValuesSerializer(self.get_serializer_context())
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        products = page if page is not None else list(queryset)
+
+        serializer.context['eta_map'] = InventoryService.get_delivery_etas([p['sku'] for p in products])
+        data = serializer.serialize(products)
+        response = self.get_paginated_response(data) if page is not None else Response(data)
+
+        if request.query_params.get('ordering') not in self.price_orderings:
             self._inject_warehouse_prices(response.data, request)
         return response
 
@@ -153,8 +305,7 @@ class SkuListAPIView(generics.ListAPIView):
         skus = [item.get('sku') for item in results]
         if not skus: return
 
-        lat = request.headers.get('X-Location-Lat') or request.query_params.get('lat')
-        lng = request.headers.get('X-Location-Lng') or request.query_params.get('lon')
+        lat, lng = _request_location(request)
 
         if lat and lng:
             user_location = Point(float(lng), float(lat), srid=4326)
@@ -163,64 +314,20 @@ class SkuListAPIView(generics.ListAPIView):
             warehouse = getattr(request, 'warehouse', None)
             serviceable_warehouses = Warehouse.objects.filter(id=warehouse.id) if warehouse else Warehouse.objects.none()
 
-        if not serviceable_warehouses.exists():
-            for item in results:
-                item['available_stock'] = 0
-                item['delivery_eta'] = 'Unavailable'
-                item['has_more_in_mega'] = False
+        # SMART STOCK CALCULATION (Dark vs Mega) - totals come from the per-SKU counters
+        warehouses = list(serviceable_warehouses.values_list('id', 'warehouse_type'))
+        if not warehouses:
+            _mark_unavailable(results)
             return
 
-        inventory_items = InventoryItem.objects.filter(
+        stock_map = InventoryService.get_stock_by_warehouse_type(warehouses, skus)
+
+        price_rows = InventoryItem.objects.filter(
             sku__in=skus,
-            bin__rack__aisle__zone__warehouse__in=serviceable_warehouses
-        ).select_related('bin__rack__aisle__zone__warehouse')
-        
-        # SMART STOCK CALCULATION (Dark vs Mega)
-        stock_map = {}
-        for inv in inventory_items:
-            wh_type = inv.warehouse.warehouse_type
-            stock = inv.total_stock - inv.reserved_stock
-            
-            if inv.sku not in stock_map:
-                stock_map[inv.sku] = {'express_stock': 0, 'standard_stock': 0, 'sale_price': 0}
-                
-            if wh_type == 'dark_store':
-                stock_map[inv.sku]['express_stock'] += stock
-                stock_map[inv.sku]['sale_price'] = inv.price # Dark store price ki priority
-            elif wh_type == 'mega':
-                stock_map[inv.sku]['standard_stock'] += stock
-                if stock_map[inv.sku]['sale_price'] == 0:
-                    stock_map[inv.sku]['sale_price'] = inv.price
-
-        for item in results:
-            sku = item.get('sku')
-            if sku in stock_map:
-                sku_info = stock_map[sku]
-                exp_stock = sku_info['express_stock']
-                std_stock = sku_info['standard_stock']
-                
-                # Agar dark store me 1 bhi item hai, toh pehle wo dikhao
-                if exp_stock > 0:
-                    item['available_stock'] = exp_stock
-                    item['delivery_type'] = 'dark_store'
-                    item['delivery_eta'] = item.get('estimated_delivery', '10 Mins') # UPDATED HERE
-                    item['sale_price'] = sku_info['sale_price']
-                    item['has_more_in_mega'] = std_stock > 0 # Frontend me tag lagane ke liye (ex: "+ More in 1-2 Days")
-                elif std_stock > 0:
-                    item['available_stock'] = std_stock
-                    item['delivery_type'] = 'mega'
-                    item['delivery_eta'] = item.get('estimated_delivery', '1-2 Days') # UPDATED HERE
-                    item['sale_price'] = sku_info['sale_price']
-                    item['has_more_in_mega'] = False
-                else:
-                    item['available_stock'] = 0
-                    item['delivery_eta'] = 'Out of Stock'
-                    item['delivery_type'] = 'unavailable'
-                    item['has_more_in_mega'] = False
-            else:
-                item['available_stock'] = 0
-                item['delivery_eta'] = 'Unavailable'
-                item['has_more_in_mega'] = False
+            bin__rack__aisle__zone__warehouse_id__in=[wh_id for wh_id, _ in warehouses]
+        ).values_list('sku', 'price', 'bin__rack__aisle__zone__warehouse__warehouse_type')
+
+        _apply_listing_prices(results, stock_map, _build_price_map(price_rows))
 
 
 class SkuDetailAPIView(generics.RetrieveAPIView):
@@ -230,6 +337,7 @@ class SkuDetailAPIView(generics.RetrieveAPIView):
     """
     permission_classes = [AllowAny]
     authentication_classes = [] 
+    use_read_replica = True
     serializer_class = ProductSerializer
     lookup_field = 'id'
 
@@ -255,8 +363,7 @@ class SkuDetailAPIView(generics.RetrieveAPIView):
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        lat = request.headers.get('X-Location-Lat') or request.query_params.get('lat')
-        lng = request.headers.get('X-Location-Lng') or request.query_params.get('lon')
+        lat, lng = _request_location(request)
 
         if lat and lng:
             user_location = Point(float(lng), float(lat), srid=4326)
@@ -265,45 +372,18 @@ class SkuDetailAPIView(generics.RetrieveAPIView):
             warehouse = getattr(request, 'warehouse', None)
             serviceable_warehouses = Warehouse.objects.filter(id=warehouse.id) if warehouse else Warehouse.objects.none()
 
-        inventory_items = InventoryItem.objects.filter(
-            sku=instance.sku,
-            bin__rack__aisle__zone__warehouse__in=serviceable_warehouses
-        ).select_related('bin__rack__aisle__zone__warehouse')
+        warehouses = list(serviceable_warehouses.values_list('id', 'warehouse_type'))
+        sku_stock = InventoryService.get_stock_by_warehouse_type(warehouses, [instance.sku])[instance.sku]
 
-        express_stock = 0
-        standard_stock = 0
-        sale_price = getattr(instance, 'mrp', 0)
-        
-        for inv in inventory_items:
-            wh_type = inv.warehouse.warehouse_type
-            stock = inv.total_stock - inv.reserved_stock
-            
-            if wh_type == 'dark_store':
-                express_stock += stock
-                sale_price = inv.price
-            elif wh_type == 'mega':
-                standard_stock += stock
-                if express_stock == 0:
-                    sale_price = inv.price
+        price_rows = InventoryItem.objects.filter(
+            sku=instance.sku,
+            bin__rack__aisle__zone__warehouse_id__in=[wh_id for wh_id, _ in warehouses]
+        ).values_list('price', 'bin__rack__aisle__zone__warehouse__warehouse_type')
+        sale_price = _pick_detail_price(price_rows, getattr(instance, 'mrp', 0))
 
         serializer = self.get_serializer(instance)
         data = serializer.data
-        
-        if express_stock > 0:
-            data['available_stock'] = express_stock
-            data['delivery_type'] = 'dark_store'
-            data['delivery_eta'] = data.get('estimated_delivery', '10 Mins') # UPDATED HERE
-            data['has_more_in_mega'] = standard_stock > 0
-        elif standard_stock > 0:
-            data['available_stock'] = standard_stock
-            data['delivery_type'] = 'mega'
-            data['delivery_eta'] = data.get('estimated_delivery', '1-2 Days') # UPDATED HERE
-            data['has_more_in_mega'] = False
-        else:
-            data['available_stock'] = 0
-            data['delivery_type'] = 'unavailable'
-            data['delivery_eta'] = 'Out of Stock'
-            data['has_more_in_mega'] = False
+        _apply_availability(data, sku_stock)
         
         data['sale_price'] = sale_price
         if data.get('effective_price') is None:
@@ -320,6 +400,7 @@ class StorefrontCatalogAPIView(APIView):
     """
     permission_classes = [AllowAny]
     authentication_classes = [] 
+    use_read_replica = True
 
     @extend_schema(
         parameters=[
@@ -341,7 +422,8 @@ class StorefrontCatalogAPIView(APIView):
             user_location = Point(float(lon), float(lat), srid=4326)
             serviceable_warehouses = Warehouse.objects.filter(is_active=True, delivery_zone__contains=user_location)
 
-        if not serviceable_warehouses.exists():
+        warehouses = list(serviceable_warehouses.values_list('id', 'warehouse_type'))
+        if not warehouses:
             return Response({"serviceable": False, "message": "Location not serviceable"}, status=200)
 
         skus_in_stock = InventoryItem.objects.filter(
@@ -349,7 +431,7 @@ class StorefrontCatalogAPIView(APIView):
             total_stock__gt=F('reserved_stock')
         ).values_list('sku', flat=True).distinct()
 
-        all_categories = Category.objects.filter(is_active=True, parent__isnull=True).order_by('sort_order', 'name')
+        all_categories = CategoryTreeService.get_tree().active_roots()
         
         page_number = request.query_params.get('page', 1)
         paginator = Paginator(all_categories, 4)
@@ -363,6 +445,7 @@ class StorefrontCatalogAPIView(APIView):
                 "has_next": False
             })
 
+        serializer = ProductValuesSerializer({'request': request})
         feed = []
         for cat in page_obj:
             price_subquery = InventoryItem.objects.filter(
@@ -370,8 +453,8 @@ class StorefrontCatalogAPIView(APIView):
                 bin__rack__aisle__zone__warehouse__in=serviceable_warehouses
             ).values('price')[:1]
 
-            products = Product.objects.filter(
-                Q(category=cat) | Q(category__parent=cat),
+            products = serializer.values(Product.objects.filter(
+                category_id__in=cat.descendant_ids,
                 sku__in=skus_in_stock,
                 is_active=True
             ).annotate(
@@ -379,49 +462,19 @@ class StorefrontCatalogAPIView(APIView):
                     price_subquery, 
                     output_field=DecimalField(max_digits=10, decimal_places=2)
                 )
-            )[:6]
+            ))[:6]
 
-            if products.exists():
-                p_data = ProductSerializer(products, many=True, context={'request': request}).data
-                
-                inventory_qs = InventoryItem.objects.filter(
-                    sku__in=[p['sku'] for p in p_data],
-                    bin__rack__aisle__zone__warehouse__in=serviceable_warehouses
-                ).select_related('bin__rack__aisle__zone__warehouse')
+            products = list(products)
+            if products:
+                serializer.context['eta_map'] = InventoryService.get_delivery_etas([p['sku'] for p in products])
+                p_data = serializer.serialize(products)
                 
-                stock_map = {}
-                for inv in inventory_qs:
-                    wh_type = inv.warehouse.warehouse_type
-                    stock = inv.total_stock - inv.reserved_stock
-                    
-                    if inv.sku not in stock_map:
-                        stock_map[inv.sku] = {'express_stock': 0, 'standard_stock': 0}
-                        
-                    if wh_type == 'dark_store':
-                        stock_map[inv.sku]['express_stock'] += stock
-                    elif wh_type == 'mega':
-                        stock_map[inv.sku]['standard_stock'] += stock
+                stock_map = InventoryService.get_stock_by_warehouse_type(
+                    warehouses, [p['sku'] for p in p_data]
+                )
                 
                 for p in p_data: 
-                    sku_info = stock_map.get(p['sku'], {'express_stock': 0, 'standard_stock': 0})
-                    exp_stock = sku_info['express_stock']
-                    std_stock = sku_info['standard_stock']
-                    
-                    if exp_stock > 0:
-                        p['available_stock'] = exp_stock
-                        p['delivery_type'] = 'dark_store'
-                        p['delivery_eta'] = p.get('estimated_delivery', '10 Mins') # UPDATED HERE
-                        p['has_more_in_mega'] = std_stock > 0
-                    elif std_stock > 0:
-                        p['available_stock'] = std_stock
-                        p['delivery_type'] = 'mega'
-                        p['delivery_eta'] = p.get('estimated_delivery', '1-2 Days') # UPDATED HERE
-                        p['has_more_in_mega'] = False
-                    else:
-                        p['available_stock'] = 0
-                        p['delivery_type'] = 'unavailable'
-                        p['delivery_eta'] = 'Out of Stock'
-                        p['has_more_in_mega'] = False
+                    _apply_availability(p, stock_map.get(p['sku'], {'express_stock': 0, 'standard_stock': 0}))
                     
                     if p.get('effective_price') is None:
                         p['effective_price'] = p.get('mrp')
@@ -442,19 +495,32 @@ class StorefrontCatalogAPIView(APIView):
         })
 
 
-class GlobalSearchAPIView(APIView):
+class GlobalSearchAPIView(CategoryTreeMixin, APIView):
     permission_classes = [AllowAny]
     authentication_classes = [] 
+    use_read_replica = True
     
     def get(self, request):
+        products = self.search_queryset(request)
+        if products is None:
+            return Response([])
+
+        serializer = ProductValuesSerializer({'request': request})
+        products = list(serializer.values(products))
+        serializer.context['eta_map'] = InventoryService.get_delivery_etas([p['sku'] for p in products])
+        return Response(serializer.serialize(products))
+
+    def search_queryset(self, request):
+        """Top 40 matches ranked by relevance, or None when the query is too short."""
         query = request.query_params.get("q", "").strip() or request.query_params.get("search", "").strip()
         brand_id = request.query_params.get("brand") 
         dietary = request.query_params.get("dietary") # NEW: Support for dietary filter
         
         if len(query) < 2 and not brand_id and not dietary:
-            return Response([])
+            return None
 
-        products = Product.objects.filter(is_active=True).select_related('category')
+        products = Product.objects.filter(is_active=True)
+        tree = self.get_category_tree()
 
         if brand_id:
             products = products.filter(brand_id=brand_id)
@@ -469,9 +535,7 @@ class GlobalSearchAPIView(APIView):
                     Q(name__icontains=word) | 
                     Q(sku__icontains=word) |
                     Q(description__icontains=word) |
-                    Q(category__name__icontains=word) |
-                    Q(category__parent__name__icontains=word) |
-                    Q(category__parent__parent__name__icontains=word) |
+                    Q(category_id__in=tree.ids_under_name(word)) |
                     Q(search_tags__icontains=word) # NEW: Searching inside tags too
                 )
             
@@ -483,29 +547,35 @@ class GlobalSearchAPIView(APIView):
                     When(name__icontains=query, then=Value(4)),
                     When(search_tags__icontains=query, then=Value(5)), # High priority for direct tag matches
                     When(description__icontains=query, then=Value(6)),
-                    When(category__name__icontains=query, then=Value(7)),
-                    When(category__parent__name__icontains=query, then=Value(8)),
-                    When(category__parent__parent__name__icontains=query, then=Value(9)),
+                    When(category_id__in=tree.ids_named(query), then=Value(7)),
+                    When(category_id__in=tree.ids_named(query, levels_up=1), then=Value(8)),
+                    When(category_id__in=tree.ids_named(query, levels_up=2), then=Value(9)),
                     default=Value(10),
                     output_field=IntegerField()
                 )
             ).order_by('relevance', '-created_at')
 
-        products = products[:40]
-        return Response(ProductSerializer(products, many=True, context={'request': request}).data)
+        return products[:40]
 
 
 class SearchSuggestAPIView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = [] 
+    use_read_replica = True
     
     def get(self, request):
         query = request.query_params.get('q', '').strip()
         if len(query) < 2: return Response([])
-        
+
+        tree = CategoryTreeService.get_tree()
+        product_results, brand_results = self.suggest_querysets(query, tree)
+        return Response(self.build_suggestions(request, brand_results, product_results, tree))
+
+    @staticmethod
+    def suggest_querysets(query, tree):
         words = re.findall(r'\w+', query)
         
-        product_results = Product.objects.filter(is_active=True).select_related('category')
+        product_results = Product.objects.filter(is_active=True)
         brand_results = Brand.objects.filter(is_active=True)
         
         for word in words:
@@ -513,9 +583,7 @@ class SearchSuggestAPIView(APIView):
                 Q(name__icontains=word) | 
                 Q(description__icontains=word) | 
                 Q(search_tags__icontains=word) | # Included search tags
-                Q(category__name__icontains=word) | 
-                Q(category__parent__name__icontains=word) | 
-                Q(category__parent__parent__name__icontains=word) |
+                Q(category_id__in=tree.ids_under_name(word)) |
                 Q(sku__icontains=word)
             )
             brand_results = brand_results.filter(name__icontains=word)
@@ -532,7 +600,10 @@ class SearchSuggestAPIView(APIView):
         ).order_by('relevance')[:5]
         
         brand_results = brand_results[:3]
-        
+        return product_results, brand_results
+
+    @staticmethod
+    def build_suggestions(request, brand_results, product_results, tree):
         data = []
         
         for b in brand_results:
@@ -549,15 +620,16 @@ class SearchSuggestAPIView(APIView):
             if hasattr(p, 'image') and p.image:
                 image_url = request.build_absolute_uri(p.image)
                 
+            category = tree.get(p.category_id)
             data.append({
                 "text": p.name, 
-                "type": p.category.name if p.category else "Product", 
+                "type": category.name if category else "Product", 
                 "price": getattr(p, 'mrp', None), 
                 "image": image_url,
                 "url": f"/product.html?code={p.sku}"
             })
             
-        return Response(data)
+        return data
 
 
 class BannerListAPIView(generics.ListAPIView):
@@ -567,6 +639,10 @@ class BannerListAPIView(generics.ListAPIView):
     queryset = Banner.objects.filter(is_active=True)
     pagination_class = None
 
+    @versioned_resource(BANNERS)
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
 
 class BrandListAPIView(generics.ListAPIView):
     permission_classes = [AllowAny]
@@ -575,15 +651,24 @@ class BrandListAPIView(generics.ListAPIView):
     queryset = Brand.objects.filter(is_active=True)
     pagination_class = CategoryBrandPagination
 
+    @versioned_resource(BRANDS)
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
 
 class FlashSaleListAPIView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = [] 
 
+    # Sales drop out of the list as they expire, so ETags also roll over every minute
+    @versioned_resource(FLASH_SALES, bucket_seconds=60)
     def get(self, request):
+        return Response(FlashSaleSerializer(self.active_sales(), many=True, context={'request': request}).data)
+
+    @staticmethod
+    def active_sales():
         now = timezone.now()
-        sales = FlashSale.objects.filter(is_active=True, end_time__gt=now).select_related('product')
-        return Response(FlashSaleSerializer(sales, many=True, context={'request': request}).data)
+        return FlashSale.objects.filter(is_active=True, end_time__gt=now).select_related('product')
     
 
 class CategoryListAPIView(generics.ListAPIView):
@@ -593,4 +678,21 @@ class CategoryListAPIView(generics.ListAPIView):
     pagination_class = CategoryBrandPagination
     
     def get_queryset(self):
-        return Category.objects.filter(is_active=True).order_by('sort_order', 'name')
\ No newline at end of file
+        return Category.objects.filter(is_active=True).order_by('sort_order', 'name')
+
+    def list(self, request, *args, **kwargs):
+        # Same shape as SimpleCategorySerializer, paginated over the cached tree
+        nodes = CategoryTreeService.get_tree().active()
+        page = self.paginate_queryset(nodes)
+        data = [
+            {
+                "id": node.id,
+                "name": node.name,
+                "slug": node.slug,
+                "icon_url": node.icon or None,
+                "parent": node.parent_id,
+                "is_active": node.is_active,
+            }
+            for node in (page if page is not None else nodes)
+        ]
+        return self.get_paginated_response(data) if page is not None else Response(data)
\ No newline at end of file
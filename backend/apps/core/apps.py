@@ -5,3 +5,12 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.core"
     verbose_name = "Core Application"
+
+    def ready(self):
+        import apps.core.signals
+        from prometheus_client import REGISTRY
+        from apps.utils.pools import PoolMetricsCollector
+        try:
+            REGISTRY.register(PoolMetricsCollector())
+        except ValueError:
+            pass  # already registered (ready() ran twice)
@@ -0,0 +1,28 @@
+from adrf.views import APIView as AsyncAPIView
+from rest_framework.response import Response
+
+from .runtime_config import RuntimeConfig, MAINTENANCE_MODE, STORE_SETTINGS
+from .views import AppConfigAPIView, StoreStatusAPIView
+from apps.utils.http_cache import versioned_resource, APP_CONFIG, STORE_STATUS
+
+
+class AsyncAppConfigAPIView(AsyncAPIView, AppConfigAPIView):
+    """
+    Bootstrap config on the event loop.
+    Nothing here depends on the caller, so JWT auth (a sync user lookup) is skipped.
+    """
+    authentication_classes = []
+
+    @versioned_resource(APP_CONFIG, extra_keys=("config:maintenance_mode",))
+    async def get(self, request):
+        maintenance_mode = await RuntimeConfig.aget(MAINTENANCE_MODE)
+        return Response(self.build_payload(maintenance_mode))
+
+
+class AsyncStoreStatusAPIView(AsyncAPIView, StoreStatusAPIView):
+    authentication_classes = []
+
+    @versioned_resource(STORE_STATUS, max_age=15)
+    async def get(self, request):
+        settings_obj = await RuntimeConfig.aget(STORE_SETTINGS)
+        return Response(self.build_payload(settings_obj))
@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+
+from asgiref.sync import sync_to_async, ThreadSensitiveContext
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, AsyncRequestFactory
+
+from apps.catalog.models import Product
+from apps.catalog import views as catalog_views
+from apps.catalog import async_views as catalog_async_views
+from apps.core import views as core_views
+from apps.core import async_views as core_async_views
+
+
+ENDPOINTS = [
+    # name, path, sync view, async view, needs sku
+    ("storefront", "/api/v1/catalog/storefront/", catalog_views.StorefrontCatalogAPIView, catalog_async_views.AsyncStorefrontCatalogAPIView, False),
+    ("sku_list", "/api/v1/catalog/skus/", catalog_views.SkuListAPIView, catalog_async_views.AsyncSkuListAPIView, False),
+    ("sku_detail", "/api/v1/catalog/skus/{sku}/", catalog_views.SkuDetailAPIView, catalog_async_views.AsyncSkuDetailAPIView, True),
+    ("search", "/api/v1/catalog/search/", catalog_views.GlobalSearchAPIView, catalog_async_views.AsyncGlobalSearchAPIView, False),
+    ("suggest", "/api/v1/catalog/search/suggest/", catalog_views.SearchSuggestAPIView, catalog_async_views.AsyncSearchSuggestAPIView, False),
+    ("banners", "/api/v1/catalog/banners/", catalog_views.BannerListAPIView, catalog_async_views.AsyncBannerListAPIView, False),
+    ("flash_sales", "/api/v1/catalog/flash-sales/", catalog_views.FlashSaleListAPIView, catalog_async_views.AsyncFlashSaleListAPIView, False),
+    ("store_status", "/api/v1/core/store-status/", core_views.StoreStatusAPIView, core_async_views.AsyncStoreStatusAPIView, False),
+    ("app_config", "/api/config/", core_views.AppConfigAPIView, core_async_views.AsyncAppConfigAPIView, False),
+]
+
+
+def _render_sync(view, request, kwargs):
+    response = view(request, **kwargs)
+    response.render()
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares sync vs async catalog/config views on one event loop (= one UvicornWorker). "
+        "Both modes run the way Django's ASGIHandler runs them, inside a per-request ThreadSensitiveContext; "
+        "sync views go through sync_to_async(thread_sensitive=True) and are capped at the worker's thread "
+        "count. Middleware and throttles are not included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode")
+        parser.add_argument("--concurrency", type=int, default=50, help="In-flight requests per worker")
+        parser.add_argument(
+            "--threads", type=int,
+            # ASGI_THREADS sizes asgiref's executor; otherwise ThreadPoolExecutor's default
+            default=int(os.getenv("ASGI_THREADS") or min(32, (os.cpu_count() or 1) + 4)),
+            help="Sync view threads per worker (caps sync concurrency)",
+        )
+        parser.add_argument("--lat", type=float, help="Latitude inside a delivery zone")
+        parser.add_argument("--lng", type=float, help="Longitude inside a delivery zone")
+        parser.add_argument("--sku", help="SKU for the detail endpoint (defaults to the first active product)")
+        parser.add_argument("--query", default="milk", help="Search / suggest term")
+        parser.add_argument("--only", help="Comma separated endpoint names")
+
+    def handle(self, *args, **options):
+        sku = options["sku"] or Product.objects.filter(is_active=True).values_list("sku", flat=True).first()
+        if options["lat"] is None or options["lng"] is None:
+            self.stdout.write(self.style.WARNING("No --lat/--lng given: storefront will short-circuit as not serviceable."))
+
+        selected = set(options["only"].split(",")) if options["only"] else None
+        endpoints = [e for e in ENDPOINTS if selected is None or e[0] in selected]
+        if not sku:
+            endpoints = [e for e in endpoints if not e[4]]
+
+        self.stdout.write(
+            f"{'endpoint':<14}{'mode':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+        )
+        asyncio.run(self._run_all(endpoints, sku, options))
+
+    async def _run_all(self, endpoints, sku, options):
+        headers = {}
+        if options["lat"] is not None and options["lng"] is not None:
+            headers = {"HTTP_X_LOCATION_LAT": str(options["lat"]), "HTTP_X_LOCATION_LNG": str(options["lng"])}
+        params = {"q": options["query"]}
+
+        for name, path, sync_cls, async_cls, needs_sku in endpoints:
+            kwargs = {"id": sku} if needs_sku else {}
+            url = path.format(sku=sku)
+
+            sync_view = sync_cls.as_view(throttle_classes=[])
+            async_view = async_cls.as_view(throttle_classes=[])
+            sync_factory, async_factory = RequestFactory(), AsyncRequestFactory()
+
+            async def call_sync():
+                request = sync_factory.get(url, params, **headers)
+                async with ThreadSensitiveContext():
+                    return await sync_to_async(_render_sync, thread_sensitive=True)(sync_view, request, kwargs)
+
+            async def call_async():
+                request = async_factory.get(url, params, **headers)
+                async with ThreadSensitiveContext():
+                    response = await async_view(request, **kwargs)
+                    response.render()
+                return response
+
+            # A worker cannot run more sync views at once than it has threads
+            sync_stats = await self._measure(call_sync, options, min(options["concurrency"], options["threads"]))
+            async_stats = await self._measure(call_async, options, options["concurrency"])
+            self._report(name, "sync", sync_stats)
+            self._report(name, "async", async_stats)
+
+            if sync_stats["rps"]:
+                gain = async_stats["rps"] / sync_stats["rps"]
+                self.stdout.write(self.style.SUCCESS(f"{name:<14}x{gain:.2f} throughput per worker"))
+
+    async def _measure(self, call, options, concurrency):
+        total = options["requests"]
+
+        for _ in range(min(5, total)):
+            await call()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await call()
+                    if response.status_code >= 400:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            "rps": total / elapsed if elapsed else 0,
+            "p50": latencies[len(latencies) // 2] * 1000,
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            "errors": errors,
+        }
+
+    def _report(self, name, mode, stats):
+        self.stdout.write(
+            f"{name:<14}{mode:<7}{stats['rps']:>10.1f}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['errors']:>8}"
+        )
@@ -0,0 +1,88 @@
+import sys
+import json
+import subprocess
+from statistics import median
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules a request or a task can pull in on top of django.setup() (models, admin autodiscovery, signals)
+APP_MODULES = ("services", "views", "async_views", "serializers", "tasks", "urls")
+
+HEAVY_SDKS = ("razorpay", "boto3", "botocore", "magic", "firebase_admin", "google.auth", "twilio")
+
+# Runs in a fresh interpreter so nothing is already in sys.modules
+PROBE = """
+import sys, json, time, importlib, importlib.util
+
+targets, sdks = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+started = time.perf_counter()
+import django
+django.setup()
+setup_ms = (time.perf_counter() - started) * 1000
+setup_sdks = [m for m in sdks if m in sys.modules]
+
+started = time.perf_counter()
+for name in targets:
+    if importlib.util.find_spec(name) is not None:
+        importlib.import_module(name)
+import_ms = (time.perf_counter() - started) * 1000
+
+print(json.dumps({
+    "setup_ms": setup_ms,
+    "import_ms": import_ms,
+    "setup_sdks": setup_sdks,
+    "sdks": [m for m in sdks if m in sys.modules and m not in setup_sdks],
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Cold-start import cost per app. Every sample is a fresh interpreter: django.setup() first "
+        "(shared by all rows), then the app's services/views/tasks/... modules, so the time includes "
+        "everything they import across apps. 'web' imports the URLconf the way a gunicorn worker does, "
+        "'worker' every tasks module the way a Celery child does. Also lists which heavy SDKs each row "
+        "loads at import time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per row (median is reported)")
+        parser.add_argument("--only", help="Comma separated app labels (web and worker rows are always included)")
+
+    def handle(self, *args, **options):
+        local_apps = [config for config in apps.get_app_configs() if config.name.startswith("apps.")]
+        selected = set(options["only"].split(",")) if options["only"] else None
+
+        rows = [
+            ("web", [settings.ROOT_URLCONF]),
+            ("worker", [f"{config.name}.tasks" for config in local_apps]),
+        ]
+        rows += [
+            (config.label, [f"{config.name}.{module}" for module in APP_MODULES])
+            for config in local_apps
+            if selected is None or config.label in selected
+        ]
+
+        self.stdout.write(f"{'app':<16}{'setup ms':>10}{'import ms':>11}  sdks loaded")
+        setup_sdks = None
+        for label, targets in rows:
+            samples = [self._probe(targets) for _ in range(max(1, options["repeat"]))]
+            setup_ms = median(s["setup_ms"] for s in samples)
+            import_ms = median(s["import_ms"] for s in samples)
+            sdks = ", ".join(samples[0]["sdks"]) or "-"
+            setup_sdks = samples[0]["setup_sdks"]
+            self.stdout.write(f"{label:<16}{setup_ms:>10.1f}{import_ms:>11.1f}  {sdks}")
+
+        if setup_sdks:
+            self.stdout.write(self.style.WARNING(f"django.setup() itself loads: {', '.join(setup_sdks)}"))
+
+    def _probe(self, targets):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE, json.dumps(targets), json.dumps(HEAVY_SDKS)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Import probe failed for {targets[0]}:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
@@ -0,0 +1,143 @@
+import io
+import re
+import json
+import time
+import logging
+
+from django.core.management.base import BaseCommand
+
+from apps.utils.logging import GDPRJsonFormatter, NonBlockingQueueHandler
+
+
+class LegacyGDPRJsonFormatter(logging.Formatter):
+    """The formatter before key-based masking (baseline only): json.dumps, then six regexes over the whole line."""
+
+    SENSITIVE_PATTERNS = {
+        r'"password":\s*".*?"': '"password": "***MASKED***"',
+        r'"token":\s*".*?"': '"token": "***MASKED***"',
+        r'"access_token":\s*".*?"': '"access_token": "***MASKED***"',
+        r'"refresh_token":\s*".*?"': '"refresh_token": "***MASKED***"',
+        r'"credit_card":\s*".*?"': '"credit_card": "***MASKED***"',
+        r'"phone":\s*"\+?(\d{2,4})\d{6,}"': r'"phone": "\1******"',
+    }
+
+    SENSITIVE_KEYS = {'password', 'token', 'access', 'refresh', 'credit_card', 'secret', 'key', 'otp'}
+
+    def format(self, record):
+        log_record = {
+            "timestamp": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "path": record.pathname,
+            "line_no": record.lineno,
+            "correlation_id": getattr(record, "correlation_id", "N/A"),
+        }
+        if hasattr(record, "metadata") and isinstance(record.metadata, dict):
+            log_record["metadata"] = self._recursive_scrub(record.metadata)
+        json_output = json.dumps(log_record, default=str)
+        for pattern, replacement in self.SENSITIVE_PATTERNS.items():
+            json_output = re.sub(pattern, replacement, json_output)
+        return json_output
+
+    def _recursive_scrub(self, data, depth=0):
+        if depth > 10:
+            return "[MAX_DEPTH_EXCEEDED]"
+        if isinstance(data, dict):
+            return {
+                k: ("***MASKED***" if str(k).lower() in self.SENSITIVE_KEYS and isinstance(v, (str, int))
+                    else self._recursive_scrub(v, depth + 1))
+                for k, v in data.items()
+            }
+        elif isinstance(data, list):
+            return [self._recursive_scrub(i, depth + 1) for i in data]
+        return data
+
+
+class SlowStream(io.StringIO):
+    """Stands in for a congested stdout / log pipe."""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().write(text)
+
+
+def _records():
+    make = logging.makeLogRecord
+    return [
+        make({"name": "apps.notifications.services", "levelno": logging.INFO, "levelname": "INFO",
+              "msg": " [DEV OTP] Phone: %s | Code : %s", "args": ("+919876543210", "482913")}),
+        make({"name": "apps.notifications.tasks", "levelno": logging.INFO, "levelname": "INFO",
+              "msg": "[FCM] Multicast sent to 3 tokens. Success: 3, Failure: 0"}),
+        make({"name": "apps.orders.services", "levelno": logging.INFO, "levelname": "INFO",
+              "msg": "Order 18231 confirmed", "correlation_id": "3f2a9c1e",
+              "metadata": {"order_id": 18231, "phone": "+919876543210", "amount": "349.00",
+                           "items": [{"sku": "MILK-1L", "qty": 2}, {"sku": "BREAD-WW", "qty": 1}]}}),
+        make({"name": "apps.payments.views", "levelno": logging.WARNING, "levelname": "WARNING",
+              "msg": "Webhook Signature Mismatch",
+              "metadata": {"event": "payment.captured", "token": "tok_abc", "payment": {"id": "pay_X1", "password": "x"}}}),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Log pipeline throughput: legacy GDPRJsonFormatter (json + six whole-line regexes) vs the "
+        "key-based formatter, and the caller-side cost of a log call with a direct StreamHandler vs "
+        "NonBlockingQueueHandler (the request thread only enqueues)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=50000, help="Records formatted per formatter")
+        parser.add_argument("--calls", type=int, default=2000, help="Log calls per handler")
+        parser.add_argument("--write-latency-ms", type=float, default=0.2, help="Simulated cost of one write to the log sink")
+
+    def handle(self, *args, **options):
+        records = _records()
+
+        self.stdout.write(f"{'formatter':<12}{'records/s':>12}{'us/record':>11}")
+        rates = {}
+        for label, formatter in (("legacy", LegacyGDPRJsonFormatter()), ("key-based", GDPRJsonFormatter())):
+            rates[label] = self._format_rate(formatter, records, options["records"])
+            self.stdout.write(f"{label:<12}{rates[label]:>12,.0f}{1e6 / rates[label]:>11.2f}")
+        self.stdout.write(self.style.SUCCESS(f"x{rates['key-based'] / rates['legacy']:.2f} formatter throughput"))
+
+        latency = options["write_latency_ms"] / 1000
+        direct = logging.StreamHandler(SlowStream(latency))
+        direct.setFormatter(LegacyGDPRJsonFormatter())
+        queued = NonBlockingQueueHandler(stream=SlowStream(latency), queue_size=options["calls"] + 1)
+
+        self.stdout.write(f"\n{'handler':<12}{'us/call':>11}{'p99 us':>10}")
+        for label, handler in (("direct", direct), ("queue", queued)):
+            per_call = self._call_cost(handler, records, options["calls"])
+            self.stdout.write(f"{label:<12}{per_call[0]:>11.1f}{per_call[1]:>10.1f}")
+        queued.close()
+        if queued.dropped:
+            self.stdout.write(self.style.WARNING(f"queue handler dropped {queued.dropped} records"))
+
+    def _format_rate(self, formatter, records, count):
+        started = time.perf_counter()
+        for i in range(count):
+            formatter.format(records[i % len(records)])
+        return count / (time.perf_counter() - started)
+
+    def _call_cost(self, handler, records, count):
+        logger = logging.getLogger(f"benchmark_logging.{id(handler)}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+
+        timings = []
+        for i in range(count):
+            record = records[i % len(records)]
+            started = time.perf_counter()
+            logger.log(record.levelno, record.msg, *(record.args or ()), extra={"metadata": getattr(record, "metadata", None)})
+            timings.append(time.perf_counter() - started)
+
+        logger.removeHandler(handler)
+        timings.sort()
+        return sum(timings) / count * 1e6, timings[int(count * 0.99) - 1] * 1e6
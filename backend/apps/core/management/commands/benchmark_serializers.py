@@ -0,0 +1,125 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from apps.catalog.models import Product
+from apps.catalog.serializers import ProductSerializer, ProductValuesSerializer
+from apps.inventory.services import InventoryService
+from apps.orders.models import Cart, Order
+from apps.orders.serializers import (
+    CartSerializer, CartValuesSerializer, OrderListSerializer, OrderListValuesSerializer,
+)
+from apps.utils.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "CPU per response for the list payloads: ModelSerializer + JSONRenderer (before) vs "
+        "ValuesSerializer + ORJSONRenderer (after). Covers the query, serialization and "
+        "rendering of one response; process time excludes time spent waiting on Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Responses per case and path")
+        parser.add_argument("--products", type=int, default=24, help="Products per response (storefront renders 4 x 6)")
+        parser.add_argument("--orders", type=int, default=20, help="Orders per response (MyOrders page size)")
+        parser.add_argument("--only", help="Comma separated case names: products, orders, cart")
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/")
+        cases = self._cases(request, options)
+        selected = set(options["only"].split(",")) if options["only"] else None
+
+        self.stdout.write(
+            f"{'case':<10}{'path':<8}{'cpu ms':>10}{'wall ms':>10}{'queries':>9}{'bytes':>9}"
+        )
+        for name, before, after in cases:
+            if selected is not None and name not in selected:
+                continue
+
+            before_stats = self._measure(before, options["iterations"])
+            after_stats = self._measure(after, options["iterations"])
+            self._report(name, "before", before_stats)
+            self._report(name, "after", after_stats)
+
+            if json.loads(before_stats["body"]) != json.loads(after_stats["body"]):
+                self.stdout.write(self.style.ERROR(f"{name:<10}payloads differ"))
+            elif after_stats["cpu"]:
+                gain = before_stats["cpu"] / after_stats["cpu"]
+                self.stdout.write(self.style.SUCCESS(f"{name:<10}x{gain:.2f} less CPU per response, identical payload"))
+
+    def _cases(self, request, options):
+        cases = []
+
+        products = Product.objects.filter(is_active=True).order_by("id")
+        if products.exists():
+            size = options["products"]
+            etas = InventoryService.get_delivery_etas(list(products.values_list("sku", flat=True)[:size]))
+
+            def products_before():
+                data = ProductSerializer(list(products[:size]), many=True, context={"request": request, "eta_map": etas}).data
+                return JSONRenderer().render(data)
+
+            def products_after():
+                serializer = ProductValuesSerializer({"request": request, "eta_map": etas})
+                return ORJSONRenderer().render(serializer.serialize(serializer.values(products)[:size]))
+
+            cases.append(("products", products_before, products_after))
+
+        user_id = Order.objects.filter(user__isnull=False).values_list("user_id", flat=True).first()
+        if user_id:
+            orders = Order.objects.filter(user_id=user_id).order_by("-created_at")
+            size = options["orders"]
+
+            def orders_before():
+                return JSONRenderer().render(OrderListSerializer(list(orders[:size]), many=True).data)
+
+            def orders_after():
+                serializer = OrderListValuesSerializer()
+                return ORJSONRenderer().render(serializer.serialize(serializer.values(orders)[:size]))
+
+            cases.append(("orders", orders_before, orders_after))
+
+        cart = Cart.objects.filter(items__isnull=False).select_related("warehouse").first()
+        if cart:
+            def cart_before():
+                return JSONRenderer().render(CartSerializer(cart, context={"request": request}).data)
+
+            def cart_after():
+                return ORJSONRenderer().render(CartValuesSerializer({"request": request}).serialize_cart(cart))
+
+            cases.append(("cart", cart_before, cart_after))
+
+        if not cases:
+            self.stdout.write(self.style.WARNING("No products, orders or carts to benchmark."))
+        return cases
+
+    def _measure(self, call, iterations):
+        for _ in range(min(3, iterations)):
+            call()
+
+        with CaptureQueriesContext(connection) as queries:
+            body = call()
+
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for _ in range(iterations):
+            call()
+        cpu = time.process_time() - cpu_started
+        wall = time.perf_counter() - wall_started
+
+        return {
+            "cpu": cpu / iterations * 1000,
+            "wall": wall / iterations * 1000,
+            "queries": len(queries),
+            "body": body,
+        }
+
+    def _report(self, name, path, stats):
+        self.stdout.write(
+            f"{name:<10}{path:<8}{stats['cpu']:>10.2f}{stats['wall']:>10.2f}{stats['queries']:>9}{len(stats['body']):>9}"
+        )
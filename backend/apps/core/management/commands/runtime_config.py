@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.runtime_config import RuntimeConfig, FLAG_KEYS
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows or flips the runtime flags (kill_switch, maintenance_mode). Flipping publishes the "
+        "change so every web process picks it up at once instead of after RUNTIME_CONFIG_TTL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("flag", nargs="?", choices=sorted(FLAG_KEYS))
+        parser.add_argument("state", nargs="?", choices=("on", "off"))
+
+    def handle(self, *args, **options):
+        flag, state = options["flag"], options["state"]
+        if flag and state:
+            RuntimeConfig.set_flag(flag, state == "on")
+            self.stdout.write(self.style.SUCCESS(f"{flag} turned {state}"))
+            return
+
+        for name in ([flag] if flag else sorted(FLAG_KEYS)):
+            self.stdout.write(f"{name}: {'on' if RuntimeConfig.get(name) else 'off'}")
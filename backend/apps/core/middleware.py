@@ -1,12 +1,14 @@
 import uuid
 import logging
 from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
-from django.core.cache import cache
 from django.contrib.gis.geos import Point
 from django.conf import settings
 
+from .runtime_config import RuntimeConfig, KILL_SWITCH
+
 logger = logging.getLogger(__name__)
 
 _correlation_id = ContextVar("correlation_id", default=None)
@@ -15,10 +17,18 @@ def get_correlation_id():
     return _correlation_id.get()
 
 class CorrelationIDMiddleware:
+    # Dual-mode so async views are not forced back onto a thread under ASGI.
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         request_id = request.headers.get('X-Request-ID') or str(uuid.uuid4())
         token = _correlation_id.set(request_id)
         request.correlation_id = request_id
@@ -27,22 +37,51 @@ class CorrelationIDMiddleware:
         finally:
             _correlation_id.reset(token)
 
+    async def __acall__(self, request):
+        request_id = request.headers.get('X-Request-ID') or str(uuid.uuid4())
+        token = _correlation_id.set(request_id)
+        request.correlation_id = request_id
+        try:
+            return await self.get_response(request)
+        finally:
+            _correlation_id.reset(token)
+
 class GlobalKillSwitchMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         if request.method in ["POST", "PUT", "PATCH", "DELETE"]:
             try:
-                if cache.get("config:kill_switch:active"):
-                    return JsonResponse(
-                        {"error": {"code": "maintenance_mode", "message": "System maintenance."}}, 
-                        status=503
-                    )
+                if RuntimeConfig.get(KILL_SWITCH):
+                    return self._maintenance_response()
             except Exception:
                 return JsonResponse({"error": "System error"}, status=503)
         return self.get_response(request)
 
+    async def __acall__(self, request):
+        if request.method in ["POST", "PUT", "PATCH", "DELETE"]:
+            try:
+                if await RuntimeConfig.aget(KILL_SWITCH):
+                    return self._maintenance_response()
+            except Exception:
+                return JsonResponse({"error": "System error"}, status=503)
+        return await self.get_response(request)
+
+    @staticmethod
+    def _maintenance_response():
+        return JsonResponse(
+            {"error": {"code": "maintenance_mode", "message": "System maintenance."}}, 
+            status=503
+        )
+
 class LocationContextMiddleware(MiddlewareMixin):
     """
     Resolves Serviceable Warehouse based on Headers for the Mobile App/Frontend.
@@ -77,4 +116,43 @@ class LocationContextMiddleware(MiddlewareMixin):
     def _resolve_warehouse(self, lat, lng):
         from apps.warehouse.models import Warehouse
         point = Point(float(lng), float(lat), srid=4326)
-        return Warehouse.objects.filter(delivery_zone__contains=point, is_active=True).first()
\ No newline at end of file
+        return Warehouse.objects.filter(delivery_zone__contains=point, is_active=True).first()
+
+    async def __acall__(self, request):
+        # MiddlewareMixin would run process_request through sync_to_async; resolve on the loop instead.
+        await self.aprocess_request(request)
+        return await self.get_response(request)
+
+    async def aprocess_request(self, request):
+        request.warehouse = None
+        request.user_coords = None
+
+        lat = request.headers.get('X-Location-Lat')
+        lng = request.headers.get('X-Location-Lng')
+        address_id = request.headers.get('X-Address-ID')
+
+        if address_id:
+            user = await request.auser()
+            if user.is_authenticated:
+                from apps.customers.models import CustomerAddress
+                try:
+                    address = await CustomerAddress.objects.aget(id=address_id, customer__user=user)
+                    request.user_coords = (address.latitude, address.longitude)
+                    request.warehouse = await self._aresolve_warehouse(address.latitude, address.longitude)
+                    return
+                except CustomerAddress.DoesNotExist:
+                    pass
+
+        if lat and lng:
+            try:
+                lat = float(lat)
+                lng = float(lng)
+                request.user_coords = (lat, lng)
+                request.warehouse = await self._aresolve_warehouse(lat, lng)
+            except (ValueError, TypeError):
+                pass
+
+    async def _aresolve_warehouse(self, lat, lng):
+        from apps.warehouse.models import Warehouse
+        point = Point(float(lng), float(lat), srid=4326)
+        return await Warehouse.objects.filter(delivery_zone__contains=point, is_active=True).afirst()
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Runtime configuration read on the request path, held per process.
+
+- kill_switch / maintenance_mode: flags in the cache (config:kill_switch:active,
+  config:maintenance_mode), flipped by ops with `manage.py runtime_config`
+- store_settings: the StoreSettings row
+- delivery_pricing: (delivery_fee, free_delivery_threshold) from OrderConfiguration
+
+A value is loaded on first use and kept for RUNTIME_CONFIG_TTL seconds. Writers
+call RuntimeConfig.invalidate() (the model signals do, after commit), which
+publishes on the `runtime_config` channel; a listener thread in every process
+drops its copies as soon as the message arrives. The TTL only bounds staleness
+when a message is missed (listener reconnecting, a flag written to Redis by hand).
+"""
+import os
+import time
+import logging
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.utils.pools import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "runtime_config"
+ALL = "*"
+
+KILL_SWITCH = "kill_switch"
+MAINTENANCE_MODE = "maintenance_mode"
+STORE_SETTINGS = "store_settings"
+DELIVERY_PRICING = "delivery_pricing"
+
+FLAG_KEYS = {
+    KILL_SWITCH: "config:kill_switch:active",
+    MAINTENANCE_MODE: "config:maintenance_mode",
+}
+
+DEFAULT_DELIVERY_PRICING = (Decimal("5.00"), Decimal("100.00"))
+
+RECONNECT_DELAY = 1
+
+_lock = threading.Lock()
+_entries = {}  # name -> (value, expires_at)
+_state = {"generation": 0, "listener_pid": None}
+
+
+def _load_store_settings():
+    from .models import StoreSettings
+    return StoreSettings.load()
+
+
+async def _aload_store_settings():
+    from .models import StoreSettings
+    settings_obj, created = await StoreSettings.objects.aget_or_create(pk=1)
+    return settings_obj
+
+
+def _pricing_query():
+    from apps.orders.models import OrderConfiguration
+    return OrderConfiguration.objects.values_list('delivery_fee', 'free_delivery_threshold')
+
+
+def _load_delivery_pricing():
+    return _pricing_query().first() or DEFAULT_DELIVERY_PRICING
+
+
+async def _aload_delivery_pricing():
+    return await _pricing_query().afirst() or DEFAULT_DELIVERY_PRICING
+
+
+def _flag_loaders(key):
+    def load():
+        return cache.get(key, False)
+
+    async def aload():
+        return await cache.aget(key, False)
+
+    return load, aload
+
+
+LOADERS = {
+    KILL_SWITCH: _flag_loaders(FLAG_KEYS[KILL_SWITCH]),
+    MAINTENANCE_MODE: _flag_loaders(FLAG_KEYS[MAINTENANCE_MODE]),
+    STORE_SETTINGS: (_load_store_settings, _aload_store_settings),
+    DELIVERY_PRICING: (_load_delivery_pricing, _aload_delivery_pricing),
+}
+
+
+def _drop(name):
+    """Forgets `name` (or everything); a load already in flight will not store its result."""
+    with _lock:
+        _state["generation"] += 1
+        if name == ALL:
+            _entries.clear()
+        else:
+            _entries.pop(name, None)
+
+
+def _listen():
+    while True:
+        try:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            # Whatever was published while unsubscribed is lost
+            _drop(ALL)
+            while True:
+                message = pubsub.get_message(timeout=30)
+                if message is not None:
+                    _drop(message["data"])
+        except Exception as e:
+            logger.warning(f"Runtime config listener disconnected, relying on TTL: {e}")
+            time.sleep(RECONNECT_DELAY)
+
+
+class RuntimeConfig:
+
+    @staticmethod
+    def _cached(name):
+        entry = _entries.get(name)
+        if entry is not None and entry[1] > time.monotonic():
+            return True, entry[0]
+        return False, None
+
+    @staticmethod
+    def _store(name, value, generation):
+        with _lock:
+            if generation == _state["generation"]:
+                _entries[name] = (value, time.monotonic() + settings.RUNTIME_CONFIG_TTL)
+
+    @staticmethod
+    def _ensure_listener():
+        # Per process: the thread does not survive a fork (gunicorn --preload, Celery prefork)
+        if _state["listener_pid"] == os.getpid() or not settings.REDIS_URL:
+            return
+        with _lock:
+            if _state["listener_pid"] == os.getpid():
+                return
+            _state["listener_pid"] = os.getpid()
+            threading.Thread(target=_listen, name="runtime-config-listener", daemon=True).start()
+
+    @staticmethod
+    def get(name):
+        hit, value = RuntimeConfig._cached(name)
+        if hit:
+            return value
+        RuntimeConfig._ensure_listener()
+        generation = _state["generation"]
+        value = LOADERS[name][0]()
+        RuntimeConfig._store(name, value, generation)
+        return value
+
+    @staticmethod
+    async def aget(name):
+        hit, value = RuntimeConfig._cached(name)
+        if hit:
+            return value
+        RuntimeConfig._ensure_listener()
+        generation = _state["generation"]
+        value = await LOADERS[name][1]()
+        RuntimeConfig._store(name, value, generation)
+        return value
+
+    @staticmethod
+    def delivery_fee(total):
+        fee, threshold = RuntimeConfig.get(DELIVERY_PRICING)
+        return Decimal("0.00") if total >= threshold else fee
+
+    @staticmethod
+    def invalidate(*names):
+        """Drops the values here and in every other process. Never raises: a failed publish must not fail the write."""
+        for name in names:
+            _drop(name)
+            if not settings.REDIS_URL:
+                continue
+            try:
+                get_redis_client().publish(CHANNEL, name)
+            except Exception as e:
+                logger.error(f"Runtime config invalidation not published for {name}: {e}")
+
+    @staticmethod
+    def invalidate_on_commit(*names):
+        transaction.on_commit(lambda: RuntimeConfig.invalidate(*names))
+
+    @staticmethod
+    def set_flag(name, value):
+        cache.set(FLAG_KEYS[name], value, timeout=None)
+        RuntimeConfig.invalidate(name)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import StoreSettings
+from .runtime_config import RuntimeConfig, STORE_SETTINGS
+from apps.utils.http_cache import bump_version_on_commit, STORE_STATUS
+
+
+@receiver(post_save, sender=StoreSettings)
+@receiver(post_delete, sender=StoreSettings)
+def bump_store_status_etags(sender, instance, **kwargs):
+    bump_version_on_commit(STORE_STATUS)
+    RuntimeConfig.invalidate_on_commit(STORE_SETTINGS)
@@ -1,55 +1,110 @@
+import time
 import logging
 import redis
 from celery import shared_task
-from django.conf import settings
 from django.core.cache import cache
+from django.db.models import F, Sum
 from django.utils import timezone
 from datetime import timedelta
 
 from apps.inventory.models import InventoryItem
-from apps.inventory.services import InventoryService
+from apps.inventory.services import InventoryService, r as redis_client
 from apps.orders.models import Order
+from apps.warehouse.models import Warehouse
 
 logger = logging.getLogger(__name__)
 
 @shared_task
-def reconcile_inventory_redis_db():
+def reconcile_inventory_redis_db(chunk_size=1000):
     """
     Self-Healing: Periodic Sync between DB (Source of Truth) and Redis (Cache).
-    Iterates over tracked inventory keys to fix drift.
+    Streams one SUM(available) per SKU for each warehouse, MGETs the matching
+    cache keys chunk by chunk and only rewrites the ones that drifted.
+    Missing keys are left for lazy hydration.
     """
-    try:
-        r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
-    except Exception as e:
-        logger.error(f"Skipping Reconciliation: Redis unavailable ({e})")
+    if not redis_client:
+        logger.error("Skipping Reconciliation: Redis unavailable")
         return
 
-    inventory_set_key = "active_inventory_keys"
-    
-    for key in r.sscan_iter(inventory_set_key, count=100):
+    started = time.monotonic()
+    metrics = {"warehouses": 0, "checked": 0, "missing": 0, "drifted": 0, "fenced": 0}
+
+    for warehouse_id in Warehouse.objects.values_list("id", flat=True).order_by("id"):
         try:
-            key_str = str(key)
-            parts = key_str.split(':')
-            if len(parts) < 3:
-                r.srem(inventory_set_key, key)
-                continue
-                
-            warehouse_id = parts[1].replace('{wh_', '').replace('}', '')
-            sku = parts[2]
-            
-            item = InventoryItem.objects.filter(
-                sku=sku,
-                bin__rack__aisle__zone__warehouse_id=warehouse_id
-            ).first()
-            
-            if item:
-                InventoryService._sync_redis_stock(item.id)
-            else:
-                r.delete(key_str)
-                r.srem(inventory_set_key, key)
-                
-        except Exception as e:
-            logger.error(f"Reconciliation error for {key}: {e}")
+            # Counters the consumer moved past this point already carry changes newer than our read
+            observed = InventoryService.stock_stream_position()
+        except redis.RedisError as e:
+            logger.error(f"Reconciliation error for warehouse {warehouse_id}: {e}")
+            continue
+        rows = (
+            InventoryItem.objects
+            .filter(bin__rack__aisle__zone__warehouse_id=warehouse_id)
+            .values("sku")
+            .annotate(available=Sum(F("total_stock") - F("reserved_stock")))
+            .order_by("sku")
+            .iterator(chunk_size=chunk_size)
+        )
+        metrics["warehouses"] += 1
+
+        for chunk in _chunked(rows, chunk_size):
+            try:
+                _reconcile_chunk(warehouse_id, chunk, observed, metrics)
+            except redis.RedisError as e:
+                logger.error(f"Reconciliation error for warehouse {warehouse_id}: {e}")
+
+    metrics["seconds"] = round(time.monotonic() - started, 2)
+    logger.info(
+        f"Inventory reconciliation: {metrics['checked']} keys checked across "
+        f"{metrics['warehouses']} warehouses, {metrics['drifted']} drifted, "
+        f"{metrics['fenced']} left to the stock consumer, "
+        f"{metrics['missing']} not cached ({metrics['seconds']}s)"
+    )
+    return metrics
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for row in iterable:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _reconcile_chunk(warehouse_id, rows, observed, metrics):
+    """
+    Repairs drifted counters with a fenced SET: a counter whose consumer fence is
+    past `observed` (the stream position taken before the DB read) already
+    carries a change our read may not include and is skipped, so a repair never rolls back a later change.
+    """
+    keys = [InventoryService._get_cache_key(warehouse_id, row["sku"]) for row in rows]
+    cached_values = redis_client.mget(keys)
+
+    fenced_set = redis_client.register_script(InventoryService.FENCED_SET_LUA)
+    pipe = redis_client.pipeline(transaction=False)
+    repairs = 0
+    for key, row, cached in zip(keys, rows, cached_values):
+        metrics["checked"] += 1
+        if cached is None:
+            metrics["missing"] += 1
+            continue
+        expected = max(row["available"] or 0, 0)
+        if int(cached) != expected:
+            fenced_set(
+                keys=[key, InventoryService._get_fence_key(warehouse_id, row["sku"])],
+                args=[expected, InventoryService.INVENTORY_TTL, observed],
+                client=pipe,
+            )
+            repairs += 1
+    if not repairs:
+        return
+    for outcome in pipe.execute():
+        if outcome == 1:
+            metrics["drifted"] += 1
+        elif outcome == 0:
+            metrics["fenced"] += 1
 
 @shared_task
 def monitor_stuck_orders():
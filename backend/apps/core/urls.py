@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import StoreStatusAPIView, AdminWarehouseSelectView, SetAdminWarehouseView
+from .views import AdminWarehouseSelectView, SetAdminWarehouseView
+from .async_views import AsyncStoreStatusAPIView
 
 urlpatterns = [
-    path('store-status/', StoreStatusAPIView.as_view(), name='store-status'),
+    path('store-status/', AsyncStoreStatusAPIView.as_view(), name='store-status'),
     
     # # Core Admin Warehouse Flow
     # path('admin-select-warehouse/', AdminWarehouseSelectView.as_view(), name='admin_select_warehouse'),
@@ -12,8 +12,9 @@ from django.shortcuts import redirect
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib import messages
 
-from .models import StoreSettings
+from .runtime_config import RuntimeConfig, MAINTENANCE_MODE, STORE_SETTINGS
 from apps.warehouse.models import Warehouse
+from apps.utils.http_cache import versioned_resource, APP_CONFIG, STORE_STATUS
 
 logger = logging.getLogger(__name__)
 
@@ -71,10 +72,14 @@ class AppConfigAPIView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @versioned_resource(APP_CONFIG, extra_keys=("config:maintenance_mode",))
     def get(self, request):
-        maintenance_mode = cache.get("config:maintenance_mode", False)
-        
-        return Response({
+        maintenance_mode = RuntimeConfig.get(MAINTENANCE_MODE)
+        return Response(self.build_payload(maintenance_mode))
+
+    @staticmethod
+    def build_payload(maintenance_mode):
+        return {
             "maintenance_mode": maintenance_mode,
             "keys": {
                 "google_maps": getattr(settings, "GOOGLE_MAPS_KEY", ""),
@@ -95,18 +100,24 @@ class AppConfigAPIView(APIView):
                 "phone": "+919999999999",
                 "email": "support@quickdash.com"
             }
-        })
+        }
     
 
 class StoreStatusAPIView(APIView):
     permission_classes = [AllowAny]
 
+    # Short max-age: opening/closing the store should reach clients within seconds
+    @versioned_resource(STORE_STATUS, max_age=15)
     def get(self, request):
-        settings_obj, created = StoreSettings.objects.get_or_create(pk=1)
-        return Response({
+        settings_obj = RuntimeConfig.get(STORE_SETTINGS)
+        return Response(self.build_payload(settings_obj))
+
+    @staticmethod
+    def build_payload(settings_obj):
+        return {
             'is_store_open': settings_obj.is_store_open,
             'store_closed_message': settings_obj.store_closed_message
-        })
+        }
 
 
 # --- ENTERPRISE ADMIN WAREHOUSE SELECTION VIEWS ---
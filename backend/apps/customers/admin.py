@@ -11,6 +11,7 @@ from import_export import resources, fields, widgets
 from import_export.admin import ImportExportModelAdmin
 
 from .models import CustomerProfile, CustomerAddress, SupportTicket
+from apps.utils.db_router import ReplicaChangeListMixin
 
 User = get_user_model()
 
@@ -57,7 +58,7 @@ class CustomerAddressInline(admin.StackedInline):
 
 
 @admin.register(CustomerProfile)
-class CustomerProfileAdmin(ImportExportModelAdmin):
+class CustomerProfileAdmin(ReplicaChangeListMixin, ImportExportModelAdmin):
     """UPGRADED: Full Access to Master Admin, No Warehouse Scoping"""
     resource_class = CustomerProfileResource
     
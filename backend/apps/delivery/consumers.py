@@ -4,7 +4,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from apps.orders.models import Order
-from django_redis import get_redis_connection
+from apps.utils.pools import get_async_redis_client
 
 User = get_user_model()
 
@@ -22,11 +22,8 @@ class LiveTrackingConsumer(AsyncWebsocketConsumer):
             await self.close(code=4003)
             return
 
-        conn = get_redis_connection("default")
-        user_id = await database_sync_to_async(conn.eval)(
-            "local v = redis.call('get', KEYS[1]) redis.call('del', KEYS[1]) return v",
-            1, f"ws_ticket:{ticket}"
-        )
+        # One-time ticket: GETDEL on the shared async pool, no thread hop.
+        user_id = await get_async_redis_client().getdel(f"ws_ticket:{ticket}")
         
         if not user_id:
             await self.close(code=4003)
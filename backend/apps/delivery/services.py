@@ -1,8 +1,5 @@
 import secrets
 import logging
-import boto3
-import magic  
-from botocore.exceptions import ClientError
 from django.db import transaction, models
 from django.core.exceptions import ValidationError
 from django.conf import settings
@@ -13,6 +10,8 @@ from apps.notifications.services import NotificationService
 from apps.audit.services import AuditService
 from apps.orders.models import Order
 from apps.delivery.models import Delivery
+from apps.utils.clients import get_s3_client, detect_mime_type
+from apps.utils.resilience import s3_breaker, CircuitBreakerOpenException
 from apps.utils.exceptions import BusinessLogicException
 
 logger = logging.getLogger(__name__)
@@ -38,7 +37,11 @@ class StorageService:
         if file_type not in ALLOWED_TYPES:
             raise BusinessLogicException("Unsupported file type")
 
-        s3_client = boto3.client('s3')
+        from botocore.exceptions import ClientError
+
+        s3_client = get_s3_client()
+        if s3_client is None:
+            raise BusinessLogicException("Storage service unavailable")
         object_name = f"proofs/order_{order_id}_{secrets.token_hex(4)}"
         
         try:
@@ -70,25 +73,31 @@ class StorageService:
              if settings.DEBUG: return
              raise BusinessLogicException("Storage configuration missing")
 
-        s3_client = boto3.client('s3')
+        from botocore.exceptions import ClientError
+
+        s3_client = get_s3_client()
+        if s3_client is None:
+            raise BusinessLogicException("Storage service unavailable")
         try:
-            head_response = s3_client.head_object(Bucket=bucket_name, Key=key)
+            head_response = s3_breaker.call(s3_client.head_object, Bucket=bucket_name, Key=key)
             
             if head_response['ContentLength'] < 100:
                 raise BusinessLogicException("File too small or empty")
             
             
-            response = s3_client.get_object(Bucket=bucket_name, Key=key, Range='bytes=0-2048')
+            response = s3_breaker.call(s3_client.get_object, Bucket=bucket_name, Key=key, Range='bytes=0-2048')
             file_header = response['Body'].read()
             
-            mime_type = magic.from_buffer(file_header, mime=True)
+            mime_type = detect_mime_type(file_header)
             allowed_types = ['image/jpeg', 'image/png', 'image/webp', 'application/pdf']
             
             if mime_type not in allowed_types:
                 logger.critical(f"Security Alert: Malicious file upload attempt. Detected: {mime_type}, Key: {key}")
-                s3_client.delete_object(Bucket=bucket_name, Key=key)
+                s3_breaker.call(s3_client.delete_object, Bucket=bucket_name, Key=key)
                 raise BusinessLogicException(f"Invalid file content. Detected {mime_type}, expected image/pdf.")
 
+        except CircuitBreakerOpenException:
+            raise BusinessLogicException("Storage service unavailable")
         except ClientError as e:
             error_code = e.response.get("Error", {}).get("Code")
             if error_code == "404":
@@ -271,21 +280,7 @@ class DeliveryService:
         order.status = "delivered"
         order.save(update_fields=["status"])
 
-     
-        for item in order.items.all():
-            from apps.inventory.models import InventoryItem
-         
-            inv_item = InventoryItem.objects.filter(
-                sku=item.sku, 
-                bin__rack__aisle__zone__warehouse=order.warehouse
-            ).first()
-            
-            if inv_item:
-                InventoryService.commit_stock(
-                    item=inv_item,
-                    quantity=item.quantity,
-                    reference=f"sold_order_{order.id}"
-                )
+        InventoryService.commit_stock_for_order(order, reference=f"sold_order_{order.id}")
 
         from apps.riders.services import RiderService
         RiderService.add_earning(
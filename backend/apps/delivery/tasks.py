@@ -14,7 +14,6 @@ logger = logging.getLogger(__name__)
     bind=True,
     max_retries=10,
     default_retry_delay=30,
-    queue='high_priority' 
 )
 def retry_auto_assign_rider(self, order_id):
     """
@@ -95,7 +94,7 @@ def assign_rider_to_order(self, order_id):
         raise self.retry(exc=exc)
 
 
-@shared_task(queue='low_priority')
+@shared_task
 def periodic_assign_unassigned_orders():
     """
     Safety Net: Har 5-10 minute main chalega.
@@ -1,7 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.throttling import ScopedRateThrottle
+from apps.utils.throttling import LocationPingThrottle
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from channels.layers import get_channel_layer
@@ -107,8 +107,7 @@ class RiderLocationPingAPIView(APIView):
     Rider: High-frequency GPS updates.
     """
     permission_classes = [IsAuthenticated]
-    throttle_classes = [ScopedRateThrottle]
-    throttle_scope = 'location_ping'
+    throttle_classes = [LocationPingThrottle]
 
     def post(self, request, order_id):
         try:
@@ -54,25 +54,29 @@ class InventoryItem(models.Model):
         Calculate Estimated Delivery Time based on Warehouse Type and Inventory Mode.
         """
         try:
-            w_type = self.warehouse.warehouse_type
-            
-            if w_type == 'dark_store':
-                if self.mode in ['owned', 'consignment']:
-                    return "20 mins"
-                elif self.mode == 'virtual':
-                    return "1 day"
-            
-            elif w_type == 'mega':
-                if self.mode in ['owned', 'consignment']:
-                    return "3 days"
-                elif self.mode == 'virtual':
-                    return "5 days"
-                    
+            return InventoryItem.eta_for(self.warehouse.warehouse_type, self.mode)
         except Exception as e:
             logger.error(f"ETA calculation issue for InventoryItem ID {self.id}: {e}")
             
         return "2-3 Days"
 
+    @staticmethod
+    def eta_for(warehouse_type, mode):
+        """Same rules as delivery_eta, for callers that already fetched the warehouse type."""
+        if warehouse_type == 'dark_store':
+            if mode in ['owned', 'consignment']:
+                return "20 mins"
+            elif mode == 'virtual':
+                return "1 day"
+        
+        elif warehouse_type == 'mega':
+            if mode in ['owned', 'consignment']:
+                return "3 days"
+            elif mode == 'virtual':
+                return "5 days"
+
+        return "2-3 Days"
+
     def clean(self):
         if self.total_stock < self.reserved_stock:
             raise ValidationError("Total stock cannot be less than reserved stock.")
@@ -1,17 +1,21 @@
+import time
+import asyncio
 import redis
 import logging
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import F
 from django.core.exceptions import ValidationError
 from .models import InventoryItem, InventoryTransaction
 from apps.utils.exceptions import BusinessLogicException
+from apps.utils import locks
+from apps.utils.pools import get_redis_client, get_async_redis_client
 from django.db import models 
 
 logger = logging.getLogger(__name__)
 
 try:
-    r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    r = get_redis_client()
 except Exception as e:
     logger.error(f"Redis Connection Failed: {e}")
     r = None
@@ -19,6 +23,9 @@ except Exception as e:
 class InventoryService:
     INVENTORY_TTL = 3600 
     REDIS_CIRCUIT_TIMEOUT = 30  
+
+    STOCK_EVENT_STREAM = "inventory:stock_events"
+    STOCK_EVENT_MAXLEN = 100000
     
     LUA_SUCCESS = 1
     LUA_STOCK_OUT = 0
@@ -35,22 +42,180 @@ class InventoryService:
             return True
 
     @staticmethod
-    def check_stock(product_id, warehouse_id, quantity):
+    def check_stock(sku, warehouse_id, quantity):
         """
         Quick read-only check (Non-locking). 
         Used for UI display (Cart validation).
         """
-        inventory = InventoryItem.objects.filter(
-            product_id=product_id,
+        available = InventoryService.get_available_stock(warehouse_id, [sku]).get(sku, 0)
+        return available >= quantity
+
+    @staticmethod
+    def get_available_stock(warehouse_id: int, skus) -> dict:
+        """
+        Warehouse-level available stock per SKU, summed across every batch and bin.
+        Served from the Redis counters; misses are hydrated with one grouped query.
+        """
+        skus = list(dict.fromkeys(skus))
+        if not skus:
+            return {}
+
+        cached = [None] * len(skus)
+        if r:
+            try:
+                cached = r.mget([InventoryService._get_cache_key(warehouse_id, sku) for sku in skus])
+            except redis.RedisError as e:
+                logger.error(f"Redis MGET Error: {e}")
+
+        available = {sku: max(int(value), 0) for sku, value in zip(skus, cached) if value is not None}
+        missing = [sku for sku in skus if sku not in available]
+        if missing:
+            available.update(InventoryService._hydrate_cache_bulk(warehouse_id, missing))
+        return available
+
+    @staticmethod
+    def get_stock_by_warehouse_type(warehouses, skus) -> dict:
+        """
+        Splits available stock into express (dark store) and standard (mega) totals.
+        `warehouses` is an iterable of (warehouse_id, warehouse_type) pairs.
+        """
+        stock_map = {sku: {'express_stock': 0, 'standard_stock': 0} for sku in skus}
+        for warehouse_id, warehouse_type in warehouses:
+            bucket = {'dark_store': 'express_stock', 'mega': 'standard_stock'}.get(warehouse_type)
+            if not bucket:
+                continue
+            for sku, qty in InventoryService.get_available_stock(warehouse_id, skus).items():
+                stock_map[sku][bucket] += qty
+        return stock_map
+
+    @staticmethod
+    def _aggregate_available(warehouse_id: int, skus, using=None) -> dict:
+        rows = InventoryItem.objects.db_manager(using).filter(
+            sku__in=skus,
             bin__rack__aisle__zone__warehouse_id=warehouse_id
-        ).aggregate(total=models.Sum('available_stock'))['total'] or 0
-        
-        return inventory >= quantity
+        ).values("sku").annotate(available=models.Sum(F("total_stock") - F("reserved_stock")))
+
+        totals = {sku: 0 for sku in skus}
+        totals.update({row["sku"]: max(row["available"] or 0, 0) for row in rows})
+        return totals
+
+    @staticmethod
+    async def aget_available_stock(warehouse_id: int, skus) -> dict:
+        """Async twin of get_available_stock: MGET on the loop, misses hydrated via the async ORM."""
+        skus = list(dict.fromkeys(skus))
+        if not skus:
+            return {}
+
+        cached = [None] * len(skus)
+        try:
+            # Pools are per event loop, so the client is looked up on the running one
+            ar = get_async_redis_client()
+            cached = await ar.mget([InventoryService._get_cache_key(warehouse_id, sku) for sku in skus])
+        except redis.RedisError as e:
+            logger.error(f"Redis MGET Error: {e}")
+
+        available = {sku: max(int(value), 0) for sku, value in zip(skus, cached) if value is not None}
+        missing = [sku for sku in skus if sku not in available]
+        if missing:
+            available.update(await InventoryService._ahydrate_cache_bulk(warehouse_id, missing))
+        return available
+
+    @staticmethod
+    async def aget_stock_by_warehouse_type(warehouses, skus) -> dict:
+        """Async twin of get_stock_by_warehouse_type; warehouses are looked up concurrently."""
+        stock_map = {sku: {'express_stock': 0, 'standard_stock': 0} for sku in skus}
+        buckets = []
+        for warehouse_id, warehouse_type in warehouses:
+            bucket = {'dark_store': 'express_stock', 'mega': 'standard_stock'}.get(warehouse_type)
+            if bucket:
+                buckets.append((warehouse_id, bucket))
+
+        results = await asyncio.gather(*(
+            InventoryService.aget_available_stock(warehouse_id, skus) for warehouse_id, _ in buckets
+        ))
+        for (_, bucket), available in zip(buckets, results):
+            for sku, qty in available.items():
+                stock_map[sku][bucket] += qty
+        return stock_map
+
+    @staticmethod
+    async def _ahydrate_cache_bulk(warehouse_id: int, skus) -> dict:
+        rows = InventoryItem.objects.filter(
+            sku__in=skus,
+            bin__rack__aisle__zone__warehouse_id=warehouse_id
+        ).values("sku").annotate(available=models.Sum(F("total_stock") - F("reserved_stock")))
+
+        totals = {sku: 0 for sku in skus}
+        async for row in rows:
+            totals[row["sku"]] = max(row["available"] or 0, 0)
+
+        try:
+            async with get_async_redis_client().pipeline(transaction=False) as pipe:
+                for sku, available in totals.items():
+                    key = InventoryService._get_cache_key(warehouse_id, sku)
+                    pipe.set(key, available, ex=InventoryService.INVENTORY_TTL, nx=True)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Redis Hydrate Error: {e}")
+        return totals
+
+    @staticmethod
+    def _delivery_eta_rows(skus):
+        # Mirrors ProductSerializer's per-product lookup: first in-stock batch by id.
+        return InventoryItem.objects.filter(
+            sku__in=skus, total_stock__gt=0
+        ).order_by("id").values_list("sku", "mode", "bin__rack__aisle__zone__warehouse__warehouse_type")
+
+    @staticmethod
+    def get_delivery_etas(skus) -> dict:
+        """{sku: eta} in one query, for serializing product lists without N+1 lookups."""
+        etas = {}
+        for sku, mode, warehouse_type in InventoryService._delivery_eta_rows(skus):
+            etas.setdefault(sku, InventoryItem.eta_for(warehouse_type, mode))
+        return etas
+
+    @staticmethod
+    async def aget_delivery_etas(skus) -> dict:
+        etas = {}
+        async for sku, mode, warehouse_type in InventoryService._delivery_eta_rows(skus):
+            etas.setdefault(sku, InventoryItem.eta_for(warehouse_type, mode))
+        return etas
 
     @staticmethod
     def _get_cache_key(warehouse_id: int, sku: str) -> str:
         return f"inventory:{{wh_{warehouse_id}}}:{sku}"
 
+    @staticmethod
+    def _get_fence_key(warehouse_id: int, sku: str) -> str:
+        """Id of the last stock event the consumer applied to the counter (same slot as the counter)."""
+        return f"inventory:{{wh_{warehouse_id}}}:{sku}:fence"
+
+    @staticmethod
+    def stock_stream_position() -> str:
+        """Id of the newest stock event ("0-0" if none); taken before a DB read to fence what it wrote."""
+        newest = r.xrevrange(InventoryService.STOCK_EVENT_STREAM, count=1)
+        return newest[0][0] if newest else "0-0"
+
+    # KEYS: counter, fence
+    # ARGV: value, ttl, stream position observed before the value was read from the DB
+    # Returns 1 written, 0 skipped (the consumer applied a newer event), -1 counter not cached
+    FENCED_SET_LUA = """
+    local fence = redis.call("get", KEYS[2])
+    if fence then
+        local f_ms, f_seq = string.match(fence, "(%d+)-(%d+)")
+        local o_ms, o_seq = string.match(ARGV[3], "(%d+)-(%d+)")
+        f_ms, f_seq, o_ms, o_seq = tonumber(f_ms), tonumber(f_seq), tonumber(o_ms), tonumber(o_seq)
+        if f_ms > o_ms or (f_ms == o_ms and f_seq > o_seq) then
+            return 0
+        end
+    end
+    if redis.call("exists", KEYS[1]) == 0 then
+        return -1
+    end
+    redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[2])
+    return 1
+    """
+
     @staticmethod
     def reserve_stock_cached(sku: str, warehouse_id: int, quantity: int):
         """
@@ -122,14 +287,25 @@ class InventoryService:
 
     @staticmethod
     def _hydrate_cache(sku, warehouse_id):
-        item = InventoryItem.objects.filter(
-            sku=sku, 
-            bin__rack__aisle__zone__warehouse_id=warehouse_id
-        ).first()
-        
-        if item and r:
-            key = InventoryService._get_cache_key(warehouse_id, sku)
-            r.set(key, item.available_stock, ex=InventoryService.INVENTORY_TTL, nx=True)
+        InventoryService._hydrate_cache_bulk(warehouse_id, [sku])
+
+    @staticmethod
+    def _hydrate_cache_bulk(warehouse_id: int, skus) -> dict:
+        """
+        Seeds the per-SKU counters from the DB. NX so a newer write by the stock consumer is never overwritten.
+        """
+        totals = InventoryService._aggregate_available(warehouse_id, skus)
+        if not r:
+            return totals
+        try:
+            pipe = r.pipeline(transaction=False)
+            for sku, available in totals.items():
+                key = InventoryService._get_cache_key(warehouse_id, sku)
+                pipe.set(key, available, ex=InventoryService.INVENTORY_TTL, nx=True)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Redis Hydrate Error: {e}")
+        return totals
 
     @staticmethod
     @transaction.atomic
@@ -170,6 +346,16 @@ class InventoryService:
         
         return True
 
+    @staticmethod
+    def _drop_cached_stock(warehouse_id: int, skus):
+        """Forgets stale counters; the next read re-seeds them from the DB."""
+        if not r:
+            return
+        try:
+            r.delete(*[InventoryService._get_cache_key(warehouse_id, sku) for sku in skus])
+        except redis.RedisError as e:
+            logger.error(f"Redis Delete Error: {e}")
+
     @staticmethod
     def rollback_redis_stock(sku: str, warehouse_id: int, quantity: int):
         if not r: return
@@ -186,57 +372,81 @@ class InventoryService:
     def bulk_lock_and_reserve(warehouse_id: int, items_dict: dict, reference: str):
         """
         Bulk Stock Reservation with Deadlock Protection.
-        1. Sort SKUs (prevent deadlocks).
-        2. Lock Rows.
-        3. Validate & Deduct.
+        1. Fast-fail without locks: a shortfall in the cached per-SKU totals is
+           confirmed against the DB before the order is rejected.
+        2. Lock every batch of the requested SKUs in sorted-ID order.
+        3. Validate the SKU total & reserve FIFO across batches.
+        Returns {sku: [(batch_id, qty)]} so the order records the same batches.
         """
         skus = list(items_dict.keys())
-        
-        candidates = InventoryItem.objects.filter(
+
+        cached_totals = InventoryService.get_available_stock(warehouse_id, skus)
+        short = [sku for sku, qty_needed in items_dict.items() if cached_totals.get(sku, 0) < qty_needed]
+        if short:
+            # Admin edits and imports emit no stock event, so the counter can trail a restock
+            db_totals = InventoryService._aggregate_available(warehouse_id, short, using="default")
+            for sku in short:
+                if db_totals[sku] < items_dict[sku]:
+                    raise BusinessLogicException(
+                        f"Stock insufficient: {sku}. Requested: {items_dict[sku]}, Available: {db_totals[sku]}",
+                        code="stock_out"
+                    )
+            InventoryService._drop_cached_stock(warehouse_id, short)
+
+        batch_ids = list(InventoryItem.objects.filter(
             bin__rack__aisle__zone__warehouse_id=warehouse_id,
             sku__in=skus
-        ).values("id", "sku")
-        
-        sku_to_id = {item["sku"]: item["id"] for item in candidates}
-        
-        missing = set(skus) - set(sku_to_id.keys())
+        ).order_by("id").values_list("id", flat=True))
+
+        locked_items = list(
+            InventoryItem.objects.select_for_update().filter(id__in=batch_ids).order_by("id")
+        )
+
+        batches_by_sku = {}
+        for item in sorted(locked_items, key=lambda i: (i.created_at, i.id)):
+            batches_by_sku.setdefault(item.sku, []).append(item)
+
+        missing = set(skus) - set(batches_by_sku.keys())
         if missing:
             raise BusinessLogicException(f"Items not found: {', '.join(missing)}")
 
-        sorted_ids = sorted(sku_to_id.values())
+        deltas = {}
+        allocations = {}
 
-        locked_items = list(InventoryItem.objects.select_for_update().filter(id__in=sorted_ids))
-        item_map = {item.id: item for item in locked_items}
-        
-        reserved_items = []
+        for sku in sorted(skus):
+            qty_needed = items_dict[sku]
+            batches = batches_by_sku[sku]
+            total_available = sum(item.available_stock for item in batches)
 
-        for item_id in sorted_ids:
-            item = item_map[item_id]
-            qty_needed = items_dict[item.sku]
-
-            if item.available_stock < qty_needed:
+            if total_available < qty_needed:
                 raise BusinessLogicException(
-                    f"Stock insufficient: {item.sku}. Requested: {qty_needed}, Available: {item.available_stock}",
+                    f"Stock insufficient: {sku}. Requested: {qty_needed}, Available: {total_available}",
                     code="stock_out"
                 )
 
-            item.reserved_stock = F("reserved_stock") + qty_needed
-            item.save(update_fields=["reserved_stock"])
-            
-            InventoryTransaction.objects.create(
-                inventory_item=item,
-                transaction_type="reserve",
-                quantity=qty_needed,
-                reference=reference
-            )
-            reserved_items.append(item)
+            qty_remaining = qty_needed
+            for item in batches:
+                if qty_remaining <= 0:
+                    break
+                qty_to_take = min(item.available_stock, qty_remaining)
+                if qty_to_take <= 0:
+                    continue
 
-        def _sync_cache():
-            for item in reserved_items:
-                InventoryService._sync_redis_stock(item.id)
-        
-        transaction.on_commit(_sync_cache)
-        return True
+                item.reserved_stock = F("reserved_stock") + qty_to_take
+                item.save(update_fields=["reserved_stock"])
+
+                InventoryTransaction.objects.create(
+                    inventory_item=item,
+                    transaction_type="reserve",
+                    quantity=qty_to_take,
+                    reference=reference
+                )
+                deltas[item.id] = -qty_to_take
+                allocations.setdefault(sku, []).append((item.id, qty_to_take))
+                qty_remaining -= qty_to_take
+
+        InventoryService._emit_stock_events(deltas)
+        return allocations
 
     @staticmethod
     @transaction.atomic
@@ -254,7 +464,7 @@ class InventoryService:
             reference=reference,
         )
         
-        transaction.on_commit(lambda: InventoryService._sync_redis_stock(item.id))
+        InventoryService._emit_stock_events({item.id: quantity})
 
     @staticmethod
     @transaction.atomic
@@ -275,7 +485,7 @@ class InventoryService:
             reference=reference,
         )
 
-        transaction.on_commit(lambda: InventoryService._sync_redis_stock(item.id))
+        InventoryService._emit_stock_events({item.id: release_qty})
 
     @staticmethod
     @transaction.atomic
@@ -299,13 +509,12 @@ class InventoryService:
             reference=reference,
         )
 
-        transaction.on_commit(lambda: InventoryService._sync_redis_stock(item.id))
-
     @staticmethod
     @transaction.atomic
     def cycle_count_adjust(item: InventoryItem, new_total: int, reference: str = ""):
         item = InventoryItem.objects.select_for_update().get(id=item.id)
         delta = new_total - item.total_stock
+        available_before = item.available_stock
         
         item.total_stock = new_total
         if item.total_stock < item.reserved_stock:
@@ -320,40 +529,346 @@ class InventoryService:
             reference=reference,
         )
 
-        transaction.on_commit(lambda: InventoryService._sync_redis_stock(item.id))
+        InventoryService._emit_stock_events({item.id: item.available_stock - available_before})
 
     @staticmethod
-    def _sync_redis_stock(item_id):
+    def _emit_stock_events(deltas: dict):
+        """
+        Queues stock-delta events ({item_id: change in available_stock}) for the
+        current transaction. Nothing is published if the transaction rolls back.
+        """
+        deltas = {item_id: delta for item_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        transaction.on_commit(lambda: InventoryService._publish_stock_events(deltas))
+
+    @staticmethod
+    def _publish_stock_events(deltas: dict):
+        """
+        Appends one compact event per batch to the stock stream in a single pipeline.
+        Warehouse and post-commit availability are resolved with one joined query.
+        """
         if not r: return
         try:
-            item = InventoryItem.objects.get(id=item_id)
-            key = InventoryService._get_cache_key(item.warehouse.id, item.sku)
-            r.set(key, item.available_stock, ex=InventoryService.INVENTORY_TTL)
+            rows = InventoryItem.objects.filter(id__in=list(deltas)).values(
+                "id", "sku", "total_stock", "reserved_stock",
+                wh_id=F("bin__rack__aisle__zone__warehouse_id"),
+            )
+            pipe = r.pipeline(transaction=False)
+            for row in rows:
+                pipe.xadd(
+                    InventoryService.STOCK_EVENT_STREAM,
+                    {
+                        "wh": row["wh_id"],
+                        "sku": row["sku"],
+                        "item": row["id"],
+                        "delta": deltas[row["id"]],
+                        "available": row["total_stock"] - row["reserved_stock"],
+                    },
+                    maxlen=InventoryService.STOCK_EVENT_MAXLEN,
+                    approximate=True,
+                )
+            pipe.execute()
         except Exception as e:
-            logger.error(f"Redis Sync Error: {e}")
+            logger.error(f"Stock Event Publish Error: {e}")
 
     @staticmethod
     @transaction.atomic
-    def release_stock_for_order(order):
+    def release_stock_for_order(order, reference: str = ""):
         """
         Rollback mechanism for failed payments or cancellations.
-        Identifies all reserved items and returns them to 'available_stock'.
+        Returns exactly the batches recorded in OrderItemFulfillment to
+        'available_stock': one locking SELECT (sorted IDs), one UPDATE ... FROM
+        VALUES, one bulk insert of transactions and one Redis pipeline.
+        Safe to call twice for the same order.
         """
-        order_items = order.items.all()
-        for item in order_items:
-            inv_item = InventoryItem.objects.select_for_update().filter(
-                sku=item.sku,
-                bin__rack__aisle__zone__warehouse=order.warehouse
-            ).first()
-            
-            if inv_item:
-                inv_item.reserved_stock = F("reserved_stock") - item.quantity
-                inv_item.save(update_fields=["reserved_stock"])
-                
-                InventoryTransaction.objects.create(
-                    inventory_item=inv_item,
-                    transaction_type="release",
-                    quantity=item.quantity,
-                    reference=f"failed_payment_cleanup:{order.id}"
-                )
-                transaction.on_commit(lambda: InventoryService._sync_redis_stock(inv_item.id))
\ No newline at end of file
+        reference = reference or f"failed_payment_cleanup:{order.id}"
+
+        requested = InventoryService._order_batch_quantities(order)
+        if not requested:
+            return
+
+        locked = dict(
+            InventoryItem.objects.select_for_update()
+            .filter(id__in=requested.keys())
+            .order_by("id")
+            .values_list("id", "reserved_stock")
+        )
+
+        # Checked under the batch locks so a concurrent release sees our rows.
+        if InventoryTransaction.objects.filter(order=order, transaction_type="release").exists():
+            return
+
+        released = {}
+        for batch_id, reserved in locked.items():
+            release_qty = min(reserved, requested[batch_id])
+            if release_qty > 0:
+                released[batch_id] = release_qty
+
+        if not released:
+            return
+
+        InventoryService._bulk_decrement(released, fields=("reserved_stock",))
+
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                inventory_item_id=batch_id,
+                transaction_type="release",
+                quantity=qty,
+                order=order,
+                reference=reference,
+            )
+            for batch_id, qty in released.items()
+        ])
+
+        InventoryService._emit_stock_events(released)
+
+    @staticmethod
+    @transaction.atomic
+    def commit_stock_for_order(order, reference: str = ""):
+        """
+        Finalizes a delivered order's sale on exactly the batches recorded in
+        OrderItemFulfillment: one locking SELECT (sorted IDs), one UPDATE ...
+        FROM VALUES on total and reserved stock and one bulk insert of
+        transactions, however many lines the order has. Available stock does
+        not move, so there is no stock event. Safe to call twice for the same order.
+        """
+        reference = reference or f"sold_order_{order.id}"
+
+        requested = InventoryService._order_batch_quantities(order)
+        if not requested:
+            return
+
+        locked = dict(
+            InventoryItem.objects.select_for_update()
+            .filter(id__in=requested.keys())
+            .order_by("id")
+            .values_list("id", "reserved_stock")
+        )
+
+        # Checked under the batch locks so a concurrent commit sees our rows.
+        if InventoryTransaction.objects.filter(order=order, transaction_type="commit").exists():
+            return
+
+        short = [batch_id for batch_id, qty in requested.items() if locked.get(batch_id, 0) < qty]
+        if short:
+            raise ValidationError(f"Cannot commit more than reserved stock (batches {short})")
+
+        InventoryService._bulk_decrement(requested, fields=("total_stock", "reserved_stock"))
+
+        InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                inventory_item_id=batch_id,
+                transaction_type="commit",
+                quantity=-qty,
+                order=order,
+                reference=reference,
+            )
+            for batch_id, qty in requested.items()
+        ])
+
+    @staticmethod
+    def _order_batch_quantities(order) -> dict:
+        """{batch_id: quantity} the order holds, from its fulfillment records."""
+        from apps.orders.models import OrderItemFulfillment
+
+        quantities = {}
+        fulfillments = OrderItemFulfillment.objects.filter(
+            order_item__order=order
+        ).values_list("inventory_batch_id", "quantity_allocated")
+        for batch_id, qty in fulfillments:
+            quantities[batch_id] = quantities.get(batch_id, 0) + qty
+
+        return quantities or InventoryService._legacy_release_targets(order)
+
+    @staticmethod
+    def _legacy_release_targets(order) -> dict:
+        """Orders placed before fulfillment records existed: oldest batch per SKU."""
+        quantities = {}
+        for item in order.items.all():
+            quantities[item.sku] = quantities.get(item.sku, 0) + item.quantity
+
+        batch_for_sku = {}
+        rows = InventoryItem.objects.filter(
+            sku__in=quantities.keys(),
+            bin__rack__aisle__zone__warehouse=order.fulfillment_warehouse
+        ).order_by("created_at", "id").values_list("sku", "id")
+        for sku, batch_id in rows:
+            batch_for_sku.setdefault(sku, batch_id)
+
+        return {batch_for_sku[sku]: qty for sku, qty in quantities.items() if sku in batch_for_sku}
+
+    @staticmethod
+    def _bulk_decrement(quantities: dict, fields=("reserved_stock",)):
+        """
+        Decrements `fields` of many batches in a single statement:
+        UPDATE ... SET f = f - v.qty FROM (VALUES (id, qty), ...) v.
+        Callers must already hold the row locks.
+        """
+        table = InventoryItem._meta.db_table
+        assignments = ", ".join(f"{field} = inv.{field} - v.qty" for field in fields)
+        values_sql = ", ".join(["(%s, %s)"] * len(quantities))
+        params = [value for pair in quantities.items() for value in pair]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} AS inv SET {assignments}, updated_at = NOW() "
+                f"FROM (VALUES {values_sql}) AS v(id, qty) WHERE inv.id = v.id",
+                params,
+            )
+
+class ReservationLedger:
+    """
+    Expiry index for checkout reservations: a sorted set of order ids scored by
+    the unix time after which their held stock may be reclaimed.
+    """
+    KEY = "inventory:reservations"
+
+    CLAIM_LUA = """
+    local ids = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+    if #ids > 0 then
+        redis.call("zrem", KEYS[1], unpack(ids))
+    end
+    return ids
+    """
+
+    @staticmethod
+    def hold(order_id, ttl=None):
+        ttl = ttl or settings.RESERVATION_TTL_SECONDS
+        if not r: return
+        try:
+            r.zadd(ReservationLedger.KEY, {str(order_id): time.time() + ttl})
+        except redis.RedisError as e:
+            logger.error(f"Reservation hold failed for order {order_id}: {e}")
+
+    @staticmethod
+    def convert(order_id):
+        """
+        Drops the expiry entry once the order is paid or otherwise settled.
+        """
+        if not r: return
+        try:
+            r.zrem(ReservationLedger.KEY, str(order_id))
+        except redis.RedisError as e:
+            logger.error(f"Reservation convert failed for order {order_id}: {e}")
+
+    @staticmethod
+    def claim_expired(limit=200):
+        """
+        Atomically pops up to `limit` expired order ids so concurrent sweepers never overlap.
+        """
+        if not r: return []
+        try:
+            ids = r.eval(ReservationLedger.CLAIM_LUA, 1, ReservationLedger.KEY, time.time(), limit)
+        except redis.RedisError as e:
+            logger.error(f"Reservation claim failed: {e}")
+            return []
+        return [int(order_id) for order_id in ids]
+
+
+class StockEventConsumer:
+    """
+    Reads the stock-delta stream through a Redis consumer group.
+    Each group tracks its own cursor, so the cache writer, storefront
+    rebuilders and alerting can consume the same events independently.
+    """
+    CACHE_GROUP = "stock-cache"
+    CONSUMER_NAME = "worker"
+    BATCH_SIZE = 500
+    # Every run reads the group's pending list first, so two overlapping runs would apply it twice
+    DRAIN_LOCK_TTL = 300
+
+    @staticmethod
+    def ensure_group(group: str):
+        try:
+            r.xgroup_create(InventoryService.STOCK_EVENT_STREAM, group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def read_batch(group: str, count: int = BATCH_SIZE):
+        """
+        Returns [(event_id, fields)]. Un-acked events from a crashed run are
+        redelivered before new ones.
+        """
+        stream = InventoryService.STOCK_EVENT_STREAM
+        for cursor in ("0", ">"):
+            response = r.xreadgroup(group, StockEventConsumer.CONSUMER_NAME, {stream: cursor}, count=count)
+            entries = response[0][1] if response else []
+            if entries:
+                return entries
+        return []
+
+    @staticmethod
+    def acquire_drain(group: str):
+        """Owner token for the group's drain lock, or None while another drain runs."""
+        return locks.acquire(f"{InventoryService.STOCK_EVENT_STREAM}:{group}:drain", StockEventConsumer.DRAIN_LOCK_TTL, r)
+
+    @staticmethod
+    def release_drain(group: str, token: str):
+        locks.release(f"{InventoryService.STOCK_EVENT_STREAM}:{group}:drain", token, r)
+
+    @staticmethod
+    def ack(group: str, event_ids):
+        if event_ids:
+            r.xack(InventoryService.STOCK_EVENT_STREAM, group, *event_ids)
+
+    # KEYS: counter, fence. ARGV: available, ttl, id of the last event applied
+    SET_AVAILABLE_LUA = """
+    local previous = redis.call("get", KEYS[1])
+    redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[2])
+    redis.call("set", KEYS[2], ARGV[3], "EX", ARGV[2])
+    return previous
+    """
+
+    @staticmethod
+    def apply_cache_batch(entries):
+        """
+        Rewrites the per-SKU counters the batch touched with their absolute
+        availability, read from the primary after the events were read (so it
+        includes every change they describe). Counters are never moved by
+        deltas: hydration, the reconciler and this consumer all write totals
+        from the DB, so a change already in a snapshot cannot be applied twice.
+        Each counter's fence records the last event applied (see FENCED_SET_LUA).
+        Returns the SKUs that went from empty to in-stock.
+        """
+        last_event = {}
+        batch_restocked = set()
+        for event_id, fields in entries:
+            key = (int(fields["wh"]), fields["sku"])
+            last_event[key] = event_id
+            delta, available = int(fields["delta"]), int(fields["available"])
+            if delta > 0 and available > 0 and available - delta <= 0:
+                batch_restocked.add(key)
+
+        skus_by_warehouse = {}
+        for wh_id, sku in last_event:
+            skus_by_warehouse.setdefault(wh_id, []).append(sku)
+        totals = {}
+        for wh_id, skus in skus_by_warehouse.items():
+            for sku, available in InventoryService._aggregate_available(wh_id, skus, using="default").items():
+                totals[(wh_id, sku)] = available
+
+        keys = list(last_event)
+        set_available = r.register_script(StockEventConsumer.SET_AVAILABLE_LUA)
+        pipe = r.pipeline(transaction=False)
+        for wh_id, sku in keys:
+            set_available(
+                keys=[InventoryService._get_cache_key(wh_id, sku), InventoryService._get_fence_key(wh_id, sku)],
+                args=[totals[(wh_id, sku)], InventoryService.INVENTORY_TTL, last_event[(wh_id, sku)]],
+                client=pipe,
+            )
+        results = pipe.execute()
+
+        restocked = set()
+        for key, previous in zip(keys, results):
+            if totals[key] <= 0:
+                continue
+            if previous is None:
+                # Cold counter: fall back to the batch-level signal.
+                if key in batch_restocked:
+                    restocked.add(key[1])
+            elif int(previous) <= 0:
+                restocked.add(key[1])
+        return restocked
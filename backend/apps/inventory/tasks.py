@@ -0,0 +1,57 @@
+import logging
+from celery import shared_task
+
+from apps.catalog.models import Product
+from .services import StockEventConsumer, r
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def consume_stock_events(max_batches=20):
+    """
+    Applies queued stock-delta events to the Redis stock cache in batches
+    and fans out back-in-stock alerts. Writers never wait on this work.
+    """
+    if not r:
+        return "Redis unavailable"
+
+    group = StockEventConsumer.CACHE_GROUP
+    StockEventConsumer.ensure_group(group)
+    token = StockEventConsumer.acquire_drain(group)
+    if token is None:
+        return "Already draining"
+
+    processed = 0
+    restocked = set()
+    try:
+        for _ in range(max_batches):
+            entries = StockEventConsumer.read_batch(group)
+            if not entries:
+                break
+            restocked |= StockEventConsumer.apply_cache_batch(entries)
+            StockEventConsumer.ack(group, [event_id for event_id, _ in entries])
+            processed += len(entries)
+    finally:
+        StockEventConsumer.release_drain(group, token)
+
+    if restocked:
+        notify_back_in_stock.delay(sorted(restocked))
+
+    return f"Applied {processed} stock events"
+
+
+@shared_task
+def notify_back_in_stock(skus):
+    """
+    One topic push per SKU that came back in stock.
+    """
+    from apps.notifications.services import NotificationService
+
+    for sku, name in Product.objects.filter(sku__in=skus, is_active=True).values_list("sku", "name"):
+        NotificationService.send_global_push(
+            topic="new_arrivals",
+            title="Stock Update! 🎉",
+            message=f"Hurry! {name} is back in stock.",
+            extra_data={"sku": sku, "type": "inventory"}
+        )
+    return f"Notified {len(skus)} SKUs"
@@ -0,0 +1,140 @@
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.gis.geos import Point
+from django.db.models import F
+from django.test import TestCase
+
+from apps.core.tasks import reconcile_inventory_redis_db
+from apps.warehouse.models import Warehouse, StorageZone, Aisle, Rack, Bin
+from .models import InventoryItem
+from .services import InventoryService, StockEventConsumer, r
+from .tasks import consume_stock_events
+
+
+def _redis_available():
+    try:
+        return bool(r) and r.ping()
+    except Exception:
+        return False
+
+
+@skipUnless(_redis_available(), "needs Redis at REDIS_URL")
+class StockCounterTests(TestCase):
+    """
+    The per-SKU counters must end up equal to the DB whatever order snapshots
+    (hydration, reconciliation) and pending stream events are applied in.
+    """
+
+    def setUp(self):
+        suffix = uuid.uuid4().hex[:8]
+        self.stream = f"test:stock_events:{suffix}"
+        patcher = mock.patch.object(InventoryService, "STOCK_EVENT_STREAM", self.stream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        notify = mock.patch("apps.inventory.tasks.notify_back_in_stock")
+        self.notify = notify.start()
+        self.addCleanup(notify.stop)
+
+        self.warehouse = Warehouse.objects.create(
+            name="Test WH", code=f"T{suffix}", warehouse_type="dark_store",
+            city="Pune", state="MH", location=Point(73.85, 18.52, srid=4326),
+        )
+        zone = StorageZone.objects.create(warehouse=self.warehouse, name="Z")
+        aisle = Aisle.objects.create(zone=zone, number="1")
+        rack = Rack.objects.create(aisle=aisle, number="1")
+        bin_ = Bin.objects.create(rack=rack, bin_code=f"B{suffix}")
+        self.sku = f"SKU-{suffix}"
+        self.item = InventoryItem.objects.create(
+            bin=bin_, sku=self.sku, product_name="Test", price=Decimal("10.00"), total_stock=10,
+        )
+
+        self.key = InventoryService._get_cache_key(self.warehouse.id, self.sku)
+        self.fence = InventoryService._get_fence_key(self.warehouse.id, self.sku)
+        self.addCleanup(r.delete, self.key, self.fence, self.stream, f"{self.stream}:stock-cache:drain")
+
+    def _counter(self):
+        value = r.get(self.key)
+        return None if value is None else int(value)
+
+    def _reserve(self, qty):
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.bulk_lock_and_reserve(self.warehouse.id, {self.sku: qty}, reference="test")
+
+    def _add_stock(self, qty):
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryService.add_stock(self.item, qty, reference="test")
+
+    def test_cold_key_hydrated_while_event_pending(self):
+        self._add_stock(5)
+        self.assertIsNone(self._counter())
+
+        # A storefront read seeds the counter from the DB, which already has the restock
+        self.assertEqual(InventoryService.get_available_stock(self.warehouse.id, [self.sku])[self.sku], 15)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 15)
+
+    def test_expired_key_rehydrated_while_event_pending(self):
+        self._reserve(2)
+        r.delete(self.key)
+
+        self.assertEqual(InventoryService.get_available_stock(self.warehouse.id, [self.sku])[self.sku], 8)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 8)
+
+    def test_reconcile_while_event_pending(self):
+        self._reserve(2)
+        self.assertEqual(self._counter(), 10)  # event not consumed yet
+
+        reconcile_inventory_redis_db()
+        self.assertEqual(self._counter(), 8)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 8)
+
+    def test_reconcile_skips_counter_fenced_by_newer_event(self):
+        self._reserve(2)
+        observed = InventoryService.stock_stream_position()
+        self._reserve(3)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 5)
+
+        # A repair computed before the second reservation must not roll it back
+        fenced_set = r.register_script(InventoryService.FENCED_SET_LUA)
+        self.assertEqual(fenced_set(keys=[self.key, self.fence], args=[8, 60, observed]), 0)
+        self.assertEqual(self._counter(), 5)
+
+    def test_overlapping_drain_is_skipped(self):
+        self._reserve(2)
+        StockEventConsumer.ensure_group(StockEventConsumer.CACHE_GROUP)
+        token = StockEventConsumer.acquire_drain(StockEventConsumer.CACHE_GROUP)
+        self.assertIsNotNone(token)
+        try:
+            self.assertEqual(consume_stock_events(), "Already draining")
+        finally:
+            StockEventConsumer.release_drain(StockEventConsumer.CACHE_GROUP, token)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 8)
+
+    def test_restock_from_zero_notifies(self):
+        self._reserve(10)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 0)
+
+        self._add_stock(4)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 4)
+        self.notify.delay.assert_called_once_with([self.sku])
+
+    def test_restock_without_event_reserves_from_db(self):
+        self._reserve(10)
+        consume_stock_events()
+        self.assertEqual(self._counter(), 0)
+
+        # Admin edits and CSV imports write the row directly, with no stock event
+        InventoryItem.objects.filter(pk=self.item.pk).update(total_stock=F("total_stock") + 5)
+        self._reserve(3)
+        self.assertIsNone(self._counter())  # stale counter dropped
+
+        consume_stock_events()
+        self.assertEqual(self._counter(), 2)
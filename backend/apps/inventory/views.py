@@ -90,6 +90,7 @@ class InventoryHistoryAPIView(generics.ListAPIView):
     Admin: Kisi specific Item ki stock movement history dekhne ke liye.
     """
     permission_classes = [IsAdminUser]
+    use_read_replica = True
     serializer_class = InventoryTransactionSerializer
 
     def get_queryset(self):
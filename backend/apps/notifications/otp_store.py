@@ -0,0 +1,159 @@
+"""
+Redis-native OTP state: one script call per verify, one per send (two when
+the client IP is known).
+
+Keys per phone (`{phone}` hash tag keeps them on one slot):
+- otp:{phone}         hash: code digest + attempts, expires with the OTP
+- otp:{phone}:sends   sorted set of send times (sliding window + resend cooldown)
+- otp:{phone}:fails   wrong codes across OTPs, kept for the block period
+- otp:{phone}:block   set when fails reach the limit; expires on its own
+
+Per client IP, on its own slot (`{ip}` hash tag) and so in its own script call:
+- otp:ip:{ip}:sends   sorted set of send times; a send the phone script then
+                      refuses is taken back out
+
+Only an HMAC of the code is stored, keyed with SECRET_KEY and the phone.
+"""
+import hmac
+import time
+import hashlib
+import secrets
+
+from django.conf import settings
+
+from apps.utils.pools import get_redis_client
+
+# KEYS: ip sends
+# ARGV: now_ms, ip_limit, window_ms, member
+IP_SEND_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[3])
+
+redis.call("zremrangebyscore", KEYS[1], "-inf", now - window)
+if redis.call("zcard", KEYS[1]) >= tonumber(ARGV[2]) then
+    local oldest = redis.call("zrange", KEYS[1], 0, 0, "WITHSCORES")
+    return {"ip_limit", tonumber(oldest[2]) + window - now}
+end
+redis.call("zadd", KEYS[1], now, ARGV[4])
+redis.call("pexpire", KEYS[1], window)
+return {"ok", 0}
+"""
+
+# KEYS: code, phone sends, block
+# ARGV: now_ms, digest, ttl_ms, cooldown_ms, phone_limit, window_ms, member
+SEND_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[6])
+
+local blocked = redis.call("pttl", KEYS[3])
+if blocked > 0 then
+    return {"blocked", blocked}
+end
+
+redis.call("zremrangebyscore", KEYS[2], "-inf", now - window)
+local last = redis.call("zrange", KEYS[2], -1, -1, "WITHSCORES")
+if last[2] and now - tonumber(last[2]) < tonumber(ARGV[4]) then
+    return {"cooldown", tonumber(ARGV[4]) - (now - tonumber(last[2]))}
+end
+if redis.call("zcard", KEYS[2]) >= tonumber(ARGV[5]) then
+    local oldest = redis.call("zrange", KEYS[2], 0, 0, "WITHSCORES")
+    return {"phone_limit", tonumber(oldest[2]) + window - now}
+end
+
+redis.call("zadd", KEYS[2], now, ARGV[7])
+redis.call("pexpire", KEYS[2], window)
+redis.call("del", KEYS[1])
+redis.call("hset", KEYS[1], "digest", ARGV[2], "attempts", 0)
+redis.call("pexpire", KEYS[1], ARGV[3])
+return {"ok", 0}
+"""
+
+# KEYS: code, fails, block
+# ARGV: digest, max_attempts, max_fails, block_ms, fails_ttl_ms
+VERIFY_LUA = """
+local stored = redis.call("hmget", KEYS[1], "digest", "attempts")
+if not stored[1] then
+    return {"missing", 0}
+end
+if tonumber(stored[2]) >= tonumber(ARGV[2]) then
+    return {"attempts", 0}
+end
+
+if stored[1] == ARGV[1] then
+    redis.call("del", KEYS[1], KEYS[2], KEYS[3])
+    return {"ok", 0}
+end
+
+redis.call("hincrby", KEYS[1], "attempts", 1)
+local fails = redis.call("incr", KEYS[2])
+redis.call("pexpire", KEYS[2], ARGV[5])
+if fails >= tonumber(ARGV[3]) then
+    redis.call("set", KEYS[3], 1, "PX", ARGV[4])
+    return {"invalid_blocked", tonumber(ARGV[4])}
+end
+return {"invalid", 0}
+"""
+
+_scripts = {}
+
+
+def _script(name, source):
+    script = _scripts.get(name)
+    if script is None:
+        script = _scripts[name] = get_redis_client().register_script(source)
+    return script
+
+
+def _keys(phone):
+    base = f"otp:{{{phone}}}"
+    return base, f"{base}:sends", f"{base}:fails", f"{base}:block"
+
+
+def _result(response):
+    status, value = response
+    return (status.decode() if isinstance(status, bytes) else status), int(value)
+
+
+class OTPStore:
+    SEND_WINDOW_SECONDS = 3600
+
+    @staticmethod
+    def digest(phone, code):
+        return hmac.new(settings.SECRET_KEY.encode(), f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def issue(phone, code, ttl, cooldown, phone_limit, ip_address=None, ip_limit=0):
+        """
+        Stores the code and records the send if every limit allows it.
+        Returns (status, ms): "ok", or the limit hit ("blocked", "cooldown",
+        "phone_limit", "ip_limit") with the milliseconds until it lifts.
+        """
+        code_key, sends_key, _fails_key, block_key = _keys(phone)
+        now_ms = int(time.time() * 1000)
+        window_ms = OTPStore.SEND_WINDOW_SECONDS * 1000
+        member = f"{now_ms}-{secrets.token_hex(4)}"
+
+        ip_key = f"otp:ip:{{{ip_address}}}:sends" if ip_address else None
+        if ip_key:
+            status, wait_ms = _result(_script("ip_send", IP_SEND_LUA)(
+                keys=[ip_key], args=[now_ms, ip_limit, window_ms, member],
+            ))
+            if status != "ok":
+                return status, wait_ms
+
+        args = [now_ms, OTPStore.digest(phone, code), ttl * 1000, cooldown * 1000, phone_limit, window_ms, member]
+        status, wait_ms = _result(_script("send", SEND_LUA)(keys=[code_key, sends_key, block_key], args=args))
+        if status != "ok" and ip_key:
+            # No OTP went out; don't count it against the IP
+            get_redis_client().zrem(ip_key, member)
+        return status, wait_ms
+
+    @staticmethod
+    def check(phone, code, max_attempts, max_fails, block_seconds):
+        """
+        ("ok" | "missing" | "attempts" | "invalid" | "invalid_blocked", block ms).
+        A correct code consumes the OTP and clears the phone's failure count.
+        """
+        code_key, _sends_key, fails_key, block_key = _keys(phone)
+        args = [OTPStore.digest(phone, code), max_attempts, max_fails, block_seconds * 1000, block_seconds * 1000]
+        return _result(_script("verify", VERIFY_LUA)(keys=[code_key, fails_key, block_key], args=args))
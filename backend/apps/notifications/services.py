@@ -1,43 +1,28 @@
 import secrets
 import logging
+import redis
 from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
-from django.core.cache import cache
-from firebase_admin import messaging  
 from apps.utils.exceptions import BusinessLogicException
 from .models import OTPAbuseLog, PhoneOTP, Notification
-from .tasks import send_otp_sms
+from .otp_store import OTPStore
+from .tasks import send_otp_sms, send_push_batch
 
 logger = logging.getLogger(__name__)
 
-def execute_push_to_topic(topic, title, body, data=None):
-    try:
-        stringified_data = {str(k): str(v) for k, v in data.items()} if data else {}
-        
-        # Data mein title aur body add kar rahe hain (Web ke liye)
-        stringified_data['title'] = str(title)
-        stringified_data['body'] = str(body)
-
-        # Android device ke liye AndroidConfig add karein taaki APK mein properly show ho
-        android_config = messaging.AndroidConfig(
-            notification=messaging.AndroidNotification(
-                title=title,
-                body=body,
-                sound='default'
-            )
-        )
+def _push_data(title, body, data):
+    stringified_data = {str(k): str(v) for k, v in data.items()} if data else {}
+    # Data mein title aur body add kar rahe hain (Web ke liye)
+    stringified_data['title'] = str(title)
+    stringified_data['body'] = str(body)
+    return stringified_data
 
-        message = messaging.Message(
-            topic=topic,
-            data=stringified_data,
-            android=android_config  # <-- Yeh line add ki gayi hai
-        )
-        response = messaging.send(message)
-        logger.info(f"[FCM] Successfully sent to topic '{topic}': {response}")
-    except Exception as e:
-        logger.error(f"[FCM] Error sending to topic '{topic}': {e}")
+
+def execute_push_to_topic(topic, title, body, data=None):
+    """Queued for the push batch consumer (send_push_batch)."""
+    send_push_batch.enqueue({"topic": topic, "title": title, "body": body, "data": _push_data(title, body, data)})
 
 class NotificationService:
     @staticmethod
@@ -50,48 +35,14 @@ class NotificationService:
 
     @staticmethod
     def send_push(user, title, message, extra_data=None):
-        """User ko notification bhejna - Multi-device support ke sath"""
+        """User ko notification bhejna - Multi-device support ke sath (batched per FCM call)"""
         Notification.objects.create(user=user, type="push", title=title, message=message)
-        
-        stringified_data = {str(k): str(v) for k, v in extra_data.items()} if extra_data else {}
-        
-        # Data payload sabke paas jayega (Browser isse Toast show karega)
-        stringified_data['title'] = str(title)
-        stringified_data['body'] = str(message)
-        
-        tokens = []
-        user_devices = user.devices.all()
-        if user_devices.exists():
-            tokens = [device.fcm_token for device in user_devices if device.fcm_token]
-        elif getattr(user, 'fcm_token', None):
-            tokens = [user.fcm_token]
-
-        if tokens:
-            try:
-                # 🚀 FINAL FIX: Android Configuration Use Karein
-                android_config = messaging.AndroidConfig(
-                    notification=messaging.AndroidNotification(
-                        title=title,
-                        body=message,
-                        sound='default'
-                    )
-                )
-
-                fcm_msg = messaging.MulticastMessage(
-                    tokens=tokens,
-                    data=stringified_data,
-                    android=android_config,
-                    webpush=messaging.WebpushConfig(
-                        headers={"Urgency": "high"}
-                    )
-                )
-                
-                response = messaging.send_each_for_multicast(fcm_msg)
-                logger.info(f"[FCM] Multicast sent. Success: {response.success_count}, Failure: {response.failure_count}")
-            except Exception as e:
-                logger.error(f"[FCM] Error sending push to user {user.phone}: {e}")
-        else:
-            logger.warning(f"[PUSH] User {user.phone} has no active FCM devices.")
+        send_push_batch.enqueue({
+            "user_id": user.id,
+            "title": title,
+            "body": message,
+            "data": _push_data(title, message, extra_data),
+        })
 
     @staticmethod
     def send_global_push(topic, title, message, extra_data=None):
@@ -100,7 +51,13 @@ class NotificationService:
 
 
 class OTPService:
+    """
+    OTP state lives in Redis (OTPStore): script calls per send (one for the
+    IP window, one for the phone) and one per verify cover the code, attempts,
+    resend cooldown, phone / IP sliding windows and the abuse block. The DB only gets rows when OTP_DB_AUDIT is on.
+    """
     MAX_ATTEMPTS = 5
+    MAX_SENDS_PER_HOUR = 5
     RESEND_COOLDOWN_SECONDS = getattr(settings, "OTP_RESEND_COOLDOWN", 60)
     EXPIRY_SECONDS = getattr(settings, "OTP_EXPIRY_SECONDS", 300)
 
@@ -117,53 +74,55 @@ class OTPService:
         if len(phone) < 10 or len(phone) > 15:
              raise BusinessLogicException("Invalid phone number format", code="invalid_format")
 
-        rate_key = f"otp_rate:{phone}"
-        attempts = cache.get(rate_key, 0)
-        if attempts >= 5:
-            raise BusinessLogicException("Too many OTP requests. Try again later.", code="rate_limited")
-        cache.set(rate_key, attempts + 1, timeout=3600)
+        otp = OTPService.generate_otp()
+        try:
+            status, wait_ms = OTPStore.issue(
+                phone, otp,
+                ttl=OTPService.EXPIRY_SECONDS,
+                cooldown=OTPService.RESEND_COOLDOWN_SECONDS,
+                phone_limit=OTPService.MAX_SENDS_PER_HOUR,
+                ip_address=ip_address,
+                ip_limit=OTPAbuseService.IP_MAX_REQUESTS_PER_HOUR,
+            )
+        except redis.RedisError as e:
+            logger.error(f"OTP store unavailable: {e}")
+            raise BusinessLogicException("OTP service temporarily unavailable", code="otp_unavailable")
 
-        cooldown_key = f"otp_cooldown:{phone}"
-        if cache.get(cooldown_key):
-             ttl = cache.ttl(cooldown_key)
-             raise BusinessLogicException(f"Please wait {ttl} seconds before retrying", code="rate_limit")
+        if status != "ok":
+            OTPAbuseService.raise_for(status, wait_ms)
 
-        OTPAbuseService.check(phone, ip_address)
+        logger.info(f" [DEV OTP] Phone: {phone} | Code : {otp}")
+        minutes = max(1, OTPService.EXPIRY_SECONDS // 60)
+        send_otp_sms.delay(phone, f"Your login code is {otp}. Valid for {minutes} minute(s).")
 
-        with transaction.atomic():
-            otp = OTPService.generate_otp()
-            logger.info(f" [DEV OTP] Phone: {phone} | Code : {otp}")
-            PhoneOTP.objects.filter(phone=phone, is_verified=False).delete()
+        if settings.OTP_DB_AUDIT:
             PhoneOTP.objects.create(phone=phone, otp=otp)
-            cache.set(cooldown_key, "1", timeout=OTPService.RESEND_COOLDOWN_SECONDS)
-
-            minutes = max(1, OTPService.EXPIRY_SECONDS // 60)
-            msg = f"Your login code is {otp}. Valid for {minutes} minute(s)."
-            transaction.on_commit(lambda: send_otp_sms.delay(phone, msg))
-            return otp
+        return otp
 
     @staticmethod
     def verify(phone: str, otp: str) -> bool:
         try:
-            record = PhoneOTP.objects.filter(phone=phone, is_verified=False).latest("created_at")
-        except PhoneOTP.DoesNotExist:
-             raise BusinessLogicException("OTP not found or expired", code="otp_invalid")
-
-        if record.is_expired():
-             raise BusinessLogicException("OTP expired", code="otp_expired")
+            status, block_ms = OTPStore.check(
+                phone, str(otp),
+                max_attempts=OTPService.MAX_ATTEMPTS,
+                max_fails=OTPAbuseService.MAX_FAILS,
+                block_seconds=OTPAbuseService.BLOCK_MINUTES * 60,
+            )
+        except redis.RedisError as e:
+            logger.error(f"OTP store unavailable: {e}")
+            raise BusinessLogicException("OTP service temporarily unavailable", code="otp_unavailable")
 
-        if record.attempts >= OTPService.MAX_ATTEMPTS:
+        if status == "missing":
+             raise BusinessLogicException("OTP not found or expired", code="otp_invalid")
+        if status == "attempts":
              raise BusinessLogicException("Too many attempts. Request a new OTP.", code="otp_limit")
-
-        if not secrets.compare_digest(record.otp, otp):
-            record.attempts += 1
-            record.save(update_fields=["attempts"])
-            OTPAbuseService.record_failure(phone)
+        if status != "ok":
+            if status == "invalid_blocked":
+                OTPAbuseService.audit_block(phone, block_ms)
             raise BusinessLogicException("Invalid OTP", code="otp_invalid")
 
-        record.is_verified = True
-        record.save(update_fields=["is_verified"])
-        OTPAbuseService.reset(phone)
+        if settings.OTP_DB_AUDIT:
+            PhoneOTP.objects.filter(phone=phone, is_verified=False).update(is_verified=True)
         return True
 
 class OTPAbuseService:
@@ -172,28 +131,27 @@ class OTPAbuseService:
     IP_MAX_REQUESTS_PER_HOUR = 50 
 
     @staticmethod
-    def check(phone, ip_address=None):
-        log, _ = OTPAbuseLog.objects.get_or_create(phone=phone)
-        if log.is_blocked():
-             raise BusinessLogicException(f"Blocked until {log.blocked_until.strftime('%H:%M')}", code="otp_blocked")
-        if ip_address:
-            ip_key = f"otp_ip_limit:{ip_address}"
-            try:
-                count = cache.incr(ip_key)
-            except ValueError:
-                cache.set(ip_key, 1, timeout=3600)
-                count = 1
-            if count > OTPAbuseService.IP_MAX_REQUESTS_PER_HOUR:
-                raise BusinessLogicException("Too many requests from this device", code="ip_blocked")
-
-    @staticmethod
-    def record_failure(phone):
-        log, _ = OTPAbuseLog.objects.get_or_create(phone=phone)
-        log.failed_attempts += 1
-        if log.failed_attempts >= OTPAbuseService.MAX_FAILS:
-            log.blocked_until = timezone.now() + timedelta(minutes=OTPAbuseService.BLOCK_MINUTES)
-        log.save()
+    def raise_for(status, wait_ms):
+        """Turns an OTPStore limit status into the API error."""
+        wait_seconds = max(1, -(-wait_ms // 1000))
+        if status == "blocked":
+            blocked_until = timezone.localtime() + timedelta(milliseconds=wait_ms)
+            raise BusinessLogicException(f"Blocked until {blocked_until.strftime('%H:%M')}", code="otp_blocked")
+        if status == "cooldown":
+            raise BusinessLogicException(f"Please wait {wait_seconds} seconds before retrying", code="rate_limit")
+        if status == "ip_limit":
+            raise BusinessLogicException("Too many requests from this device", code="ip_blocked")
+        raise BusinessLogicException("Too many OTP requests. Try again later.", code="rate_limited")
 
     @staticmethod
-    def reset(phone):
-        OTPAbuseLog.objects.filter(phone=phone).delete()
\ No newline at end of file
+    def audit_block(phone, block_ms):
+        """Blocks are enforced in Redis; the row only keeps them visible in the admin."""
+        if not settings.OTP_DB_AUDIT:
+            return
+        OTPAbuseLog.objects.update_or_create(
+            phone=phone,
+            defaults={
+                "failed_attempts": OTPAbuseService.MAX_FAILS,
+                "blocked_until": timezone.now() + timedelta(milliseconds=block_ms),
+            },
+        )
@@ -1,29 +1,8 @@
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from apps.inventory.models import InventoryTransaction
 from apps.catalog.models import FlashSale, Product, Category, Banner
 from apps.notifications.services import NotificationService
 
-# =========================================================
-# 1. INVENTORY & STOCK ALERTS
-# =========================================================
-@receiver(post_save, sender=InventoryTransaction)
-def notify_new_stock(sender, instance, created, **kwargs):
-    valid_transaction_types = ["add", "restock", "in"] 
-    if created and instance.transaction_type in valid_transaction_types:
-        inventory_item = instance.inventory_item
-        product_name = inventory_item.product_name
-        description = ""
-        if hasattr(inventory_item, 'product') and inventory_item.product:
-            description = str(inventory_item.product.description)[:100] + "..."
-        
-        NotificationService.send_global_push(
-            topic="new_arrivals",
-            title="Stock Update! 🎉",
-            message=f"Hurry! {product_name} is back in stock. {description}",
-            extra_data={"sku": inventory_item.sku, "type": "inventory"}
-        )
-
 @receiver(pre_save, sender=Product)
 def track_product_price_change(sender, instance, **kwargs):
     if instance.pk:
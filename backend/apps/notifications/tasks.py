@@ -1,15 +1,12 @@
-import requests
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from django.conf import settings
-from celery import shared_task
-from firebase_admin import messaging
-from celery.utils.log import get_task_logger
 from django.contrib.auth import get_user_model
 
-from celery import shared_task
-from firebase_admin import messaging
-import logging
+from apps.accounts.models import UserDevice
+from apps.utils.batching import BatchTask
+from apps.utils.clients import get_messaging, get_twilio_client
+from apps.utils.resilience import fcm_breaker, twilio_breaker, CircuitBreakerOpenException
 
 User = get_user_model()
 logger = get_task_logger(__name__)
@@ -18,7 +15,6 @@ logger = get_task_logger(__name__)
     bind=True, 
     max_retries=3, 
     default_retry_delay=5, 
-    queue='high_priority' 
 )
 def send_otp_sms(self, phone, content):
     """
@@ -33,12 +29,15 @@ def send_otp_sms(self, phone, content):
         logger.warning("Twilio config missing. SMS not sent. Relying on API fallback.")
         return "Config Missing - Fallback Active"
 
+    from twilio.base.exceptions import TwilioRestException
+
     try:
         # Twilio Client Initialize
-        client = Client(account_sid, auth_token)
+        client = get_twilio_client(account_sid, auth_token)
         
         # SMS Send Request
-        message = client.messages.create(
+        message = twilio_breaker.call(
+            client.messages.create,
             body=content,
             from_=twilio_number,
             to=phone
@@ -46,6 +45,9 @@ def send_otp_sms(self, phone, content):
         logger.info(f"Twilio SMS sent successfully to {phone}. SID: {message.sid}")
         return f"Sent: {message.sid}"
 
+    except CircuitBreakerOpenException as e:
+        logger.warning(f"Twilio circuit open, SMS to {phone} deferred")
+        raise self.retry(exc=e, countdown=twilio_breaker.recovery_timeout)
     except TwilioRestException as e:
         logger.error(f"Twilio API Error: {e}")
         # Agar Server error ya Rate Limit error aaye, toh Task retry karega
@@ -68,6 +70,7 @@ def send_push_to_topic_task(topic, title, body, data=None):
         if data:
             stringified_data = {str(k): str(v) for k, v in data.items()}
 
+        messaging = get_messaging()
         message = messaging.Message(
             notification=messaging.Notification(
                 title=title,
@@ -76,7 +79,7 @@ def send_push_to_topic_task(topic, title, body, data=None):
             topic=topic,
             data=stringified_data # 🔥 CHANGE: Yahan stringified_data pass kiya hai
         )
-        response = messaging.send(message)
+        response = fcm_breaker.call(messaging.send, message)
         logger.info(f"[FCM] Successfully sent message to topic '{topic}': {response}")
         return response
     except Exception as e:
@@ -115,6 +118,7 @@ def send_push_to_user_task(user_id, title, body, data=None):
             stringified_data = {str(k): str(v) for k, v in data.items()}
 
         # MulticastMessage ka use karke ek sath sabhi devices par bhejna
+        messaging = get_messaging()
         message = messaging.MulticastMessage(
             notification=messaging.Notification(
                 title=title,
@@ -123,10 +127,75 @@ def send_push_to_user_task(user_id, title, body, data=None):
             tokens=tokens,
             data=stringified_data 
         )
-        response = messaging.send_each_for_multicast(message)
+        response = fcm_breaker.call(messaging.send_each_for_multicast, message)
         logger.info(f"[FCM] Multicast sent to {len(tokens)} tokens. Success: {response.success_count}, Failure: {response.failure_count}")
         return f"Success: {response.success_count}, Failure: {response.failure_count}"
         
     except Exception as e:
         logger.error(f"[FCM] Error sending message to user '{user.phone}': {e}")
-        return str(e)
\ No newline at end of file
+        return str(e)
+
+
+# FCM accepts at most 500 messages per send_each call
+FCM_BATCH_LIMIT = 500
+
+
+def _user_tokens(user_ids):
+    """{user_id: [fcm tokens]}: registered devices first, legacy User.fcm_token otherwise."""
+    tokens = {}
+    for user_id, token in UserDevice.objects.filter(user_id__in=user_ids).values_list("user_id", "fcm_token"):
+        if token:
+            tokens.setdefault(user_id, []).append(token)
+
+    missing = set(user_ids) - tokens.keys()
+    if missing:
+        for user_id, token in User.objects.filter(id__in=missing).values_list("id", "fcm_token"):
+            if token:
+                tokens[user_id] = [token]
+    return tokens
+
+
+@shared_task(base=BatchTask, stream="batch:push", batch_size=FCM_BATCH_LIMIT)
+def send_push_batch(payloads):
+    """
+    Batch consumer for NotificationService.send_push / send_global_push.
+    Payloads: {"user_id" | "topic", "title", "body", "data"}; one device lookup
+    per batch and one FCM call per 500 messages.
+    """
+    messaging = get_messaging()
+    tokens = _user_tokens({p["user_id"] for p in payloads if "user_id" in p})
+
+    messages = []
+    for payload in payloads:
+        android_config = messaging.AndroidConfig(
+            notification=messaging.AndroidNotification(
+                title=payload["title"],
+                body=payload["body"],
+                sound='default'
+            )
+        )
+        if "topic" in payload:
+            messages.append(messaging.Message(topic=payload["topic"], data=payload["data"], android=android_config))
+            continue
+
+        user_tokens = tokens.get(payload["user_id"])
+        if not user_tokens:
+            logger.warning(f"[PUSH] User {payload['user_id']} has no active FCM devices.")
+            continue
+        for token in user_tokens:
+            messages.append(messaging.Message(
+                token=token,
+                data=payload["data"],
+                android=android_config,
+                webpush=messaging.WebpushConfig(headers={"Urgency": "high"}),
+            ))
+
+    success = failure = 0
+    for start in range(0, len(messages), FCM_BATCH_LIMIT):
+        # Open circuit raises: the batch stays pending in the stream for the next drain
+        response = fcm_breaker.call(messaging.send_each, messages[start:start + FCM_BATCH_LIMIT])
+        success += response.success_count
+        failure += response.failure_count
+
+    logger.info(f"[FCM] Batch of {len(payloads)} pushes sent. Success: {success}, Failure: {failure}")
+    return f"Success: {success}, Failure: {failure}"
@@ -1,9 +1,8 @@
 import logging
-from firebase_admin import messaging
 from apps.accounts.models import UserDevice
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
+from apps.utils.throttling import ScopedRateThrottle
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
 from rest_framework import generics
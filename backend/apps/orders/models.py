@@ -3,7 +3,6 @@ from django.db import models
 from django.utils import timezone
 from apps.warehouse.models import Warehouse
 from apps.catalog.models import Product
-from decimal import Decimal
 
 User = settings.AUTH_USER_MODEL
 
@@ -100,13 +99,8 @@ class Cart(models.Model):
 
     @property
     def delivery_fee(self):
-        config = OrderConfiguration.objects.first()
-        fee = config.delivery_fee if config else Decimal("5.00")
-        threshold = config.free_delivery_threshold if config else Decimal("100.00")
-        
-        if self.total_amount >= threshold:
-            return Decimal("0.00")
-        return fee
+        from apps.core.runtime_config import RuntimeConfig
+        return RuntimeConfig.delivery_fee(self.total_amount)
 
     @property
     def final_total(self):
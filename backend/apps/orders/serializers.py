@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from decimal import Decimal
+from django.db.models import Count
 from .models import Order, OrderItem, Cart, CartItem
 from apps.catalog.models import Product
 from apps.pricing.services import SurgePricingService
+from apps.utils.values_serializers import ValuesSerializer
+from apps.core.runtime_config import RuntimeConfig
 
 class CartItemSerializer(serializers.ModelSerializer):
     sku_code = serializers.CharField(source='sku.sku', read_only=True)
@@ -38,6 +40,63 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ('id', 'items', 'total_amount', 'delivery_fee', 'final_total', 'warehouse')
 
+class CartItemValuesSerializer(ValuesSerializer):
+    """CartItemSerializer from values() rows; product images come from one query per cart."""
+    serializer_class = CartItemSerializer
+    extra_values = ('sku__price', 'quantity')
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.images = dict(
+            Product.objects.filter(sku__in={row['sku__sku'] for row in rows}).values_list('sku', 'image')
+        )
+        return super().serialize(rows)
+
+    def get_total_price(self, row):
+        return row['sku__price'] * row['quantity']
+
+    def get_image(self, row):
+        image = self.images.get(row['sku__sku'])
+        if not image:
+            return None
+
+        if image.startswith('http'):
+            return image
+
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(image)
+
+        return image
+
+
+class CartValuesSerializer(ValuesSerializer):
+    """
+    CartSerializer in three queries (items, images, delivery config) instead of
+    one per item plus repeated totals / OrderConfiguration lookups.
+    """
+    serializer_class = CartSerializer
+
+    def serialize_cart(self, cart):
+        item_serializer = CartItemValuesSerializer(self.context)
+        items = item_serializer.serialize(item_serializer.values(CartItem.objects.filter(cart_id=cart.id)))
+
+        total_amount = sum(item['total_price'] for item in items)
+        delivery_fee = RuntimeConfig.delivery_fee(total_amount)
+
+        return self.to_representation({
+            'id': cart.id,
+            'warehouse': cart.warehouse_id,
+            'items': items,
+            'total_amount': total_amount,
+            'delivery_fee': delivery_fee,
+            'final_total': total_amount + delivery_fee,
+        })
+
+    def get_items(self, row):
+        return row['items']
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     sku_image = serializers.SerializerMethodField()
     sku_name = serializers.CharField(source='product_name', read_only=True)
@@ -124,6 +183,18 @@ class OrderListSerializer(serializers.ModelSerializer):
     def get_item_count(self, obj):
         return obj.items.count()
 
+
+class OrderListValuesSerializer(ValuesSerializer):
+    """OrderListSerializer from values() rows, item counts annotated in the same query."""
+    serializer_class = OrderListSerializer
+    extra_values = ('item_count',)
+
+    def values(self, queryset):
+        return super().values(queryset.annotate(item_count=Count('items')))
+
+    def get_item_count(self, row):
+        return row['item_count']
+
 class CreateOrderSerializer(serializers.Serializer):
     payment_method = serializers.ChoiceField(choices=Order.PAYMENT_METHOD_CHOICES, default="COD")
     
@@ -137,4 +208,4 @@ class CreateOrderSerializer(serializers.Serializer):
     
     max_accepted_amount = serializers.DecimalField(
         max_digits=10, decimal_places=2, required=False, allow_null=True
-    )
\ No newline at end of file
+    )
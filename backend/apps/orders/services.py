@@ -9,9 +9,10 @@ from django.utils import timezone
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from apps.inventory.models import InventoryItem, InventoryTransaction
-from apps.inventory.services import InventoryService
+from apps.inventory.services import InventoryService, ReservationLedger
 from apps.pricing.services import SurgePricingService
 from apps.audit.services import AuditService
+from apps.core.runtime_config import RuntimeConfig
 from apps.customers.models import CustomerAddress
 from apps.warehouse.models import Warehouse, PickingTask, PackingTask
 from apps.warehouse.services import WarehouseOperationsService
@@ -65,7 +66,7 @@ class OrderService:
         if payment_method is None:
             payment_method = "cash"
         
-        InventoryService.bulk_lock_and_reserve(
+        allocations = InventoryService.bulk_lock_and_reserve(
             warehouse_id=warehouse.id,
             items_dict={i['sku']: i['quantity'] for i in items},
             reference=f"order_init_{user.id}"
@@ -77,15 +78,18 @@ class OrderService:
             items_data=items,
             delivery_type=delivery_type,
             address_id=address_id,
-            payment_method=payment_method
+            payment_method=payment_method,
+            allocations=allocations
         )
 
     @staticmethod
     @transaction.atomic
-    def create_order_after_reservation(user, warehouse_id, items_data, delivery_type, address_id, payment_method):
+    def create_order_after_reservation(user, warehouse_id, items_data, delivery_type, address_id, payment_method, allocations=None):
         """
         Creates Order. 
         Validation Order: Abuse -> Ownership -> GeoFence -> Inventory -> Surge -> Save.
+        `allocations` ({sku: [(batch_id, qty)]}) from bulk_lock_and_reserve pins the
+        fulfillment records to the batches that were actually reserved.
         """
         try:
             OrderAbuseService.check(user)
@@ -137,25 +141,45 @@ class OrderService:
         )
 
         total = Decimal("0.00")
+
+        reserved_batches = {}
+        if allocations:
+            reserved_batches = InventoryItem.objects.in_bulk(
+                [batch_id for batches in allocations.values() for batch_id, _ in batches]
+            )
         
         # --- NEW FIFO LOGIC ADDED HERE (Purana loop replace kiya hai) ---
         for item in items_data:
             sku = item["sku"]
             qty = int(item["quantity"])
             if qty <= 0: raise BusinessLogicException(f"Invalid quantity: {sku}")
-            
-            # 1. Available Batches nikalo (Oldest First for FIFO)
-            available_batches = InventoryItem.objects.filter(
-                sku=sku,
-                bin__rack__aisle__zone__warehouse=warehouse,
-                total_stock__gt=0
-            ).order_by('created_at')
-
-            if not available_batches.exists():
+
+            if allocations and allocations.get(sku):
+                # Reservation already picked the batches; record exactly those.
+                allocated = [(reserved_batches[batch_id], qty_taken) for batch_id, qty_taken in allocations[sku]]
+            else:
+                # 1. Available Batches nikalo (Oldest First for FIFO)
+                available_batches = InventoryItem.objects.filter(
+                    sku=sku,
+                    bin__rack__aisle__zone__warehouse=warehouse,
+                    total_stock__gt=0
+                ).order_by('created_at')
+
+                # 2. FIFO Allocation - Distribute quantity across batches
+                allocated = []
+                qty_remaining = qty
+                for batch in available_batches:
+                    if qty_remaining <= 0:
+                        break
+                    qty_to_take = min(batch.total_stock, qty_remaining)
+                    allocated.append((batch, qty_to_take))
+                    qty_remaining -= qty_to_take
+
+            if not allocated:
                 raise BusinessLogicException(f"Item {sku} unavailable")
             
             # Product Details (Pehle batch se le lo)
-            primary_batch = available_batches.first()
+            primary_batch = allocated[0][0]
 
             order_item = OrderItem.objects.create(
                 order=order, sku=sku, product_name=primary_batch.product_name,
@@ -163,16 +187,7 @@ class OrderService:
             )
             total += primary_batch.price * qty
 
-            # 2. FIFO Allocation - Distribute quantity across batches
-            qty_remaining = qty
-            for batch in available_batches:
-                if qty_remaining <= 0:
-                    break
-                
-                # Check kitna stock is batch se le sakte hain
-                batch_stock = batch.total_stock
-                qty_to_take = min(batch_stock, qty_remaining)
-                
+            for batch, qty_to_take in allocated:
                 # 3. Kiska maal gaya uska hisaab lagao
                 # 🔥 FIX: Null/NoneType handle kiya taaki crash na ho
                 cost_val = getattr(batch, 'cost_price', 0)
@@ -187,25 +202,15 @@ class OrderService:
                     quantity_allocated=qty_to_take,
                     vendor_payable_amount=payable_amt
                 )
-                
-                qty_remaining -= qty_to_take
 
-            if qty_remaining > 0:
+            if sum(qty_taken for _, qty_taken in allocated) < qty:
                 logger.error(f"Fulfillment mismatch for {sku} in order {order.id}")
         # --- END OF NEW LOGIC ---
 
         surge_multiplier = SurgePricingService.calculate(order)
         
-        from apps.orders.models import OrderConfiguration
-        config = OrderConfiguration.objects.first()
-        base_delivery_fee = config.delivery_fee if config else Decimal("5.00")
-        threshold = config.free_delivery_threshold if config else Decimal("100.00")
-        
-        if total >= threshold:
-            actual_delivery_fee = Decimal("0.00")
-        else:
-            actual_delivery_fee = base_delivery_fee 
-        
+        actual_delivery_fee = RuntimeConfig.delivery_fee(total)
+
         order.total_amount = total + actual_delivery_fee
         
         if hasattr(order, "surge_multiplier"): 
@@ -216,6 +221,9 @@ class OrderService:
         transaction.on_commit(lambda: AuditService.order_created(order))
         transaction.on_commit(lambda: OrderService._broadcast_status(order))
 
+        if payment_method == "RAZORPAY":
+            transaction.on_commit(lambda: ReservationLedger.hold(order.id))
+
         return order
 
     @staticmethod
@@ -227,9 +235,7 @@ class OrderService:
 
         order.status = "cancelled"; order.save(update_fields=["status", "updated_at"])
 
-        for order_item in order.items.all():
-            inv = InventoryItem.objects.filter(sku=order_item.sku, bin__rack__aisle__zone__warehouse=order.fulfillment_warehouse).first()
-            if inv: InventoryService.release_stock(inv.id, order_item.quantity, f"cancel:{order.id}")
+        InventoryService.release_stock_for_order(order, reference=f"cancel:{order.id}")
 
         if hasattr(order, "payment") and order.payment.status == "paid":
             from apps.payments.refund_services import RefundService
@@ -237,7 +243,43 @@ class OrderService:
 
         OrderAbuseService.record_cancel(order.user)
         AuditService.order_cancelled(order)
+        transaction.on_commit(lambda: ReservationLedger.convert(order.id))
+        transaction.on_commit(lambda: OrderService._broadcast_status(order))
+
+    @staticmethod
+    @transaction.atomic
+    def expire_reservation(order_id):
+        """
+        Releases stock held by an unpaid online checkout once its reservation TTL lapses.
+        Locks Payment before Order (same order as PaymentService.mark_paid).
+        """
+        from apps.payments.models import Payment
+
+        payment = Payment.objects.select_for_update().filter(order_id=order_id).first()
+        if payment and payment.status == "paid":
+            return False
+
+        order = Order.objects.select_for_update().filter(id=order_id).first()
+        if not order or order.status != "created":
+            return False
+
+        if payment and payment.status != "failed":
+            payment.status = "failed"
+            payment.save(update_fields=["status", "updated_at"])
+
+        InventoryService.release_stock_for_order(order, reference=f"reservation_expired:{order.id}")
+
+        order.status = "cancelled"
+        order.save(update_fields=["status", "updated_at"])
+
+        AuditService.log(
+            action="reservation_expired",
+            reference_id=str(order.id),
+            user=order.user,
+            metadata={"payment_id": payment.id if payment else None},
+        )
         transaction.on_commit(lambda: OrderService._broadcast_status(order))
+        return True
 
 class OrderSimulationService:
     @staticmethod
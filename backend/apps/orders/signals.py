@@ -1,13 +1,14 @@
 import logging
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.db import transaction
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
-from .models import Order
+from .models import Order, OrderConfiguration
 from apps.delivery.tasks import assign_rider_to_order
 from apps.notifications.services import NotificationService # Import zaroori hai
+from apps.core.runtime_config import RuntimeConfig, DELIVERY_PRICING
 
 logger = logging.getLogger(__name__)
 
@@ -83,4 +84,10 @@ def notify_customer_order_updates(sender, instance, created, **kwargs):
                 )
                 logger.info(f"Push notification triggered for User {instance.user.phone}, Order ID {instance.id}, Status {current_status}")
             except Exception as e:
-                logger.error(f"Failed to send push notification for Order {instance.id}: {e}")
\ No newline at end of file
+                logger.error(f"Failed to send push notification for Order {instance.id}: {e}")
+
+
+@receiver(post_save, sender=OrderConfiguration)
+@receiver(post_delete, sender=OrderConfiguration)
+def refresh_delivery_pricing(sender, instance, **kwargs):
+    RuntimeConfig.invalidate_on_commit(DELIVERY_PRICING)
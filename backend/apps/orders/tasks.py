@@ -49,4 +49,39 @@ def send_order_confirmation_email(self, order_id, user_email):
         
     except Exception as e:
         logger.error(f"Email failed: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+@shared_task
+def release_expired_reservations(batch_size=200):
+    """
+    Sweeper: returns stock held by abandoned online checkouts.
+    Driven by the Redis expiry ledger, with a DB scan as a safety net for
+    orders whose ledger entry was never written (e.g. Redis was down).
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from apps.inventory.services import ReservationLedger
+    from .services import OrderService
+
+    order_ids = set(ReservationLedger.claim_expired(limit=batch_size))
+
+    stale_before = timezone.now() - timedelta(seconds=settings.RESERVATION_TTL_SECONDS * 2)
+    order_ids.update(
+        Order.objects.filter(
+            status="created", payment_method="RAZORPAY", created_at__lt=stale_before
+        ).exclude(payment__status="paid").values_list("id", flat=True)[:batch_size]
+    )
+
+    released = 0
+    for order_id in sorted(order_ids):
+        try:
+            if OrderService.expire_reservation(order_id):
+                released += 1
+        except Exception as e:
+            logger.error(f"Reservation expiry failed for Order {order_id}: {e}")
+            ReservationLedger.hold(order_id, ttl=60)
+
+    if released:
+        logger.info(f"Released {released} expired reservations")
+    return f"Released {released} of {len(order_ids)} expired reservations"
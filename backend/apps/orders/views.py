@@ -12,10 +12,10 @@ from apps.warehouse.services import WarehouseService
 from apps.payments.services import PaymentService
 from .models import Order, Cart, CartItem
 from .services import OrderService
-from .serializers import CreateOrderSerializer, CartSerializer, OrderListSerializer, OrderSerializer
+from .serializers import CartValuesSerializer, OrderListValuesSerializer
 from .services import OrderService, OrderSimulationService 
 
-from .serializers import CreateOrderSerializer, CartSerializer, OrderListSerializer, OrderSerializer
+from .serializers import CreateOrderSerializer, OrderListSerializer, OrderSerializer
 from apps.utils.idempotency import idempotent
 from apps.accounts.permissions import IsCustomer
 
@@ -51,13 +51,17 @@ class ValidateCartAPIView(APIView):
             }, status=status.HTTP_409_CONFLICT)
 
         unavailable_items = []
-        for item in cart.items.select_related('sku').all():
-           
-            if item.sku.available_stock < item.quantity:
+        cart_items = list(cart.items.select_related('sku').all())
+        available = InventoryService.get_available_stock(
+            current_warehouse.id, [item.sku.sku for item in cart_items]
+        )
+        for item in cart_items:
+            in_stock = available.get(item.sku.sku, 0)
+            if in_stock < item.quantity:
                 unavailable_items.append({
                     "sku": item.sku.sku,
                     "product_name": item.sku.product_name,
-                    "reason": f"Only {item.sku.available_stock} left"
+                    "reason": f"Only {in_stock} left"
                 })
 
         if unavailable_items:
@@ -126,7 +130,7 @@ class CreateOrderAPIView(APIView):
 
             # 🔥 FIX: Transaction Block andar dala taaki sirf database operation atomic rahe
             with transaction.atomic():
-                InventoryService.bulk_lock_and_reserve(
+                allocations = InventoryService.bulk_lock_and_reserve(
                     warehouse_id=warehouse.id,
                     items_dict={i['sku']: i['quantity'] for i in items_data},
                     reference=f"order_init_{request.user.id}"
@@ -138,7 +142,8 @@ class CreateOrderAPIView(APIView):
                     items_data=items_data,
                     delivery_type=data['delivery_type'],
                     address_id=address.id,
-                    payment_method=data['payment_method']
+                    payment_method=data['payment_method'],
+                    allocations=allocations
                 )
 
                 cart.items.all().delete()
@@ -170,12 +175,21 @@ class CreateOrderAPIView(APIView):
 
 class MyOrdersAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    use_read_replica = True
     serializer_class = OrderListSerializer
     pagination_class = StandardResultsSetPagination 
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user).order_by("-created_at")
 
+    def list(self, request, *args, **kwargs):
+        serializer = OrderListValuesSerializer(self.get_serializer_context())
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+
 class OrderDetailAPIView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
@@ -194,7 +208,7 @@ class CartAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         cart, _ = Cart.objects.get_or_create(user=request.user)
-        return Response(CartSerializer(cart).data)
+        return Response(CartValuesSerializer().serialize_cart(cart))
 
 class AddToCartAPIView(APIView):
     """
@@ -253,7 +267,7 @@ class AddToCartAPIView(APIView):
                 defaults={'quantity': qty}
             )
 
-        return Response(CartSerializer(cart).data)
+        return Response(CartValuesSerializer().serialize_cart(cart))
 
 class OrderSimulationAPIView(APIView):
     permission_classes = [permissions.IsAdminUser]
@@ -8,7 +8,7 @@ from import_export import resources, fields, widgets
 from import_export.widgets import ForeignKeyWidget
 from import_export.admin import ImportExportModelAdmin
 
-from .models import Payment, Refund
+from .models import Payment, Refund, WebhookEvent
 from apps.orders.models import Order
 from django.contrib.auth import get_user_model
 
@@ -203,4 +203,27 @@ class RefundAdmin(ImportExportModelAdmin):
     @admin.action(description="❌ Mark selected refunds as Failed")
     def mark_failed(self, request, queryset):
         updated = queryset.update(status='failed')
-        self.message_user(request, f"{updated} refunds marked as Failed.")
\ No newline at end of file
+        self.message_user(request, f"{updated} refunds marked as Failed.")
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    """Webhook inbox: stuck or dead events can be requeued once the cause is fixed."""
+    list_display = ('id', 'event', 'payment_ref', 'status_badge', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event', 'provider')
+    search_fields = ('event_id', 'payment_ref')
+    readonly_fields = [f.name for f in WebhookEvent._meta.fields]
+    list_per_page = 50
+    date_hierarchy = 'received_at'
+
+    actions = ['requeue']
+
+    def status_badge(self, obj):
+        colors = {'pending': '#ffc107', 'processed': '#28a745', 'ignored': '#6c757d', 'failed': '#fd7e14', 'dead': '#dc3545'}
+        color = colors.get(obj.status, '#6c757d')
+        return format_html('<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 4px; font-size: 0.8em; font-weight: bold;">{}</span>', color, obj.get_status_display().upper())
+    status_badge.short_description = "Status"
+
+    @admin.action(description="🔄 Requeue selected events")
+    def requeue(self, request, queryset):
+        updated = queryset.filter(status__in=('failed', 'dead')).update(status='pending', attempts=0)
+        self.message_user(request, f"{updated} webhook events requeued.")
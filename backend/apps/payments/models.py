@@ -59,4 +59,45 @@ class Refund(models.Model):
         ]
 
     def __str__(self):
-        return f"Refund {self.id} ({self.status})"
\ No newline at end of file
+        return f"Refund {self.id} ({self.status})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox for gateway webhooks: the view stores the verified event and returns,
+    process_webhook_events applies it (apps.payments.webhook_services).
+    """
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("processed", "Processed"),
+        ("ignored", "Ignored"),
+        ("failed", "Failed"),
+        ("dead", "Dead"),
+    )
+
+    provider = models.CharField(max_length=50, default="razorpay")
+    event_id = models.CharField(max_length=100)
+    event = models.CharField(max_length=100)
+    # Provider payment id the event belongs to; events of one payment are applied in order
+    payment_ref = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField()
+    # Provider's event timestamp (epoch seconds); orders a payment's events within a batch
+    provider_created_at = models.BigIntegerField(null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "event_id"], name="uniq_webhook_event"),
+        ]
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(status__in=["pending", "failed"]), name="webhook_event_todo"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event} {self.event_id} ({self.status})"
@@ -1,20 +1,15 @@
-import razorpay
 import logging
-from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 
 from .models import Payment, Refund
 from apps.audit.services import AuditService
+from apps.utils.clients import get_razorpay_client
+from apps.utils.resilience import razorpay_breaker, CircuitBreakerOpenException
 from apps.utils.exceptions import BusinessLogicException
 
 logger = logging.getLogger(__name__)
 
-try:
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-except Exception:
-    client = None
-
 class RefundService:
     @staticmethod
     def initiate_refund(payment: Payment) -> Refund:
@@ -75,6 +70,7 @@ class RefundService:
         """
         Phase 2: External Call. (Dono Full aur Partial Refund ko handle karta hai)
         """
+        client = get_razorpay_client()
         if not client: return
 
         try:
@@ -87,7 +83,7 @@ class RefundService:
             amount_paise = int(refund.amount * 100)
 
             # Razorpay automatically detect kar leta hai agar amount total se kam ho toh (Partial Refund)
-            razorpay_refund = client.payment.refund(payment.provider_payment_id, {
+            razorpay_refund = razorpay_breaker.call(client.payment.refund, payment.provider_payment_id, {
                 "amount": amount_paise,
                 "speed": "normal",
                 "notes": {"order_id": str(payment.order.id)}
@@ -101,5 +97,8 @@ class RefundService:
                 
                 AuditService.refund_completed(refund)
 
+        except CircuitBreakerOpenException:
+            # Nothing was sent; let process_refund_task retry once Razorpay recovers
+            raise
         except Exception as e:
             logger.error(f"Refund Gateway Error: {e}")
\ No newline at end of file
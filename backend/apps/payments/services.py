@@ -1,7 +1,9 @@
-import razorpay
+import time
 import logging
 import hmac
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from decimal import Decimal
 from django.conf import settings
 from django.db import transaction
@@ -12,13 +14,12 @@ from .models import Payment
 from apps.audit.services import AuditService
 from apps.delivery.tasks import retry_auto_assign_rider
 from apps.delivery.auto_assign import AutoRiderAssignmentService
-from apps.utils.resilience import CircuitBreaker, CircuitBreakerOpenException
+from apps.utils.resilience import razorpay_breaker, CircuitBreakerOpenException
 from apps.utils.exceptions import BusinessLogicException
-
-try:
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-except Exception:
-    client = None
+from apps.inventory.services import ReservationLedger
+from apps.utils.clients import get_razorpay_client
+from apps.utils import locks
+from apps.utils.throttling import RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -37,21 +38,17 @@ class PaymentService:
         if hasattr(order, "payment"):
             return order.payment
 
+        client = get_razorpay_client()
         if not client:
             raise BusinessLogicException("Payment Gateway not configured", code="config_error")
 
-        @CircuitBreaker(service_name="razorpay", failure_threshold=5, recovery_timeout=30)
-        def _call_gateway():
-            amount_paise = int(order.total_amount * 100)
-            return client.order.create({
-                "amount": amount_paise,
+        try:
+            razorpay_order = razorpay_breaker.call(client.order.create, {
+                "amount": int(order.total_amount * 100),
                 "currency": "INR",
                 "receipt": str(order.id),
                 "notes": {"order_id": str(order.id)}
             })
-
-        try:
-            razorpay_order = _call_gateway()
         except CircuitBreakerOpenException:
             raise BusinessLogicException("Payment system busy. Please try later.", code="gateway_down")
         except Exception as e:
@@ -91,11 +88,17 @@ class PaymentService:
 
         order = payment.order
         if order.status == "cancelled":
-             logger.warning(f"Payment received for cancelled order {order.id}. Auto-refund logic required.")
-        else:
-            order.status = "confirmed"
-            order.save(update_fields=["status"])
+            # e.g. the reservation expired before the gateway confirmed; stock is already released.
+            logger.warning(f"Payment received for cancelled order {order.id}. Initiating refund.")
+            from .refund_services import RefundService
+            transaction.on_commit(lambda: AuditService.payment_success(payment))
+            transaction.on_commit(lambda: RefundService.initiate_refund(payment))
+            return payment
+
+        order.status = "confirmed"
+        order.save(update_fields=["status"])
 
+        transaction.on_commit(lambda: ReservationLedger.convert(order.id))
         transaction.on_commit(lambda: AuditService.payment_success(payment))
         transaction.on_commit(lambda: PaymentService._trigger_delivery(order.id))
         
@@ -120,6 +123,7 @@ class PaymentService:
 
     @staticmethod
     def verify_razorpay_signature(order_id, payment_id, signature) -> bool:
+        client = get_razorpay_client()
         if not client: return False
         try:
             client.utility.verify_payment_signature({
@@ -163,41 +167,152 @@ class PaymentService:
         payment.save()
 
         InventoryService.release_stock_for_order(payment.order)
+        transaction.on_commit(lambda: ReservationLedger.convert(payment.order_id))
         
         AuditService.payment_failed(payment)
         return payment
 
 class ReconciliationService:
+    """
+    Settles payments the gateway confirmed but we never heard about (closed
+    tab, lost webhook). Stuck payments are paged by id; each page's gateway
+    lookups run on a bounded thread pool, paced by a token bucket shared by
+    every worker (PAYMENT_RECONCILE_RATE per second), and the results are
+    applied on the calling thread, one payment per transaction.
+    """
+    PAGE_SIZE = 100
+    STUCK_AFTER = timedelta(minutes=10)
+    # Intents abandoned longer than this stay "created" at the gateway; stop asking about them
+    LOOKBACK = timedelta(days=2)
+    LOCK_KEY = "payments:reconcile:lock"
+    LOCK_TTL = 1800
+    RATE_LIMIT_KEY = "razorpay:reconcile"
+
     @staticmethod
     def reconcile_stuck_orders():
-        from datetime import timedelta
-        
-        cutoff_time = timezone.now() - timedelta(minutes=10)
-        
-        stuck_payments = Payment.objects.filter(
+        client = get_razorpay_client()
+        if not client:
+            return None
+
+        token = locks.acquire(ReconciliationService.LOCK_KEY, ReconciliationService.LOCK_TTL)
+        if token is None:
+            logger.info("Payment reconciliation already running, skipping")
+            return None
+
+        started = time.monotonic()
+        metrics = {"checked": 0, "paid": 0, "failed": 0, "pending": 0, "errors": 0}
+        try:
+            with ThreadPoolExecutor(
+                max_workers=settings.PAYMENT_RECONCILE_CONCURRENCY, thread_name_prefix="reconcile",
+            ) as pool:
+                for page in ReconciliationService._stuck_pages():
+                    lookups = pool.map(
+                        lambda row: ReconciliationService._lookup(client, row[1]), page,
+                    )
+                    circuit_open = False
+                    for (payment_id, provider_order_id), (gateway_status, provider_payment_id, error) in zip(page, lookups):
+                        metrics["checked"] += 1
+                        if error is not None:
+                            circuit_open = circuit_open or isinstance(error, CircuitBreakerOpenException)
+                            metrics["errors"] += 1
+                            logger.error(f"Reconciliation lookup failed for {payment_id}: {error}")
+                            continue
+                        try:
+                            outcome = ReconciliationService._apply(
+                                payment_id, provider_order_id, gateway_status, provider_payment_id,
+                            )
+                        except Exception as e:
+                            metrics["errors"] += 1
+                            logger.error(f"Reconciliation error for {payment_id}: {e}")
+                            continue
+                        metrics[outcome] += 1
+
+                    if circuit_open:
+                        logger.warning("Razorpay circuit open, stopping reconciliation until the next run")
+                        break
+        finally:
+            locks.release(ReconciliationService.LOCK_KEY, token)
+
+        metrics["seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            f"Payment reconciliation: {metrics['checked']} checked, {metrics['paid']} paid, "
+            f"{metrics['failed']} failed, {metrics['errors']} errors ({metrics['seconds']}s)"
+        )
+        return metrics
+
+    @staticmethod
+    def _stuck_pages():
+        """Keyset pages of (payment id, provider order id)."""
+        now = timezone.now()
+        stuck = Payment.objects.filter(
             status="created",
-            created_at__lt=cutoff_time
-        ).select_related('order')
+            created_at__lt=now - ReconciliationService.STUCK_AFTER,
+            created_at__gte=now - ReconciliationService.LOOKBACK,
+        ).exclude(provider_order_id="")
+
+        last_id = 0
+        while True:
+            page = list(
+                stuck.filter(id__gt=last_id).order_by("id")
+                .values_list("id", "provider_order_id")[:ReconciliationService.PAGE_SIZE]
+            )
+            if not page:
+                return
+            yield page
+            last_id = page[-1][0]
 
-        if not client: return
+    @staticmethod
+    def _lookup(client, provider_order_id):
+        """
+        (gateway order status, captured payment id, error). Runs on a pool thread:
+        HTTP only, no database access.
+        """
+        try:
+            ReconciliationService._throttle()
+            razorpay_order = razorpay_breaker.call(client.order.fetch, provider_order_id)
+            gateway_status = razorpay_order.get("status")
+            if gateway_status != "paid":
+                return gateway_status, None, None
 
-        for payment in stuck_payments:
+            # The order entity only carries an attempt count; the payment id comes from its payments
+            ReconciliationService._throttle()
+            payments = razorpay_breaker.call(client.order.payments, provider_order_id)
+            captured = next(
+                (p["id"] for p in payments.get("items", []) if p.get("status") == "captured"), None,
+            )
+            return gateway_status, captured or "reconciled_no_id", None
+        except Exception as e:
+            return None, None, e
+
+    @staticmethod
+    def _throttle():
+        rate = settings.PAYMENT_RECONCILE_RATE
+        while True:
             try:
-                provider_data = client.order.fetch(payment.provider_order_id)
-                
-                if provider_data.get('status') == 'paid':
-                    logger.info(f"Reconciling stuck payment {payment.id}")
-                    attempts = provider_data.get('attempts', [])
-                    attempt_id = attempts[0]['id'] if attempts else "reconciled_no_id"
-                    
-                    PaymentService.mark_paid(
-                        payment.id, 
-                        provider_payment_id=attempt_id, 
-                        provider_order_id=payment.provider_order_id
-                    )
-                elif provider_data.get('status') == 'attempted':
-                    payment.status = 'failed'
-                    payment.save(update_fields=['status'])
-                    
+                allowed, _remaining, retry_after = RateLimiter.token_bucket(
+                    ReconciliationService.RATE_LIMIT_KEY, max(1, int(rate)), rate,
+                )
             except Exception as e:
-                logger.error(f"Reconciliation error for {payment.id}: {e}")
\ No newline at end of file
+                # The pool size still bounds the request rate
+                logger.warning(f"Reconciliation rate limiter unavailable: {e}")
+                return
+            if allowed:
+                return
+            time.sleep(retry_after)
+
+    @staticmethod
+    def _apply(payment_id, provider_order_id, gateway_status, provider_payment_id):
+        if gateway_status == "paid":
+            logger.info(f"Reconciling stuck payment {payment_id}")
+            PaymentService.mark_paid(
+                payment_id,
+                provider_payment_id=provider_payment_id,
+                provider_order_id=provider_order_id,
+            )
+            return "paid"
+
+        if gateway_status == "attempted":
+            # Conditional so a webhook that landed meanwhile is not overwritten
+            if Payment.objects.filter(id=payment_id, status="created").update(status="failed"):
+                return "failed"
+        return "pending"
@@ -1,6 +1,8 @@
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from .refund_services import RefundService
+from .services import ReconciliationService
+from .webhook_services import WebhookInbox
 
 logger = get_task_logger(__name__)
 
@@ -11,4 +13,20 @@ def process_refund_task(self, refund_id):
         return "Refund Processed"
     except Exception as e:
         logger.error(f"Refund Task Failed: {e}")
-        raise self.retry(exc=e)
\ No newline at end of file
+        raise self.retry(exc=e)
+
+
+@shared_task(ignore_result=True)
+def process_webhook_events():
+    """Applies stored Razorpay webhook events (see WebhookInbox)."""
+    applied, backlogged = WebhookInbox.drain()
+    if applied:
+        logger.info(f"Applied {applied} webhook events")
+    if backlogged:
+        process_webhook_events.delay()
+
+
+@shared_task
+def reconcile_stuck_payments():
+    """Settles payments stuck in "created" against the gateway (see ReconciliationService)."""
+    return ReconciliationService.reconcile_stuck_orders()
@@ -0,0 +1,252 @@
+import json
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.orders.models import Order
+from apps.utils import clients
+from apps.utils.pools import get_redis_client
+from apps.utils.resilience import CircuitBreaker, _razorpay_server_side
+from .models import Payment, WebhookEvent
+from .services import PaymentService, ReconciliationService
+from .webhook_services import WebhookInbox
+
+
+def _redis_available():
+    try:
+        return get_redis_client().ping()
+    except Exception:
+        return False
+
+
+def _payment(provider_order_id, **fields):
+    # bulk_create: skips the order signals (admin broadcast), which need a channel layer
+    order = Order.objects.bulk_create([
+        Order(delivery_type="express", payment_method="RAZORPAY", total_amount=Decimal("100.00")),
+    ])[0]
+    return Payment.objects.create(order=order, provider_order_id=provider_order_id, amount=Decimal("100.00"), **fields)
+
+
+class FakeRazorpay:
+    """
+    Local stand-in for the Razorpay orders API the reconciler reads
+    (GET /v1/orders/<id> and /v1/orders/<id>/payments), served on a thread.
+    `orders` maps order id -> gateway status, or an int to answer with that
+    HTTP error; unknown ids get Razorpay's 400 BAD_REQUEST_ERROR.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests.append(time.monotonic())
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if len(parts) < 3 or parts[:2] != ["v1", "orders"]:
+                    return self._send(404, {"error": {"code": "BAD_REQUEST_ERROR", "description": "Not found"}})
+
+                order_id = parts[2]
+                status = fake.orders.get(order_id)
+                if status is None:
+                    return self._send(400, {"error": {
+                        "code": "BAD_REQUEST_ERROR", "description": "The id provided does not exist",
+                    }})
+                if isinstance(status, int):
+                    return self._send(status, {"error": {"code": "SERVER_ERROR", "description": "Unavailable"}})
+                if parts[3:] == ["payments"]:
+                    items = [{"id": f"pay_{order_id}", "status": "captured"}] if status == "paid" else []
+                    return self._send(200, {"entity": "collection", "count": len(items), "items": items})
+                return self._send(200, {"id": order_id, "entity": "order", "status": status})
+
+            def _send(self, code, body):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@skipUnless(_redis_available(), "needs Redis at REDIS_URL")
+@override_settings(
+    RAZORPAY_KEY_ID="rzp_test_key", RAZORPAY_KEY_SECRET="secret",
+    PAYMENT_RECONCILE_CONCURRENCY=4, PAYMENT_RECONCILE_RATE=1000,
+)
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.gateway = FakeRazorpay()
+        self.addCleanup(self.gateway.close)
+        self.enterContext(self.settings(RAZORPAY_BASE_URL=self.gateway.base_url))
+        # The client is cached per process; build one against the fake gateway
+        self.enterContext(mock.patch.dict(clients._clients, clear=True))
+
+        suffix = uuid.uuid4().hex[:8]
+        self.breaker = CircuitBreaker(
+            f"razorpay-test-{suffix}", failure_threshold=3, recovery_timeout=30,
+            counts_as_failure=_razorpay_server_side,
+        )
+        self.enterContext(mock.patch("apps.payments.services.razorpay_breaker", self.breaker))
+        self.enterContext(mock.patch.object(ReconciliationService, "LOCK_KEY", f"test:reconcile:lock:{suffix}"))
+        self.enterContext(mock.patch.object(ReconciliationService, "RATE_LIMIT_KEY", f"test:reconcile:{suffix}"))
+        self.addCleanup(
+            get_redis_client().delete,
+            self.breaker.key_state, self.breaker.key_probe, self.breaker.key_failures,
+            f"tb:{{test:reconcile:{suffix}}}",
+        )
+
+    def _stuck_payment(self, gateway_status):
+        provider_order_id = f"order_{uuid.uuid4().hex[:14]}"
+        self.gateway.orders[provider_order_id] = gateway_status
+        return _payment(provider_order_id, created_at=timezone.now() - timedelta(minutes=15))
+
+    def test_paid_order_marks_payment_paid(self):
+        payment = self._stuck_payment("paid")
+
+        metrics = ReconciliationService.reconcile_stuck_orders()
+
+        self.assertEqual(metrics["paid"], 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "paid")
+        self.assertEqual(payment.provider_payment_id, f"pay_{payment.provider_order_id}")
+        self.assertEqual(payment.order.status, "confirmed")
+
+    def test_attempted_order_marks_payment_failed(self):
+        payment = self._stuck_payment("attempted")
+
+        metrics = ReconciliationService.reconcile_stuck_orders()
+
+        self.assertEqual(metrics["failed"], 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "failed")
+
+    def test_created_order_stays_pending(self):
+        payment = self._stuck_payment("created")
+
+        metrics = ReconciliationService.reconcile_stuck_orders()
+
+        self.assertEqual(metrics["pending"], 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, "created")
+
+    @override_settings(PAYMENT_RECONCILE_CONCURRENCY=1)
+    def test_open_circuit_stops_after_the_page(self):
+        payments = [self._stuck_payment(503) for _ in range(8)]
+
+        with mock.patch.object(ReconciliationService, "PAGE_SIZE", 5):
+            metrics = ReconciliationService.reconcile_stuck_orders()
+
+        # The third 5xx opens the circuit; the rest of the page fails fast and the next page is not read
+        self.assertEqual(len(self.gateway.requests), 3)
+        self.assertEqual(metrics["checked"], 5)
+        self.assertEqual(metrics["errors"], 5)
+        self.assertFalse(Payment.objects.filter(id__in=[p.id for p in payments]).exclude(status="created").exists())
+
+    @override_settings(PAYMENT_RECONCILE_RATE=2)
+    def test_lookups_are_paced_by_the_shared_rate(self):
+        for _ in range(6):
+            self._stuck_payment("created")
+
+        metrics = ReconciliationService.reconcile_stuck_orders()
+
+        self.assertEqual(metrics["pending"], 6)
+        # A burst of 2, then 2 per second: the last 4 lookups need about 2 seconds
+        self.assertGreaterEqual(self.gateway.requests[-1] - self.gateway.requests[0], 1.5)
+
+
+def _captured(payment_id, order_id, created_at):
+    return {
+        "event": "payment.captured", "created_at": created_at,
+        "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id}}},
+    }
+
+
+def _refunded(payment_id, refund_id, created_at):
+    return {
+        "event": "refund.processed", "created_at": created_at,
+        "payload": {"refund": {"entity": {"id": refund_id, "payment_id": payment_id}}},
+    }
+
+
+@skipUnless(_redis_available(), "needs Redis at REDIS_URL")
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch(
+            "apps.payments.webhook_services.DRAIN_LOCK", f"test:webhooks:drain:{uuid.uuid4().hex[:8]}",
+        ))
+        self.enterContext(mock.patch.object(WebhookInbox, "kick"))
+
+    def _record(self, payload, event_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            WebhookInbox.record(json.dumps(payload).encode(), payload, event_id=event_id)
+        return WebhookEvent.objects.get(event_id=event_id)
+
+    def test_failed_event_holds_back_later_events_of_its_payment(self):
+        payment = _payment("order_A")
+        first = self._record(_captured("pay_A", "order_A", 100), "evt_1")
+        later = self._record(_refunded("pay_A", "rfnd_A", 200), "evt_2")
+        other = self._record(_refunded("pay_B", "rfnd_B", 150), "evt_3")
+
+        with mock.patch.object(PaymentService, "mark_paid", side_effect=RuntimeError("db down")):
+            WebhookInbox.drain()
+
+        for event in (first, later, other):
+            event.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), ("failed", 1))
+        self.assertEqual((later.status, later.attempts), ("pending", 0))
+        self.assertEqual(other.status, "ignored")
+
+        WebhookInbox.drain()
+
+        first.refresh_from_db()
+        later.refresh_from_db()
+        payment.refresh_from_db()
+        self.assertEqual(first.status, "processed")
+        self.assertEqual(later.status, "ignored")
+        self.assertEqual(payment.status, "paid")
+
+    def test_malformed_event_is_stored(self):
+        event = self._record({"event": "payment.captured", "payload": {"payment": {}}}, "evt_bad")
+        self.assertEqual((event.status, event.payment_ref), ("pending", ""))
+
+    def test_event_is_dead_after_max_attempts(self):
+        event = self._record({"event": "payment.captured", "payload": {"payment": {}}}, "evt_bad")
+        WebhookEvent.objects.filter(pk=event.pk).update(status="failed", attempts=WebhookInbox.MAX_ATTEMPTS - 1)
+
+        with self.assertLogs("celery.dlq", "CRITICAL"):
+            WebhookInbox.drain()
+
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ("dead", WebhookInbox.MAX_ATTEMPTS))
+        self.assertEqual(WebhookInbox.drain(), (0, False))
+
+    def test_redelivered_event_id_is_dropped(self):
+        payload = _refunded("pay_C", "rfnd_C", 300)
+        self._record(payload, "evt_dup")
+        self._record(payload, "evt_dup")
+
+        self.assertEqual(WebhookEvent.objects.filter(event_id="evt_dup").count(), 1)
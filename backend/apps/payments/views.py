@@ -4,21 +4,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
 from django.conf import settings
-from django.db import transaction
 from django.shortcuts import get_object_or_404
-import razorpay
+from apps.utils.clients import get_razorpay_client
 from apps.utils.idempotency import idempotent
 from apps.orders.models import Order
-from apps.payments.models import Payment, Refund
+from apps.payments.models import Payment
 from .services import PaymentService
+from .webhook_services import WebhookInbox
 
 logger = logging.getLogger(__name__)
 
 
-client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-
-
-
 class CreatePaymentAPIView(APIView):
     """
     Initiates a Payment Intent (Order) with the Gateway.
@@ -26,6 +22,8 @@ class CreatePaymentAPIView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    # PaymentService.create_payment is idempotent per order; the key lets a retry share the in-flight response
+    @idempotent(timeout=300, required=False)
     def post(self, request, order_id):
         order = get_object_or_404(Order, id=order_id, user=request.user)
 
@@ -78,14 +76,18 @@ class RazorpayVerifyAPIView(APIView):
         except Payment.DoesNotExist:
             return Response({"error": "Invalid Order ID"}, status=status.HTTP_400_BAD_REQUEST)
 
-        
+        client = get_razorpay_client()
+        if not client:
+            return Response({"error": "Payment Gateway not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        from razorpay.errors import SignatureVerificationError
         try:
             client.utility.verify_payment_signature({
                 'razorpay_order_id': order_id,
                 'razorpay_payment_id': payment_id,
                 'razorpay_signature': signature
             })
-        except razorpay.errors.SignatureVerificationError:
+        except SignatureVerificationError:
             PaymentService.mark_failed(payment)
             return Response({"error": "Payment Signature Verification Failed! Transaction may be fake."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -102,13 +104,13 @@ class RazorpayVerifyAPIView(APIView):
     
 class RazorpayWebhookAPIView(APIView):
     """
-    Async Handler for Payment Confirmations & Refunds.
+    Receiver for Payment Confirmations & Refunds.
     CRITICAL: This is the source of truth if frontend network fails.
+    Verified events are stored in the inbox and applied by process_webhook_events.
     """
     permission_classes = [AllowAny] # Webhooks are public but signed
     authentication_classes = []     # Disable JWT for this endpoint
 
-    @idempotent(timeout=300)
     def post(self, request):
         # 1. Get Signature and Secret
         signature = request.headers.get("X-Razorpay-Signature")
@@ -118,81 +120,21 @@ class RazorpayWebhookAPIView(APIView):
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # 2. Security Check (HMAC Verification)
-        try:
-            # Verify that the request actually came from Razorpay
-            # We decode the body to string as required by some SDK versions
-            client.utility.verify_webhook_signature(request.body.decode('utf-8'), signature, secret)
-        except Exception as e:
-            logger.warning(f"Webhook Signature Mismatch: {str(e)}")
+        # Verify that the request actually came from Razorpay (same HMAC-SHA256 the SDK computes, no client needed)
+        if not PaymentService.verify_webhook_signature(request.body, signature, secret):
+            logger.warning("Webhook Signature Mismatch")
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        # 3. Process the Event
         payload = request.data
-        event = payload.get("event")
-        
-        try:
-            # FIX: Ensure entire webhook processing is Atomic
-            # This prevents partial updates (e.g., Refund updated but Order status not)
-            with transaction.atomic():
-                
-                # Case A: Payment Captured (Success)
-                if event == "payment.captured":
-                    entity = payload["payload"]["payment"]["entity"]
-                    provider_order_id = entity["order_id"]
-                    provider_payment_id = entity["id"]
-                    
-                    try:
-                        # Lock payment row for update to avoid race conditions
-                        payment = Payment.objects.select_for_update().get(provider_order_id=provider_order_id)
-                        
-                        if payment.status != "paid":
-                            logger.info(f"Webhook: Marking Payment {payment.id} as PAID")
-                            
-                            # Update Payment & Order Status via Service
-                            PaymentService.mark_paid(
-                                payment.id,
-                                provider_payment_id=provider_payment_id,
-                                provider_order_id=provider_order_id
-                            )
-                        else:
-                            logger.info(f"Webhook: Payment {payment.id} already PAID")
-
-                    except Payment.DoesNotExist:
-                        # Log but return 200 so Razorpay doesn't retry forever for a bad ID
-                        logger.error(f"Webhook: Payment object not found for order_id {provider_order_id}")
-                        return Response(status=status.HTTP_200_OK)
-
-                # Case B: Refund Processed
-                elif event == "refund.processed":
-                    entity = payload["payload"]["refund"]["entity"]
-                    provider_refund_id = entity["id"]
-                    payment_id = entity["payment_id"] # Provider payment ID (not our DB ID)
-                    
-                    # Find refund via the payment's provider_id
-                    # We lock the refund row to prevent conflicts
-                    refund = Refund.objects.select_for_update().filter(
-                        payment__provider_payment_id=payment_id
-                    ).select_related('payment', 'payment__order').first()
-
-                    if refund:
-                        if refund.status != "processed":
-                            refund.status = "processed"
-                            refund.provider_refund_id = provider_refund_id
-                            refund.save(update_fields=["status", "provider_refund_id"])
-                            
-                            # Ensure order is cancelled if not already
-                            if refund.payment.order.status != "cancelled":
-                                 refund.payment.order.status = "cancelled"
-                                 refund.payment.order.save(update_fields=["status"])
-                                 
-                            logger.info(f"Webhook: Refund {refund.id} Processed")
-                    else:
-                        logger.warning(f"Webhook: No matching Refund found for payment_id {payment_id}")
+        if not isinstance(payload, dict):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        # 3. Store the Event (redeliveries of the same event id are dropped)
+        try:
+            WebhookInbox.record(request.body, payload, event_id=request.headers.get("X-Razorpay-Event-Id"))
         except Exception as e:
-            logger.error(f"Webhook processing error: {e}")
-            # Return 500 so Razorpay retries later (Transient errors like DB locks)
+            logger.error(f"Webhook store error: {e}")
+            # Return 500 so Razorpay retries later
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Always return 200 OK to Razorpay if processing was successful (or ignored)
-        return Response(status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(status=status.HTTP_200_OK)
@@ -1,7 +1,7 @@
 from decimal import Decimal
 from django.contrib import admin
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, OuterRef, Subquery
+from django.db.models import F, Sum, OuterRef, Subquery
 from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
@@ -14,6 +14,7 @@ from import_export.admin import ImportExportModelAdmin
 
 from .models import RiderProfile, RiderDocument, RiderPayout, RiderEarning
 from apps.warehouse.models import Warehouse
+from apps.utils.db_router import ReplicaChangeListMixin
 
 User = get_user_model()
 
@@ -63,7 +64,7 @@ class RiderDocumentInline(admin.TabularInline):
 # ==========================================
 
 @admin.register(RiderProfile)
-class RiderProfileAdmin(ImportExportModelAdmin):
+class RiderProfileAdmin(ReplicaChangeListMixin, ImportExportModelAdmin):
     """UPGRADED: Global View for All Riders. No Isolation."""
     resource_class = RiderProfileResource
     
@@ -95,11 +96,11 @@ class RiderProfileAdmin(ImportExportModelAdmin):
         """Master Admin: Keep the wallet calculations but REMOVE the warehouse isolation!"""
         qs = super().get_queryset(request)
 
-        earnings_sq = RiderEarning.objects.filter(rider=OuterRef('pk')).values('rider').annotate(total=Sum('amount')).values('total')
         payouts_sq = RiderPayout.objects.filter(rider=OuterRef('pk'), status='completed').values('rider').annotate(total=Sum('amount')).values('total')
         
         return qs.annotate(
-            annotated_earnings=Coalesce(Subquery(earnings_sq), Decimal('0.00')),
+            # Lifetime earnings come from the ledger balance row instead of a SUM per rider
+            annotated_earnings=Coalesce(F('balance__total_earned'), Decimal('0.00')),
             annotated_payouts=Coalesce(Subquery(payouts_sq), Decimal('0.00'))
         )
 
@@ -165,13 +166,13 @@ class RiderPayoutAdmin(ImportExportModelAdmin):
     list_display = ('id', 'rider_info', 'amount_display', 'status_badge', 'transaction_ref', 'created_at_date', 'completed_at_date')
     
     # Global Filters
-    list_filter = ('status', 'rider__current_warehouse', 'created_at', 'completed_at')
+    list_filter = ('status', 'rider__current_warehouse', 'payout_date', 'created_at', 'completed_at')
     search_fields = ('rider__user__phone', 'transaction_ref')
     list_select_related = ('rider', 'rider__user')
     raw_id_fields = ('rider',)
     list_per_page = 50
     date_hierarchy = 'created_at'
-    readonly_fields = ('created_at', 'completed_at')
+    readonly_fields = ('payout_date', 'created_at', 'completed_at')
 
     actions = ['mark_completed', 'mark_failed']
 
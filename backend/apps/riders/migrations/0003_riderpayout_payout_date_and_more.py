@@ -0,0 +1,26 @@
+# Generated by Django 5.2.11 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('riders', '0002_riderearning_order_alter_riderdocument_file_key_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riderpayout',
+            name='payout_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='riderearning',
+            index=models.Index(condition=models.Q(('payout__isnull', True)), fields=['rider'], name='rider_earning_unpaid_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='riderpayout',
+            constraint=models.UniqueConstraint(fields=('rider', 'payout_date'), name='uniq_rider_payout_date'),
+        ),
+    ]
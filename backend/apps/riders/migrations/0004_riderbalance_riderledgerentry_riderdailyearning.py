@@ -0,0 +1,108 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def backfill_balances(apps, schema_editor):
+    """Opening balances and daily rollups from existing earnings; ledger entries start from here."""
+    RiderEarning = apps.get_model('riders', 'RiderEarning')
+    RiderBalance = apps.get_model('riders', 'RiderBalance')
+    RiderDailyEarning = apps.get_model('riders', 'RiderDailyEarning')
+
+    totals = (
+        RiderEarning.objects.values('rider_id')
+        .annotate(
+            total_earned=Coalesce(Sum('amount'), models.Value(0, output_field=models.DecimalField())),
+            pending=Coalesce(
+                Sum('amount', filter=Q(payout__isnull=True)), models.Value(0, output_field=models.DecimalField())
+            ),
+            earnings_count=Count('id'),
+        )
+        .order_by('rider_id')
+    )
+    RiderBalance.objects.bulk_create(
+        [
+            RiderBalance(
+                rider_id=row['rider_id'],
+                pending=row['pending'],
+                total_earned=row['total_earned'],
+                total_paid_out=row['total_earned'] - row['pending'],
+                earnings_count=row['earnings_count'],
+            )
+            for row in totals.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+
+    daily = (
+        RiderEarning.objects
+        .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('rider_id', 'day')
+        .annotate(amount=Sum('amount'), earnings_count=Count('id'))
+        .order_by('rider_id', 'day')
+    )
+    RiderDailyEarning.objects.bulk_create(
+        [
+            RiderDailyEarning(
+                rider_id=row['rider_id'], date=row['day'], amount=row['amount'], earnings_count=row['earnings_count'],
+            )
+            for row in daily.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('riders', '0003_riderpayout_payout_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiderBalance',
+            fields=[
+                ('rider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='riders.riderprofile')),
+                ('pending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_paid_out', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('earnings_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RiderDailyEarning',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('earnings_count', models.PositiveIntegerField(default=0)),
+                ('rider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to='riders.riderprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('rider', 'date'), name='uniq_rider_daily_earning')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RiderLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('earning', 'Earning'), ('payout', 'Payout')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('earning', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='riders.riderearning')),
+                ('payout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='riders.riderpayout')),
+                ('rider', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='riders.riderprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rider', '-id'], name='rider_ledger_recent_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
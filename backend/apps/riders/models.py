@@ -82,10 +82,17 @@ class RiderPayout(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="processing")
     
     transaction_ref = models.CharField(max_length=100, blank=True) 
+    # Set by the daily payout run: at most one payout per rider per date, so re-runs are no-ops
+    payout_date = models.DateField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rider', 'payout_date'], name='uniq_rider_payout_date'),
+        ]
+
     def __str__(self):
         return f"Payout {self.id} - {self.amount}"
 
@@ -115,7 +122,72 @@ class RiderEarning(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['rider', '-created_at']),
+            models.Index(fields=['rider'], condition=models.Q(payout__isnull=True), name='rider_earning_unpaid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rider} +{self.amount}"
+
+class RiderBalance(models.Model):
+    """
+    Running totals per rider, updated in the same transaction as every
+    earning and payout (RiderLedgerService). The row lock serializes a
+    rider's ledger writes.
+    """
+    rider = models.OneToOneField(RiderProfile, on_delete=models.CASCADE, primary_key=True, related_name="balance")
+
+    # Earned but not yet in a payout
+    pending = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid_out = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    earnings_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.rider} pending {self.pending}"
+
+
+class RiderLedgerEntry(models.Model):
+    """
+    Append-only ledger: +amount per earning, -amount per payout, with the
+    rider's pending balance right after the entry.
+    """
+    KIND_CHOICES = (
+        ("earning", "Earning"),
+        ("payout", "Payout"),
+    )
+
+    rider = models.ForeignKey(RiderProfile, on_delete=models.PROTECT, related_name="ledger_entries")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+
+    earning = models.ForeignKey(RiderEarning, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    payout = models.ForeignKey(RiderPayout, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rider', '-id'], name='rider_ledger_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rider} {self.kind} {self.amount} -> {self.balance}"
+
+
+class RiderDailyEarning(models.Model):
+    """Earnings rolled up per rider per (local) day, for summaries and charts."""
+    rider = models.ForeignKey(RiderProfile, on_delete=models.CASCADE, related_name="daily_earnings")
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    earnings_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rider', 'date'], name='uniq_rider_daily_earning'),
         ]
 
     def __str__(self):
-        return f"{self.rider} +{self.amount}"
\ No newline at end of file
+        return f"{self.rider} {self.date}: {self.amount}"
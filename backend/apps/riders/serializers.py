@@ -45,6 +45,20 @@ class RiderEarningSerializer(serializers.ModelSerializer):
             "created_at",
         )
 
+class RiderDailyEarningSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    earnings_count = serializers.IntegerField()
+
+class RiderEarningsSummarySerializer(serializers.Serializer):
+    pending = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_earned = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_paid_out = serializers.DecimalField(max_digits=12, decimal_places=2)
+    earnings_count = serializers.IntegerField()
+    today = serializers.DecimalField(max_digits=12, decimal_places=2)
+    period_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    daily = RiderDailyEarningSerializer(many=True)
+
 class RiderAvailabilitySerializer(serializers.Serializer):
     is_available = serializers.BooleanField()
 
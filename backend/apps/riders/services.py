@@ -1,10 +1,20 @@
-from django.db import transaction
+import time
+import logging
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
+from django.db.models import F, Sum
+from django.utils import timezone
 
-from .models import RiderProfile, RiderEarning, RiderPayout
+from .models import (
+    RiderProfile, RiderEarning, RiderPayout, RiderBalance, RiderLedgerEntry, RiderDailyEarning,
+)
 from apps.utils.exceptions import BusinessLogicException
 
+logger = logging.getLogger(__name__)
+
 class RiderService:
 
     @staticmethod
@@ -54,13 +64,15 @@ class RiderService:
         profile.save(update_fields=["current_warehouse"])
 
     @staticmethod
+    @transaction.atomic
     def add_earning(profile: RiderProfile, amount, reference):
         """
-        Log an immutable earning record.
+        Log an immutable earning record (and post it to the rider's ledger).
         """
         if amount < 0:
             raise ValidationError("Earning amount cannot be negative")
             
+        # Posted to the rider ledger by the post_save receiver, inside this transaction
         return RiderEarning.objects.create(
             rider=profile,
             amount=amount,
@@ -96,5 +108,184 @@ class RiderService:
         
         locked_ids = [e.id for e in locked_earnings]
         RiderEarning.objects.filter(id__in=locked_ids).update(payout=payout)
+        RiderLedgerService.record_payout(payout)
         
-        return payout
\ No newline at end of file
+        return payout
+
+
+class RiderLedgerService:
+    """
+    Rider ledger: every earning (via the RiderEarning post_save receiver, so
+    admin and import rows count too) and payout is posted, in the transaction
+    that creates it, to RiderBalance (running totals), RiderLedgerEntry (signed
+    amount + balance after) and RiderDailyEarning (per-day rollup). Summaries
+    and charts read those instead of aggregating RiderEarning.
+    """
+    MAX_SUMMARY_DAYS = 90
+
+    @staticmethod
+    def _locked_balance(rider_id):
+        balance, _ = RiderBalance.objects.select_for_update().get_or_create(rider_id=rider_id)
+        return balance
+
+    @staticmethod
+    def record_earning(earning: RiderEarning):
+        balance = RiderLedgerService._locked_balance(earning.rider_id)
+        balance.pending += earning.amount
+        balance.total_earned += earning.amount
+        balance.earnings_count += 1
+        balance.save()
+
+        RiderLedgerEntry.objects.create(
+            rider_id=earning.rider_id,
+            kind="earning",
+            amount=earning.amount,
+            balance=balance.pending,
+            earning=earning,
+            created_at=earning.created_at,
+        )
+
+        # Rollup rows are only written under the balance lock, so update-then-create cannot race
+        day = timezone.localdate(earning.created_at)
+        updated = RiderDailyEarning.objects.filter(rider_id=earning.rider_id, date=day).update(
+            amount=F("amount") + earning.amount,
+            earnings_count=F("earnings_count") + 1,
+        )
+        if not updated:
+            RiderDailyEarning.objects.create(
+                rider_id=earning.rider_id, date=day, amount=earning.amount, earnings_count=1,
+            )
+
+    @staticmethod
+    def record_payout(payout: RiderPayout):
+        balance = RiderLedgerService._locked_balance(payout.rider_id)
+        balance.pending -= payout.amount
+        balance.total_paid_out += payout.amount
+        balance.save()
+
+        RiderLedgerEntry.objects.create(
+            rider_id=payout.rider_id,
+            kind="payout",
+            amount=-payout.amount,
+            balance=balance.pending,
+            payout=payout,
+        )
+
+    @staticmethod
+    def summary(rider: RiderProfile, days=7):
+        """Balance snapshot plus the last `days` daily rollups: one row and a small range scan."""
+        days = max(1, min(days, RiderLedgerService.MAX_SUMMARY_DAYS))
+        today = timezone.localdate()
+        balance = RiderBalance.objects.filter(rider=rider).first() or RiderBalance(rider=rider)
+
+        daily = list(
+            RiderDailyEarning.objects.filter(rider=rider, date__gt=today - timedelta(days=days))
+            .order_by("date")
+            .values("date", "amount", "earnings_count")
+        )
+        return {
+            "pending": balance.pending,
+            "total_earned": balance.total_earned,
+            "total_paid_out": balance.total_paid_out,
+            "earnings_count": balance.earnings_count,
+            "today": next((d["amount"] for d in daily if d["date"] == today), Decimal("0.00")),
+            "period_total": sum((d["amount"] for d in daily), Decimal("0.00")),
+            "daily": daily,
+        }
+
+
+class RiderPayoutService:
+    """
+    Daily payouts in SQL. Riders with unpaid earnings are paged by id; for
+    each page one statement locks the unpaid earnings, inserts a payout per
+    rider with their sum, links the earnings to it and posts it to the rider
+    ledger (RiderLedgerService), in its own transaction.
+
+    Re-runs for the same payout date are no-ops: (rider, payout_date) is
+    unique and conflicting riders are skipped. Earnings created on or after
+    the payout date wait for the next run.
+    """
+    CHUNK_SIZE = 500
+
+    PAYOUT_SQL = """
+    WITH locked AS (
+        SELECT id, rider_id, amount FROM {earnings}
+        WHERE rider_id = ANY(%s) AND payout_id IS NULL AND created_at < %s
+        FOR UPDATE
+    ), totals AS (
+        SELECT rider_id, SUM(amount) AS amount FROM locked GROUP BY rider_id
+    ), payouts AS (
+        INSERT INTO {payouts} (rider_id, amount, status, transaction_ref, payout_date, created_at)
+        SELECT rider_id, amount, 'processing', '', %s, NOW() FROM totals ORDER BY rider_id
+        ON CONFLICT (rider_id, payout_date) DO NOTHING
+        RETURNING id, rider_id, amount
+    ), linked AS (
+        UPDATE {earnings} AS e SET payout_id = p.id
+        FROM locked AS l JOIN payouts AS p ON p.rider_id = l.rider_id
+        WHERE e.id = l.id
+        RETURNING e.id
+    ), debited AS (
+        UPDATE {balances} AS b
+        SET pending = b.pending - p.amount, total_paid_out = b.total_paid_out + p.amount, updated_at = NOW()
+        FROM payouts AS p
+        WHERE b.rider_id = p.rider_id
+        RETURNING b.rider_id, b.pending
+    ), posted AS (
+        INSERT INTO {entries} (rider_id, kind, amount, balance, payout_id, created_at)
+        SELECT p.rider_id, 'payout', -p.amount, d.pending, p.id, NOW()
+        FROM payouts AS p JOIN debited AS d ON d.rider_id = p.rider_id
+        RETURNING id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM payouts),
+        (SELECT COUNT(*) FROM linked),
+        (SELECT COALESCE(SUM(amount), 0) FROM payouts),
+        (SELECT COUNT(*) FROM posted)
+    """
+
+    @staticmethod
+    def generate_daily_payouts(payout_date=None, chunk_size=None):
+        payout_date = payout_date or timezone.localdate()
+        cutoff = timezone.make_aware(datetime.combine(payout_date, dt_time.min))
+        chunk_size = chunk_size or RiderPayoutService.CHUNK_SIZE
+        sql = RiderPayoutService.PAYOUT_SQL.format(
+            earnings=RiderEarning._meta.db_table,
+            payouts=RiderPayout._meta.db_table,
+            balances=RiderBalance._meta.db_table,
+            entries=RiderLedgerEntry._meta.db_table,
+        )
+
+        started = time.monotonic()
+        metrics = {"riders": 0, "payouts": 0, "earnings": 0, "amount": 0}
+        last_rider_id = 0
+        while True:
+            rider_ids = list(
+                RiderEarning.objects.filter(
+                    payout__isnull=True, created_at__lt=cutoff, rider_id__gt=last_rider_id,
+                ).order_by("rider_id").values_list("rider_id", flat=True).distinct()[:chunk_size]
+            )
+            if not rider_ids:
+                break
+            last_rider_id = rider_ids[-1]
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [rider_ids, cutoff, payout_date])
+                payouts, earnings, amount, posted = cursor.fetchone()
+            if posted != payouts:
+                logger.warning(f"Payouts: {payouts - posted} riders in this chunk have no ledger balance row")
+
+            metrics["riders"] += len(rider_ids)
+            metrics["payouts"] += payouts
+            metrics["earnings"] += earnings
+            metrics["amount"] += amount
+
+        elapsed = time.monotonic() - started
+        metrics["amount"] = str(metrics["amount"])
+        metrics["seconds"] = round(elapsed, 2)
+        metrics["riders_per_second"] = round(metrics["riders"] / elapsed, 1) if elapsed else 0
+        logger.info(
+            f"Payouts for {payout_date}: {metrics['payouts']} payouts ({metrics['earnings']} earnings, "
+            f"₹{metrics['amount']}) for {metrics['riders']} riders in {metrics['seconds']}s "
+            f"({metrics['riders_per_second']} riders/s)"
+        )
+        return metrics
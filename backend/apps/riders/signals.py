@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.db import transaction
-from .models import RiderProfile
+from .models import RiderProfile, RiderEarning
 from apps.delivery.tasks import retry_auto_assign_rider
 from apps.orders.models import Order
 
@@ -21,4 +21,12 @@ def trigger_assignment_on_rider_availability(sender, instance, created, **kwargs
         )
 
         for order in pending_orders:
-            transaction.on_commit(lambda: retry_auto_assign_rider.delay(order.id))
\ No newline at end of file
+            transaction.on_commit(lambda: retry_auto_assign_rider.delay(order.id))
+
+
+@receiver(post_save, sender=RiderEarning)
+def post_earning_to_ledger(sender, instance, created, **kwargs):
+    """Earnings are immutable: each new row is posted to the rider's balance, ledger and daily rollup."""
+    if created:
+        from .services import RiderLedgerService
+        RiderLedgerService.record_earning(instance)
@@ -3,6 +3,7 @@ from .views import (
     MyRiderProfileAPIView,
     RiderAvailabilityAPIView,
     RiderEarningsAPIView,
+    RiderEarningsSummaryAPIView,
     AdminCreateRiderProfileAPIView,
     AdminAssignWarehouseAPIView,
     RiderDocumentUploadAPIView,
@@ -15,6 +16,7 @@ urlpatterns = [
     path("me/", MyRiderProfileAPIView.as_view()),
     path("availability/", RiderAvailabilityAPIView.as_view()),
     path("earnings/", RiderEarningsAPIView.as_view()),
+    path("earnings/summary/", RiderEarningsSummaryAPIView.as_view()),
     
     # Admin
 
@@ -11,9 +11,10 @@ from .serializers import (
     RiderProfileSerializer, 
     RiderBootstrapSerializer, 
     RiderEarningSerializer,
+    RiderEarningsSummarySerializer,
     RiderAvailabilitySerializer
 )
-from .services import RiderService
+from .services import RiderService, RiderLedgerService
 from apps.warehouse.models import Warehouse
 from .models import RiderPayout
 from rest_framework import status, serializers
@@ -72,6 +73,26 @@ class RiderEarningsAPIView(APIView):
         return Response(RiderEarningSerializer(qs, many=True).data)
 
 
+class RiderEarningsSummaryAPIView(APIView):
+    """
+    Wallet card and earnings chart: pending balance, lifetime totals and the
+    last ?days= (default 7, max 90) daily totals, from the rider ledger.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not hasattr(request.user, 'rider_profile'):
+             return Response({"error": "User is not a rider"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = RiderLedgerService.summary(request.user.rider_profile, days=days)
+        return Response(RiderEarningsSummarySerializer(summary).data)
+
+
 class AdminCreateRiderProfileAPIView(APIView):
     """
     Admin: Promote a user to Rider.
@@ -0,0 +1,194 @@
+"""
+Batch-consumer task type for high-volume, low-cost work (push sends, audit writes).
+
+Producers append payloads to a Redis stream instead of publishing one Celery
+message each. The task itself is a drain: one run reads up to `batch_size`
+payloads at a time through a consumer group and hands the whole list to the
+task body, so 500 pushes cost one FCM call and 1000 audit rows one INSERT.
+
+    @shared_task(base=BatchTask, stream="batch:push", batch_size=500)
+    def send_push_batch(payloads):
+        ...
+
+    send_push_batch.enqueue({"user_id": 7, ...})
+
+- The first enqueue in a `flush_after` window schedules one drain; a beat entry
+  per task sweeps anything left behind.
+- One drain per stream at a time (Redis lock). Delivery is at-least-once: when
+  a batch fails its payloads are retried one by one, the failing ones stay
+  pending for the next drain, and a payload that has failed `max_deliveries`
+  times is logged to the DLQ logger and dropped.
+- If Redis is unavailable the payloads are processed inline, as before.
+"""
+import json
+import logging
+
+import redis
+from celery import Task
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from apps.utils import locks
+from apps.utils.pools import get_redis_client
+
+logger = logging.getLogger(__name__)
+dlq_logger = logging.getLogger('celery.dlq')
+
+
+class BatchTask(Task):
+    stream = None
+    batch_size = 200
+    max_batches = 20
+    maxlen = 200_000
+    flush_after = 1.0
+    max_deliveries = 5
+    drain_lock_ttl = 300
+    group = "batch"
+    consumer = "drain"
+    ignore_result = True
+
+    def enqueue(self, payload):
+        self.enqueue_many([payload])
+
+    def enqueue_many(self, payloads):
+        """Queues JSON-serializable payloads; after commit when called inside a transaction."""
+        payloads = list(payloads)
+        if not payloads:
+            return
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._publish(payloads))
+        else:
+            self._publish(payloads)
+
+    def _publish(self, payloads):
+        try:
+            client = get_redis_client()
+            pipe = client.pipeline(transaction=False)
+            for payload in payloads:
+                pipe.xadd(
+                    self.stream,
+                    {"p": self._encode(payload)},
+                    maxlen=self.maxlen,
+                    approximate=True,
+                )
+            pipe.set(f"{self.stream}:kick", 1, nx=True, px=int(self.flush_after * 1000))
+            kicked = pipe.execute()[-1]
+        except Exception as e:
+            logger.error(f"Batch enqueue failed for {self.name}, processing {len(payloads)} inline: {e}")
+            try:
+                # Round-tripped so the task body sees the types a drain hands it (datetimes as strings)
+                self.run([json.loads(self._encode(payload)) for payload in payloads])
+            except Exception as e:
+                logger.error(f"Inline batch {self.name} failed: {e}")
+            return
+
+        if kicked:
+            try:
+                self.apply_async(countdown=self.flush_after)
+            except Exception as e:
+                # Payloads are safe in the stream; the beat sweep picks them up
+                logger.warning(f"Batch drain not scheduled for {self.name}: {e}")
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload, cls=DjangoJSONEncoder)
+
+    def __call__(self, max_batches=None):
+        """Drains the stream; this is what the worker runs instead of run(payloads)."""
+        client = get_redis_client()
+        lock = f"{self.stream}:drain"
+        token = locks.acquire(lock, self.drain_lock_ttl, client)
+        if token is None:
+            return "Drain already running"
+
+        processed, backlogged = 0, False
+        try:
+            self._ensure_group(client)
+            for _ in range(max_batches or self.max_batches):
+                entries = self._read_batch(client)
+                if not entries:
+                    break
+                done, failed = self._process(client, entries)
+                processed += done
+                if failed:
+                    break
+            else:
+                backlogged = True
+        finally:
+            locks.release(lock, token, client)
+
+        if backlogged:
+            # Hand the rest to a fresh run instead of holding this worker
+            self.apply_async()
+        return f"Processed {processed} payloads"
+
+    def _ensure_group(self, client):
+        try:
+            client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _read_batch(self, client):
+        """[(entry_id, fields)]; entries left pending by a failed or crashed drain come first."""
+        for cursor in ("0", ">"):
+            response = client.xreadgroup(self.group, self.consumer, {self.stream: cursor}, count=self.batch_size)
+            entries = response[0][1] if response else []
+            # Pending entries already trimmed from the stream come back without fields
+            trimmed = [entry_id for entry_id, fields in entries if not fields]
+            if trimmed:
+                client.xack(self.stream, self.group, *trimmed)
+                entries = [entry for entry in entries if entry[1]]
+            if entries:
+                return entries
+        return []
+
+    def _process(self, client, entries):
+        """(payloads handled, failed?). Failed entries stay pending for the next drain."""
+        entries = self._drop_exhausted(client, entries)
+        if not entries:
+            return 0, False
+
+        try:
+            self.run([json.loads(fields["p"]) for _entry_id, fields in entries])
+        except Exception as e:
+            logger.error(f"Batch {self.name} failed for {len(entries)} payloads, retrying one by one: {e}")
+            return self._process_singly(client, entries)
+
+        client.xack(self.stream, self.group, *[entry_id for entry_id, _ in entries])
+        return len(entries), False
+
+    def _process_singly(self, client, entries, outage_after=3):
+        """Isolates the payloads that fail; stops early when every one fails (an outage, not bad data)."""
+        done, failures = [], 0
+        for entry_id, fields in entries:
+            try:
+                self.run([json.loads(fields["p"])])
+            except Exception as e:
+                failures += 1
+                logger.error(f"Batch {self.name} payload {entry_id} failed, will retry: {e}")
+                if failures >= outage_after and not done:
+                    break
+                continue
+            done.append(entry_id)
+
+        if done:
+            client.xack(self.stream, self.group, *done)
+        return len(done), failures > 0
+
+    def _drop_exhausted(self, client, entries):
+        pending = client.xpending_range(
+            self.stream, self.group, min=entries[0][0], max=entries[-1][0], count=len(entries),
+        )
+        exhausted = {p["message_id"] for p in pending if p["times_delivered"] > self.max_deliveries}
+        if not exhausted:
+            return entries
+
+        for entry_id, fields in entries:
+            if entry_id in exhausted:
+                dlq_logger.critical(
+                    f"[DLQ] Batch payload dropped after {self.max_deliveries} attempts: {self.name}",
+                    extra={'task_name': self.name, 'entry_id': entry_id, 'payload': fields.get("p")},
+                )
+        client.xack(self.stream, self.group, *exhausted)
+        return [entry for entry in entries if entry[0] not in exhausted]
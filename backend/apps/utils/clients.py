@@ -0,0 +1,108 @@
+"""
+Lazy, process-cached clients for the heavy third-party SDKs.
+
+razorpay, boto3/botocore, python-magic, firebase_admin and twilio are imported
+on first use instead of at module import, so a gunicorn worker or Celery child
+only pays for the SDKs its requests / tasks actually touch (and does so again
+only after a recycle, e.g. worker_max_tasks_per_child). Each client is built
+once per process behind a lock and shared between threads; all of them are
+thread-safe for the calls we make.
+"""
+import os
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients = {}
+
+# Misconfiguration is remembered so an unconfigured gateway is not re-probed on every call
+_UNAVAILABLE = object()
+
+
+def _cached(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                try:
+                    client = factory()
+                except Exception as e:
+                    logger.error(f"{name} client unavailable: {e}")
+                    client = _UNAVAILABLE
+                _clients[name] = client
+    return None if client is _UNAVAILABLE else client
+
+
+def _razorpay():
+    import razorpay
+
+    if not (settings.RAZORPAY_KEY_ID and settings.RAZORPAY_KEY_SECRET):
+        raise ValueError("RAZORPAY_KEY_ID / RAZORPAY_KEY_SECRET not set")
+    options = {"base_url": settings.RAZORPAY_BASE_URL} if settings.RAZORPAY_BASE_URL else {}
+    return razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET), **options)
+
+
+def get_razorpay_client():
+    """razorpay.Client, or None when the gateway is not configured."""
+    return _cached("razorpay", _razorpay)
+
+
+def _s3():
+    import boto3
+
+    return boto3.client('s3')
+
+
+def get_s3_client():
+    """One botocore S3 client per process (boto3.client() re-reads config and endpoint data on every call)."""
+    return _cached("s3", _s3)
+
+
+def detect_mime_type(buffer):
+    import magic
+
+    return magic.from_buffer(buffer, mime=True)
+
+
+def _firebase_credentials():
+    from firebase_admin import credentials
+
+    creds_json = os.getenv('FIREBASE_CREDENTIALS_JSON') or os.getenv('FIREBASE_JSON_CREDENTIALS')
+    if creds_json:
+        return credentials.Certificate(json.loads(creds_json))
+
+    for filename in ('serviceAccountKey.json', 'firebase-key.json'):
+        path = os.path.join(settings.BASE_DIR, filename)
+        if os.path.exists(path):
+            return credentials.Certificate(path)
+    raise FileNotFoundError("no Firebase credentials in env or BASE_DIR")
+
+
+def _firebase_app():
+    import firebase_admin
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(_firebase_credentials())
+        logger.info("🔥 Firebase Admin Initialized")
+    return firebase_admin.get_app()
+
+
+def get_messaging():
+    """firebase_admin.messaging with the default app initialized on first use."""
+    from firebase_admin import messaging
+
+    if _cached("firebase", _firebase_app) is None:
+        raise RuntimeError("Firebase Admin is not configured")
+    return messaging
+
+
+def get_twilio_client(account_sid, auth_token):
+    from twilio.rest import Client
+
+    return _cached("twilio", lambda: Client(account_sid, auth_token))
@@ -0,0 +1,225 @@
+"""
+Primary/replica read split.
+
+Reads go to the replica only when something opted in:
+- per view: `use_read_replica = True` on the view class (picked up by
+  DatabaseRoutingMiddleware.process_view, safe methods only)
+- per admin changelist: ReplicaChangeListMixin
+- per queryset: read_replica(qs)
+
+Everything else, all writes, anything inside a transaction on the primary and
+identity lookups (the user row loaded by JWT/session auth) stay on `default`.
+A user who wrote in a request is pinned to the primary for REPLICA_PIN_SECONDS
+(read-your-writes), and the replica is skipped entirely while its replay lag
+exceeds REPLICA_MAX_LAG_SECONDS or it is unreachable.
+
+The pin is looked up on the first replica read made once the request has an
+authenticated user. DRF authenticates inside the view, so reads before that
+(e.g. simplejwt loading the user) must not settle the request as unpinned.
+"""
+import time
+import logging
+import threading
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT = "default"
+REPLICA = "replica"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Read by authentication before the user (and so their pin) is known
+AUTH_APP_LABELS = ("auth", "sessions", "token_blacklist")
+
+# Per-request routing state, created by DatabaseRoutingMiddleware. A dict (not
+# separate vars) so flags set inside sync_to_async threads are seen by the caller.
+_routing_state = ContextVar("db_routing_state", default=None)
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_lag = {"seconds": 0.0, "checked_at": None}
+_lag_lock = threading.Lock()
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def _measure_lag():
+    try:
+        with connections[REPLICA].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            row = cursor.fetchone()
+        return float(row[0] or 0)
+    except Exception as e:
+        logger.warning(f"Replica lag check failed, reading from primary: {e}")
+        return float("inf")
+
+
+def replica_lag():
+    """Replay lag in seconds, measured at most once per REPLICA_LAG_CHECK_INTERVAL per process."""
+    now = time.monotonic()
+    checked_at = _lag["checked_at"]
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _lag["seconds"]
+
+    with _lag_lock:
+        checked_at = _lag["checked_at"]
+        if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            _lag["seconds"] = _measure_lag()
+            _lag["checked_at"] = now
+    return _lag["seconds"]
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def _is_auth_model(model):
+    return model._meta.app_label in AUTH_APP_LABELS or model._meta.label == settings.AUTH_USER_MODEL
+
+
+def _is_pinned(request):
+    """True/False for an authenticated user, None while the request has none (yet)."""
+    user = getattr(request, "user", None) if request is not None else None
+    if not user or not user.is_authenticated:
+        return None
+    try:
+        return bool(cache.get(_pin_key(user.id)))
+    except Exception:
+        return True  # can't tell -> be safe and read our own writes
+
+
+def replica_alias():
+    """Alias to read from right now: the replica if it is allowed and healthy, else default."""
+    if not replica_configured():
+        return DEFAULT
+    if connections[DEFAULT].in_atomic_block:
+        return DEFAULT
+
+    state = _routing_state.get()
+    if state is not None:
+        if state["wrote"]:
+            return DEFAULT
+        if state["pinned"] is None:
+            # Not cached until there is a user: DRF sets request.user after the first reads
+            state["pinned"] = _is_pinned(state["request"])
+        if state["pinned"]:
+            return DEFAULT
+
+    if replica_lag() > settings.REPLICA_MAX_LAG_SECONDS:
+        return DEFAULT
+    return REPLICA
+
+
+def read_replica(queryset):
+    """Per-queryset opt-in: `read_replica(Order.objects.filter(...))`."""
+    return queryset.using(replica_alias())
+
+
+def prefer_replica():
+    """Opts the rest of the current request into replica reads."""
+    state = _routing_state.get()
+    if state is not None:
+        state["replica"] = True
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _is_auth_model(model):
+            return DEFAULT
+        state = _routing_state.get()
+        if state is not None and state["replica"]:
+            return replica_alias()
+        return DEFAULT
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return DEFAULT
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Owns the routing state for a request, applies per-view opt-in and pins
+    users who wrote to the primary for REPLICA_PIN_SECONDS.
+    Must sit after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # Django wraps a sync process_view in sync_to_async under ASGI; hand it a coroutine instead.
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _routing_state.set(self._new_state(request))
+        try:
+            response = self.get_response(request)
+            self._pin_writer(request)
+            return response
+        finally:
+            _routing_state.reset(token)
+
+    async def __acall__(self, request):
+        token = _routing_state.set(self._new_state(request))
+        try:
+            response = await self.get_response(request)
+            if _routing_state.get()["wrote"]:
+                await sync_to_async(self._pin_writer)(request)
+            return response
+        finally:
+            _routing_state.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_cls = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        if getattr(view_cls, "use_read_replica", False) and request.method in SAFE_METHODS:
+            prefer_replica()
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return self.process_view(request, view_func, view_args, view_kwargs)
+
+    @staticmethod
+    def _new_state(request):
+        return {"request": request, "replica": False, "wrote": False, "pinned": None}
+
+    @staticmethod
+    def _pin_writer(request):
+        state = _routing_state.get()
+        if not state or not state["wrote"] or not replica_configured():
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            try:
+                cache.set(_pin_key(user.id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+            except Exception as e:
+                logger.error(f"Replica pin failed for user {user.id}: {e}")
+
+
+class ReplicaChangeListMixin:
+    """ModelAdmin opt-in: changelist GETs (counts, annotations, pagination) read from the replica."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method in SAFE_METHODS:
+            prefer_replica()
+        return super().changelist_view(request, extra_context)
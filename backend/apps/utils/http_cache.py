@@ -0,0 +1,181 @@
+"""
+Conditional GET for near-static resources (categories, banners, brands, flash
+sales, store status, app config).
+
+Each resource has a version counter in Redis, bumped by model signals after the
+write commits. `@versioned_resource("banners")` on a view's get() derives a
+strong ETag from those counters (plus host, path, query and Accept), answers a
+matching If-None-Match / If-Modified-Since with 304 before the view runs, and
+marks 200s cacheable for the CDN and the service worker.
+"""
+import time
+import hashlib
+import logging
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = "categories"
+BANNERS = "banners"
+BRANDS = "brands"
+FLASH_SALES = "flash_sales"
+STORE_STATUS = "store_status"
+APP_CONFIG = "app_config"
+
+
+def _version_key(resource):
+    return f"http:version:{resource}"
+
+
+def _modified_key(resource):
+    return f"http:modified:{resource}"
+
+
+def bump_version(*resources):
+    """Invalidates every ETag of the given resources. Never raises: a failed bump must not fail the write."""
+    now = time.time()
+    for resource in resources:
+        try:
+            try:
+                cache.incr(_version_key(resource))
+            except ValueError:
+                # First bump or Redis was flushed: start from the clock so ETags issued before never match again
+                cache.set(_version_key(resource), int(now * 1000), timeout=None)
+            cache.set(_modified_key(resource), int(now), timeout=None)
+        except Exception as e:
+            logger.error(f"HTTP cache version bump failed for {resource}: {e}")
+
+
+def bump_version_on_commit(*resources):
+    transaction.on_commit(lambda: bump_version(*resources))
+
+
+def _seed_values(resources):
+    now = time.time()
+    seeded = {}
+    for resource in resources:
+        seeded[_version_key(resource)] = int(now * 1000)
+        seeded[_modified_key(resource)] = int(now)
+    return seeded
+
+
+def _state(resources, extra_keys):
+    keys = [k for r in resources for k in (_version_key(r), _modified_key(r))] + list(extra_keys)
+    values = cache.get_many(keys)
+    missing = [r for r in resources if _version_key(r) not in values]
+    if missing:
+        for key, value in _seed_values(missing).items():
+            cache.add(key, value, timeout=None)
+        values.update(cache.get_many([k for r in missing for k in (_version_key(r), _modified_key(r))]))
+    return values
+
+
+async def _astate(resources, extra_keys):
+    keys = [k for r in resources for k in (_version_key(r), _modified_key(r))] + list(extra_keys)
+    values = await cache.aget_many(keys)
+    missing = [r for r in resources if _version_key(r) not in values]
+    if missing:
+        for key, value in _seed_values(missing).items():
+            await cache.aadd(key, value, timeout=None)
+        values.update(await cache.aget_many([k for r in missing for k in (_version_key(r), _modified_key(r))]))
+    return values
+
+
+def _validators(request, resources, extra_keys, bucket_seconds, values):
+    """(etag, last_modified). Last-Modified is only sent when the versions alone describe the payload."""
+    parts = [settings.HTTP_CACHE_ETAG_SALT]
+    parts += [f"{r}={values.get(_version_key(r))}" for r in resources]
+    parts += [f"{k}={values.get(k)!r}" for k in extra_keys]
+    if bucket_seconds:
+        parts.append(f"t={int(time.time() // bucket_seconds)}")
+    parts += [request.get_host(), request.get_full_path(), request.META.get("HTTP_ACCEPT", "")]
+    etag = '"%s"' % hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+    last_modified = None
+    if not extra_keys and not bucket_seconds:
+        stamps = [values.get(_modified_key(r)) for r in resources]
+        if all(stamps):
+            last_modified = max(stamps)
+    return etag, last_modified
+
+
+def _cache_headers(response, etag, last_modified, max_age, bucket_seconds):
+    if bucket_seconds:
+        max_age = min(max_age, bucket_seconds - int(time.time() % bucket_seconds))
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response, public=True, max_age=max_age,
+        stale_while_revalidate=settings.HTTP_CACHE_STALE_WHILE_REVALIDATE,
+    )
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+def _precondition(request, values, resources, extra_keys, bucket_seconds, max_age):
+    """(304 response or None, header args for the 200)."""
+    etag, last_modified = _validators(request, resources, extra_keys, bucket_seconds, values)
+    headers = (etag, last_modified, settings.HTTP_CACHE_MAX_AGE if max_age is None else max_age, bucket_seconds)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        _cache_headers(not_modified, *headers)
+    return not_modified, headers
+
+
+def versioned_resource(*resources, extra_keys=(), bucket_seconds=None, max_age=None):
+    """
+    View-method decorator (sync or async get).
+    extra_keys: cache keys the payload also depends on, folded into the ETag.
+    bucket_seconds: for payloads that change with the clock (e.g. sales expiring);
+    the ETag rolls over every bucket and max-age never crosses a boundary.
+    If Redis is unavailable the view just runs uncached.
+    """
+    options = (resources, extra_keys, bucket_seconds, max_age)
+
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            @wraps(view_method)
+            async def _wrapped_async(self, request, *args, **kwargs):
+                try:
+                    values = await _astate(resources, extra_keys)
+                except Exception as e:
+                    logger.error(f"HTTP cache state unavailable for {resources}: {e}")
+                    return await view_method(self, request, *args, **kwargs)
+
+                not_modified, headers = _precondition(request, values, *options)
+                if not_modified is not None:
+                    return not_modified
+
+                response = await view_method(self, request, *args, **kwargs)
+                if 200 <= response.status_code < 300:
+                    _cache_headers(response, *headers)
+                return response
+            return _wrapped_async
+
+        @wraps(view_method)
+        def _wrapped(self, request, *args, **kwargs):
+            try:
+                values = _state(resources, extra_keys)
+            except Exception as e:
+                logger.error(f"HTTP cache state unavailable for {resources}: {e}")
+                return view_method(self, request, *args, **kwargs)
+
+            not_modified, headers = _precondition(request, values, *options)
+            if not_modified is not None:
+                return not_modified
+
+            response = view_method(self, request, *args, **kwargs)
+            if 200 <= response.status_code < 300:
+                _cache_headers(response, *headers)
+            return response
+        return _wrapped
+    return decorator
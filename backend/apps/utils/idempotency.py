@@ -1,67 +1,185 @@
-import functools
+"""
+Idempotent POST handlers.
+
+    @idempotent(timeout=300)
+    def post(self, request): ...
+
+The first request with an Idempotency-Key runs the view under a Redis lock;
+a 2xx response is stored (msgpack: status, data, request fingerprint) for
+`timeout` seconds and replayed to any retry. A duplicate that arrives while
+the original is still running waits for it (up to IDEMPOTENCY_WAIT_SECONDS)
+instead of failing:
+
+- idem:{scope:user:key}        stored response
+- idem:{scope:user:key}:lock   owner token while the original runs
+- idem:{scope:user:key}:done   pushed once the original finishes; waiters block
+                               on it with BRPOPLPUSH into the same list, so the
+                               entry stays and every waiter wakes
+
+When the original fails (non-2xx, exception, lock expired) the waiters wake,
+find no stored response and one of them takes the lock and runs the request.
+A key reused for a different body gets 422. Outcomes are counted in
+quickdash_idempotency_requests; waits in quickdash_idempotency_wait_seconds.
+"""
+import time
+import uuid
 import hashlib
-import json
-import zlib
-from django.core.cache import cache
+import logging
+import functools
+
+import msgpack
+from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
+from prometheus_client import Counter, Histogram
 from rest_framework.response import Response
 from rest_framework import status
 
-def idempotent(timeout=86400):
+from apps.utils.pools import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = Counter(
+    "quickdash_idempotency_requests",
+    "Idempotent requests by outcome (miss, hit, waited, conflict, mismatch, bypass)",
+    ["scope", "outcome"],
+)
+WAIT_SECONDS = Histogram(
+    "quickdash_idempotency_wait_seconds", "Time duplicates spent waiting for the original response",
+    ["scope"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20),
+)
+
+# Stays under the pool's socket_timeout (5s) so a blocked read never times out the connection
+MAX_BLOCK_SECONDS = 4
+DONE_TTL_MS = 60_000
+
+# KEYS: lock, done
+# ARGV: owner token
+RELEASE_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    redis.call("del", KEYS[1])
+end
+redis.call("rpush", KEYS[2], 1)
+redis.call("pexpire", KEYS[2], %d)
+return 1
+""" % DONE_TTL_MS
+
+_encoder = DjangoJSONEncoder()
+_scripts = {}
+
+
+def _client():
+    return get_redis_client(decode_responses=False)
+
+
+def _release(lock_key, done_key, token):
+    script = _scripts.get("release")
+    if script is None:
+        script = _scripts["release"] = _client().register_script(RELEASE_LUA)
+    script(keys=[lock_key, done_key], args=[token])
+
+
+def _fingerprint(request):
+    return hashlib.blake2b(request.method.encode() + request.path.encode() + request.body, digest_size=16).digest()
+
+
+def _pack(response, fingerprint):
+    return msgpack.packb([response.status_code, response.data, fingerprint], default=_encoder.default, use_bin_type=True)
+
+
+def _replay(stored, fingerprint, scope):
+    status_code, data, stored_fingerprint = msgpack.unpackb(stored, raw=False)
+    if stored_fingerprint != fingerprint:
+        REQUESTS.labels(scope, "mismatch").inc()
+        return Response(
+            {"error": "Idempotency-Key was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(data, status=status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(timeout=86400, header="Idempotency-Key", required=True, lock_timeout=30):
     """
     Decorator to ensure safe retry of non-safe HTTP methods (POST, PATCH).
-    Stores COMPRESSED response in Redis for 'timeout' seconds.
+    header: where the key comes from (e.g. a provider's event id for webhooks).
+    required=False lets requests without the header through unprotected.
+    lock_timeout: how long a crashed original blocks its duplicates.
     """
     def decorator(func):
+        scope = func.__qualname__.split(".")[0]
+
         @functools.wraps(func)
         def wrapper(view_instance, request, *args, **kwargs):
-            key = request.headers.get("Idempotency-Key")
-            
+            key = request.headers.get(header)
+
             if not key:
+                if not required:
+                    REQUESTS.labels(scope, "bypass").inc()
+                    return func(view_instance, request, *args, **kwargs)
                 return Response(
-                    {"error": "Idempotency-Key header is required."}, 
+                    {"error": f"{header} header is required."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
+
             if len(key) > 128:
                 return Response(
-                    {"error": "Idempotency-Key too long (max 128 chars)."}, 
+                    {"error": f"{header} too long (max 128 chars)."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
             user_id = request.user.id if request.user.is_authenticated else "anon"
-            cache_key = f"idempotency:{user_id}:{key}"
-            lock_key = f"lock:{cache_key}"
+            base = f"idem:{{{scope}:{user_id}:{key}}}"
+            lock_key, done_key = f"{base}:lock", f"{base}:done"
+            fingerprint = _fingerprint(request)
+            client = _client()
+            token = uuid.uuid4().hex
 
-            cached_response = cache.get(cache_key)
-            if cached_response:
-                try:
-                    data_json = zlib.decompress(cached_response["data_compressed"]).decode("utf-8")
-                    data = json.loads(data_json)
-                    return Response(data, status=cached_response["status"])
-                except (ValueError, zlib.error):
-                    pass
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+            waited_since = None
+            while True:
+                stored = client.get(base)
+                if stored is not None:
+                    if waited_since is None:
+                        REQUESTS.labels(scope, "hit").inc()
+                    else:
+                        REQUESTS.labels(scope, "waited").inc()
+                        WAIT_SECONDS.labels(scope).observe(time.monotonic() - waited_since)
+                    return _replay(stored, fingerprint, scope)
 
-            if not cache.add(lock_key, "processing", timeout=30):
-                return Response(
-                    {"error": "Duplicate request in progress."}, 
-                    status=status.HTTP_409_CONFLICT
-                )
+                if client.set(lock_key, token, nx=True, ex=lock_timeout):
+                    # A failed earlier owner's wake-up must not keep the next waiters spinning
+                    client.delete(done_key)
+                    break
 
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    REQUESTS.labels(scope, "conflict").inc()
+                    response = Response(
+                        {"error": "Duplicate request in progress."},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                    response["Retry-After"] = "1"
+                    return response
+
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                # Wakes when the original finishes (or re-checks after the block)
+                client.brpoplpush(done_key, done_key, timeout=min(MAX_BLOCK_SECONDS, max(1, int(remaining))))
+
+            REQUESTS.labels(scope, "miss").inc()
             try:
                 response = func(view_instance, request, *args, **kwargs)
 
                 if 200 <= response.status_code < 300:
-                    response_json = json.dumps(response.data, cls=DjangoJSONEncoder)
-                    compressed_data = zlib.compress(response_json.encode("utf-8"))
-                    
-                    cache.set(cache_key, {
-                        "status": response.status_code,
-                        "data_compressed": compressed_data
-                    }, timeout=timeout)
-                
+                    client.set(base, _pack(response, fingerprint), ex=timeout)
+
                 return response
             finally:
-                cache.delete(lock_key)
+                try:
+                    _release(lock_key, done_key, token)
+                except Exception as e:
+                    # Duplicates fall back to the lock expiring
+                    logger.error(f"Idempotency lock release failed for {scope}: {e}")
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
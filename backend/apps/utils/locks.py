@@ -0,0 +1,52 @@
+"""
+Token-owned Redis locks for single-runner drains.
+
+    token = acquire("webhooks:razorpay:drain", ttl=300)
+    if token is None:
+        return  # another drain is running
+    try:
+        ...
+    finally:
+        release("webhooks:razorpay:drain", token)
+
+The lock holds a random token; release() deletes it only while it still holds
+that token (the compare-and-delete of idempotency.RELEASE_LUA), so a drain that
+outlived its TTL cannot free the lock the next drain has taken since.
+"""
+import uuid
+import logging
+
+from apps.utils.pools import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: lock
+# ARGV: owner token
+RELEASE_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_scripts = {}
+
+
+def acquire(key, ttl, client=None):
+    """The owner token if the lock was free, else None."""
+    token = uuid.uuid4().hex
+    if (client or get_redis_client()).set(key, token, nx=True, ex=ttl):
+        return token
+    return None
+
+
+def release(key, token, client=None):
+    """False when the lock had already expired (and may belong to another run)."""
+    client = client or get_redis_client()
+    script = _scripts.get("release")
+    if script is None:
+        script = _scripts["release"] = client.register_script(RELEASE_LUA)
+    released = bool(script(keys=[key], args=[token], client=client))
+    if not released:
+        logger.warning(f"Lock {key} expired before release")
+    return released
@@ -1,64 +1,193 @@
-import logging
-import json
+"""
+Structured JSON logging with PII masking, written off the request thread.
+
+Masking happens while the record dict is built, not on the serialized line:
+- values under a sensitive key (any depth, any case) are replaced outright,
+  containers included; phone keys keep their first digits;
+- one precompiled pattern runs over string values only (the message, string
+  fields of metadata / extra, tracebacks) for `otp=...` / `phone=...` pairs
+  and numbers written with a country code. Bare digit runs (order ids,
+  amounts, timestamps) are left alone.
+
+NonBlockingQueueHandler only enqueues; formatting and the write happen on a
+QueueListener thread, so a slow stdout/pipe never stalls a request.
+"""
+import os
 import re
+import sys
+import copy
+import queue
+import atexit
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+
+MASK = "***MASKED***"
+MAX_DEPTH = 10
+
+SENSITIVE_KEYS = frozenset({
+    'password', 'token', 'access', 'access_token', 'refresh', 'refresh_token', 'credit_card',
+    'secret', 'key', 'api_key', 'otp', 'authorization', 'signature', 'razorpay_signature',
+})
+PHONE_KEYS = frozenset({'phone', 'phone_number', 'mobile'})
+
+# key=value / key: value pairs, phone=... pairs and country-code numbers (+91XXXXXXXXXX,
+# or "+44 7911..." where a separator marks where the country code ends) in free text
+STRING_PII = re.compile(
+    r'(?P<pair>\b(?:password|token|access_token|refresh_token|secret|otp)\b["\']?\s*[:=]\s*["\']?)[^\s"\',|&]+'
+    r'|(?P<phone_pair>\b(?:phone|phone_number|mobile)\b["\']?\s*[:=]\s*["\']?\+?\d{2,4})\d{6,}'
+    r'|(?<![\w.+])(?P<phone>\+91|\+\d{1,3}(?=[\s-]))[\s-]?\d{8,12}(?![\w.])',
+    re.IGNORECASE,
+)
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {
+    'message', 'asctime', 'metadata', 'correlation_id', 'taskName',
+}
+
+
+def _mask_match(match):
+    if match.group('pair'):
+        return match.group('pair') + MASK
+    return (match.group('phone_pair') or match.group('phone')) + '******'
+
+
+def mask_string(value):
+    return STRING_PII.sub(_mask_match, value)
+
+
+def mask_phone(value):
+    digits = str(value)
+    return digits[:4] + '******' if len(digits) > 4 else MASK
+
+
+def scrub(data, depth=0):
+    """Masked copy of dicts/lists; depth-limited so a self-referencing payload cannot blow the stack."""
+    if depth > MAX_DEPTH:
+        return "[MAX_DEPTH_EXCEEDED]"
+
+    if isinstance(data, str):
+        return mask_string(data)
+    if isinstance(data, dict):
+        scrubbed = {}
+        for k, v in data.items():
+            name = k.lower() if isinstance(k, str) else k
+            if name in SENSITIVE_KEYS and v is not None:
+                scrubbed[k] = MASK
+            elif name in PHONE_KEYS and isinstance(v, (str, int)):
+                scrubbed[k] = mask_phone(v)
+            else:
+                scrubbed[k] = scrub(v, depth + 1)
+        return scrubbed
+    if isinstance(data, (list, tuple)):
+        return [scrub(item, depth + 1) for item in data]
+    return data
+
 
 class GDPRJsonFormatter(logging.Formatter):
     """
     Structured JSON logging with PII masking.
     Safe for production log aggregation systems.
     """
-    
-    SENSITIVE_PATTERNS = {
-        r'"password":\s*".*?"': '"password": "***MASKED***"',
-        r'"token":\s*".*?"': '"token": "***MASKED***"',
-        r'"access_token":\s*".*?"': '"access_token": "***MASKED***"',
-        r'"refresh_token":\s*".*?"': '"refresh_token": "***MASKED***"',
-        r'"credit_card":\s*".*?"': '"credit_card": "***MASKED***"',
-        r'"phone":\s*"\+?(\d{2,4})\d{6,}"': r'"phone": "\1******"',
-    }
-
-    SENSITIVE_KEYS = {'password', 'token', 'access', 'refresh', 'credit_card', 'secret', 'key', 'otp'}
 
     def format(self, record):
         log_record = {
-            "timestamp": self.formatTime(record, self.datefmt),
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc),
             "level": record.levelname,
             "logger": record.name,
-            "message": record.getMessage(),
+            "message": mask_string(record.getMessage()),
             "path": record.pathname,
             "line_no": record.lineno,
-            "correlation_id": getattr(record, "correlation_id", "N/A"),
+            "correlation_id": getattr(record, "correlation_id", None) or "N/A",
         }
 
-        if hasattr(record, "metadata") and isinstance(record.metadata, dict):
-            log_record["metadata"] = self._recursive_scrub(record.metadata)
+        metadata = getattr(record, "metadata", None)
+        if metadata:
+            log_record["metadata"] = scrub(metadata)
+
+        extra = {k: v for k, v in record.__dict__.items() if k not in RECORD_ATTRS}
+        if extra:
+            log_record["extra"] = scrub(extra)
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_record["exception"] = mask_string(record.exc_text)
+
+        return orjson.dumps(log_record, default=str, option=orjson.OPT_UTC_Z).decode()
+
 
+def _correlation_id():
+    # Never imports: logging is configured before Django, and the middleware module
+    # is loaded by the web stack / config.celery anyway
+    middleware = sys.modules.get("apps.core.middleware")
+    return middleware.get_correlation_id() if middleware is not None else None
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Request threads only enqueue the record; a QueueListener thread formats it
+    with GDPRJsonFormatter and writes it to `stream`. A full queue drops records
+    (reported once the queue drains) instead of blocking the caller.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.target.setFormatter(GDPRJsonFormatter())
+        super().__init__(queue.Queue(queue_size))
+        self.listener = None
+        self._start()
+        atexit.register(self._stop)
+        # The listener thread does not survive fork (Celery prefork, gunicorn --preload)
+        os.register_at_fork(after_in_child=self._restart_after_fork)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _stop(self):
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()  # drains what is queued
+        self.target.flush()
+
+    def _restart_after_fork(self):
+        self.queue = queue.Queue(self.queue_size)
+        self.dropped = 0
+        self._start()
+
+    def prepare(self, record):
+        """Resolves everything that depends on the emitting thread before the record crosses over."""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = _correlation_id()
+        return record
+
+    def enqueue(self, record):
         try:
-            json_output = json.dumps(log_record)
-        except (TypeError, ValueError):
-            log_record["metadata"] = str(getattr(record, "metadata", ""))
-            json_output = json.dumps(log_record)
-
-        for pattern, replacement in self.SENSITIVE_PATTERNS.items():
-            json_output = re.sub(pattern, replacement, json_output)
-
-        return json_output
-
-    def _recursive_scrub(self, data, depth=0):
-        """
-        Recursively traverse dicts/lists to mask sensitive keys.
-        SECURITY FIX: Added depth limit to prevent Stack Overflow attacks.
-        """
-        if depth > 10:
-            return "[MAX_DEPTH_EXCEEDED]"
-
-        if isinstance(data, dict):
-            return {
-                k: ("***MASKED***" if str(k).lower() in self.SENSITIVE_KEYS and isinstance(v, (str, int))
-                    else self._recursive_scrub(v, depth + 1))
-                for k, v in data.items()
-            }
-        elif isinstance(data, list):
-            return [self._recursive_scrub(i, depth + 1) for i in data]
-        
-        return data
\ No newline at end of file
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": f"Log queue full: dropped {dropped} records",
+                }))
+            except queue.Full:
+                self.dropped += dropped
+
+    def close(self):
+        self._stop()
+        super().close()
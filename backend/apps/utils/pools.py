@@ -0,0 +1,161 @@
+"""
+Process-wide connection pools.
+
+Redis: one bounded BlockingConnectionPool per (url, decode_responses), shared by
+django-redis (cache), idempotency, DRF throttles, the inventory counters and
+WebSocket tickets. The asyncio twin serves the async views and consumers; its
+pools are kept per event loop, since an asyncio connection is bound to the loop
+that opened it (UvicornWorker / Channels run one loop, but async_to_sync and
+tests start others).
+
+Postgres: psycopg3 pools are configured in settings (OPTIONS["pool"]), sized by
+PROCESS_TYPE. This module only closes them before forks and reports on them.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.db import connections
+from django_redis.pool import ConnectionFactory
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_sync_pools = {}
+# event loop -> {(url, decode_responses): pool}; dropped with the loop
+_async_pools = weakref.WeakKeyDictionary()
+
+
+def _pool_kwargs(overrides):
+    kwargs = {
+        "max_connections": settings.REDIS_POOL_MAX_CONNECTIONS,
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        "socket_connect_timeout": 5,
+        "socket_timeout": 5,
+        "health_check_interval": 30,
+    }
+    kwargs.update(overrides)
+    return kwargs
+
+
+def get_redis_pool(url=None, decode_responses=True, **overrides):
+    """Shared sync pool; blocks up to REDIS_POOL_TIMEOUT when exhausted instead of opening more sockets."""
+    url = url or settings.REDIS_URL
+    key = (url, decode_responses)
+    pool = _sync_pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _sync_pools.get(key)
+            if pool is None:
+                pool = redis.BlockingConnectionPool.from_url(
+                    url, decode_responses=decode_responses, **_pool_kwargs(overrides)
+                )
+                _sync_pools[key] = pool
+    return pool
+
+
+def get_redis_client(decode_responses=True):
+    return redis.Redis(connection_pool=get_redis_pool(decode_responses=decode_responses))
+
+
+def get_async_redis_client(decode_responses=True):
+    """Client on the running loop's pool; call it from a coroutine, not at import time."""
+    loop = asyncio.get_running_loop()
+    key = (settings.REDIS_URL, decode_responses)
+    with _lock:
+        pools = _async_pools.setdefault(loop, {})
+        pool = pools.get(key)
+        if pool is None:
+            pool = redis.asyncio.BlockingConnectionPool.from_url(
+                key[0], decode_responses=decode_responses, **_pool_kwargs({})
+            )
+            pools[key] = pool
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+class SharedPoolConnectionFactory(ConnectionFactory):
+    """django-redis factory that hands out the registry pool instead of building its own."""
+
+    def get_connection_pool(self, params):
+        params = dict(params)
+        url = params.pop("url")
+        params.update(self.pool_cls_kwargs)
+        return get_redis_pool(url, decode_responses=False, **params)
+
+
+def _db_pools():
+    for conn in connections.all(initialized_only=True):
+        # Read the class-level registry directly: conn.pool would open a pool as a side effect.
+        pool = getattr(conn, "_connection_pools", {}).get(conn.alias)
+        if pool is not None:
+            yield conn, pool
+
+
+def close_db_pools():
+    """Called in the parent before forking (gunicorn pre_fork, celery worker_init)."""
+    for conn, _ in list(_db_pools()):
+        conn.close_pool()
+
+
+def _redis_pool_stats(pool):
+    if hasattr(pool, "_in_use_connections"):
+        in_use = len(pool._in_use_connections)
+        idle = len(pool._available_connections)
+    else:
+        # sync BlockingConnectionPool: created connections + a LIFO queue of idle ones (None = free slot)
+        idle = sum(1 for c in list(pool.pool.queue) if c is not None)
+        in_use = len(pool._connections) - idle
+    return {"max": pool.max_connections, "in_use": in_use, "idle": idle}
+
+
+def pool_stats():
+    """Snapshot of every pool this process has opened."""
+    stats = {"db": {}, "redis": {}}
+    for conn, pool in _db_pools():
+        try:
+            stats["db"][conn.alias] = pool.get_stats()
+        except Exception as e:
+            logger.error(f"DB pool stats failed for {conn.alias}: {e}")
+
+    for (_, decode), pool in list(_sync_pools.items()):
+        stats["redis"][f"sync:{'text' if decode else 'bytes'}"] = _redis_pool_stats(pool)
+    # Summed over event loops
+    for pools in list(_async_pools.values()):
+        for (_, decode), pool in list(pools.items()):
+            totals = stats["redis"].setdefault(f"async:{'text' if decode else 'bytes'}", {})
+            for state, value in _redis_pool_stats(pool).items():
+                totals[state] = totals.get(state, 0) + value
+    return stats
+
+
+class PoolMetricsCollector:
+    """Prometheus collector; values are read at scrape time."""
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        stats = pool_stats()
+
+        db = GaugeMetricFamily(
+            "quickdash_db_pool_connections", "psycopg pool connections by state",
+            labels=["alias", "state"],
+        )
+        for alias, s in stats["db"].items():
+            db.add_metric([alias, "max"], s.get("pool_max", 0))
+            db.add_metric([alias, "size"], s.get("pool_size", 0))
+            db.add_metric([alias, "idle"], s.get("pool_available", 0))
+            db.add_metric([alias, "waiting"], s.get("requests_waiting", 0))
+        yield db
+
+        cache_pools = GaugeMetricFamily(
+            "quickdash_redis_pool_connections", "Redis pool connections by state",
+            labels=["pool", "state"],
+        )
+        for name, s in stats["redis"].items():
+            for state, value in s.items():
+                cache_pools.add_metric([name, state], value)
+        yield cache_pools
@@ -1,54 +1,248 @@
+"""
+Circuit breakers for the external services (Razorpay, FCM, Twilio, S3).
+
+State is shared in Redis so every process trips together:
+
+- cb:{service}         hash: state ("closed" | "open"), opened_at (ms)
+- cb:{service}:probe   held by the one call allowed through while recovering
+- failures             RateLimiter sliding window over `window` seconds
+
+closed     calls go through. Failures (and calls slower than
+           slow_call_threshold) are counted; reaching failure_threshold opens.
+open       calls fail fast with CircuitBreakerOpenException for recovery_timeout.
+half_open  recovery_timeout has passed: one process wins the probe key and
+           makes a single trial call. Success closes the circuit, failure
+           reopens it; everyone else keeps failing fast meanwhile.
+
+Each process caches the state for CIRCUIT_BREAKER_REFRESH_INTERVAL seconds,
+so a closed circuit costs no Redis call on success. If Redis is unavailable
+the breaker lets calls through.
+"""
+import time
 import logging
 from functools import wraps
-from django.core.cache import cache
+
+from django.conf import settings
+from prometheus_client import Counter, Gauge, Histogram
+
+from apps.utils.pools import get_redis_client
+from apps.utils.throttling import RateLimiter
 
 logger = logging.getLogger(__name__)
 
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CALLS = Counter(
+    "quickdash_circuit_breaker_calls", "Guarded calls by outcome (success, failure, slow, rejected)",
+    ["service", "outcome"],
+)
+CALL_SECONDS = Histogram(
+    "quickdash_circuit_breaker_call_seconds", "Latency of guarded calls that went through",
+    ["service"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+STATE = Gauge(
+    "quickdash_circuit_breaker_state", "Circuit state as seen by this process (0 closed, 1 half-open, 2 open)",
+    ["service"],
+)
+TRANSITIONS = Counter(
+    "quickdash_circuit_breaker_transitions", "State changes made by this process", ["service", "to"],
+)
+
+
 class CircuitBreakerOpenException(Exception):
     pass
 
+
 class CircuitBreaker:
     """
     Prevents cascading failures by stopping requests to a failing service.
+    Use one module-level instance per service (see below), either as a
+    decorator or through call(func, *args, **kwargs).
+
+    counts_as_failure(exc) decides which exceptions indicate an unhealthy
+    service; others (a rejected card, a 404) pass through without counting.
     """
-    def __init__(self, service_name, failure_threshold=5, recovery_timeout=60):
+    def __init__(self, service_name, failure_threshold=5, recovery_timeout=30, window=60,
+                 slow_call_threshold=None, probe_timeout=None, counts_as_failure=None):
         self.service_name = service_name
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
-        self.key_failures = f"cb:fails:{service_name}"
-        self.key_open = f"cb:open:{service_name}"
+        self.window = window
+        self.slow_call_threshold = slow_call_threshold
+        self.probe_timeout = probe_timeout or max(recovery_timeout, 10)
+        self.counts_as_failure = counts_as_failure or (lambda exc: True)
+        self.key_state = f"cb:{{{service_name}}}"
+        self.key_probe = f"cb:{{{service_name}}}:probe"
+        self.key_failures = f"cb:{service_name}:fails"
+        # (state, opened_at ms, checked_at monotonic)
+        self._local = (CLOSED, 0, None)
 
     def __call__(self, func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            try:
-                if cache.get(self.key_open):
-                    logger.warning(f"Circuit OPEN: {self.service_name}. Fast failing.")
-                    raise CircuitBreakerOpenException(f"{self.service_name} is temporarily down")
-            except Exception as e:
-                if isinstance(e, CircuitBreakerOpenException):
-                    raise e
-                logger.error(f"CircuitBreaker Redis Check Failed: {e}")
-
-            try:
-                result = func(*args, **kwargs)
-                return result
-            except Exception as e:
-                self._safe_record_failure()
-                raise e
-
+            return self.call(func, *args, **kwargs)
         return wrapper
 
-    def _safe_record_failure(self):
+    def call(self, func, *args, **kwargs):
+        probe = self._admit()
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if self.counts_as_failure(e):
+                CALLS.labels(self.service_name, "failure").inc()
+                self._safe(self._on_failure, probe)
+            elif probe:
+                self._safe(self._close)
+            raise
+
+        elapsed = time.perf_counter() - started
+        CALL_SECONDS.labels(self.service_name).observe(elapsed)
+        if self.slow_call_threshold and elapsed > self.slow_call_threshold:
+            CALLS.labels(self.service_name, "slow").inc()
+            logger.warning(f"Slow call to {self.service_name}: {elapsed:.2f}s")
+            self._safe(self._on_failure, probe)
+        else:
+            CALLS.labels(self.service_name, "success").inc()
+            if probe:
+                self._safe(self._close)
+        return result
+
+    # --- admission ---
+
+    def _admit(self):
+        """False for a normal call, True for the half-open probe; raises while open."""
         try:
-            fails = cache.incr(self.key_failures)
-            
-            if fails == 1:
-                cache.expire(self.key_failures, self.recovery_timeout)
-
-            if fails >= self.failure_threshold:
-                logger.critical(f"Circuit TRIPPED for {self.service_name}!")
-                cache.set(self.key_open, "OPEN", timeout=self.recovery_timeout)
-                cache.delete(self.key_failures)
-        except Exception:
-            pass
\ No newline at end of file
+            state = self._state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and get_redis_client().set(self.key_probe, 1, nx=True, ex=self.probe_timeout):
+                logger.info(f"Circuit HALF-OPEN: {self.service_name}. Probing.")
+                return True
+        except Exception as e:
+            logger.error(f"CircuitBreaker state unavailable for {self.service_name}: {e}")
+            return False
+
+        CALLS.labels(self.service_name, "rejected").inc()
+        raise CircuitBreakerOpenException(f"{self.service_name} is temporarily down")
+
+    def _state(self):
+        state, opened_at, checked_at = self._local
+        now = time.monotonic()
+        if checked_at is None or now - checked_at >= settings.CIRCUIT_BREAKER_REFRESH_INTERVAL:
+            stored = get_redis_client().hmget(self.key_state, "state", "opened_at")
+            state, opened_at = stored[0] or CLOSED, int(stored[1] or 0)
+            self._remember(state, opened_at)
+
+        if state == OPEN and time.time() * 1000 >= opened_at + self.recovery_timeout * 1000:
+            return HALF_OPEN
+        return state
+
+    def _remember(self, state, opened_at):
+        self._local = (state, opened_at, time.monotonic())
+        STATE.labels(self.service_name).set(STATE_VALUES[state])
+
+    # --- transitions ---
+
+    def _on_failure(self, probe):
+        if probe:
+            logger.critical(f"Circuit probe FAILED for {self.service_name}, reopening.")
+            self._open()
+            return
+        allowed, _remaining, _retry_after = RateLimiter.sliding_window(
+            self.key_failures, self.failure_threshold - 1, self.window,
+        )
+        if not allowed and self._state() == CLOSED:
+            logger.critical(f"Circuit TRIPPED for {self.service_name}!")
+            self._open()
+
+    def _open(self):
+        opened_at = int(time.time() * 1000)
+        pipe = get_redis_client().pipeline()
+        pipe.hset(self.key_state, mapping={"state": OPEN, "opened_at": opened_at})
+        pipe.delete(self.key_probe)
+        pipe.execute()
+        RateLimiter.reset_window(self.key_failures, self.window)
+        self._remember(OPEN, opened_at)
+        TRANSITIONS.labels(self.service_name, OPEN).inc()
+
+    def _close(self):
+        pipe = get_redis_client().pipeline()
+        pipe.hset(self.key_state, mapping={"state": CLOSED, "opened_at": 0})
+        pipe.delete(self.key_probe)
+        pipe.execute()
+        RateLimiter.reset_window(self.key_failures, self.window)
+        self._remember(CLOSED, 0)
+        TRANSITIONS.labels(self.service_name, CLOSED).inc()
+        logger.info(f"Circuit CLOSED: {self.service_name} recovered.")
+
+    def _safe(self, method, *args):
+        try:
+            return method(*args)
+        except Exception as e:
+            logger.error(f"CircuitBreaker update failed for {self.service_name}: {e}")
+            return None
+
+
+def _server_side(exc):
+    """HTTP-ish SDK errors only count when the provider is at fault (5xx / 429) or unreachable."""
+    status = getattr(exc, "status", None)
+    response = getattr(exc, "response", None)
+    if status is None and isinstance(response, dict):  # botocore ClientError
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return not isinstance(status, int) or status == 429 or status >= 500
+
+
+def _razorpay_server_side(exc):
+    """Razorpay reports 4xx (bad request, unknown id) and bad signatures as their own error types."""
+    try:
+        # Imported lazily like the SDK itself (apps.utils.clients)
+        from razorpay.errors import BadRequestError, SignatureVerificationError
+    except ImportError:
+        return _server_side(exc)
+    return not isinstance(exc, (BadRequestError, SignatureVerificationError)) and _server_side(exc)
+
+
+def _fcm_server_side(exc):
+    """
+    Only an FCM outage counts: its unavailable / internal / deadline / unknown
+    errors and 429s, plus transport errors raised outside the SDK. Bad tokens,
+    topics or sender ids are per-message and pass through.
+    """
+    try:
+        # Imported lazily like the SDK itself (apps.utils.clients)
+        from firebase_admin import exceptions as firebase
+    except ImportError:
+        return _server_side(exc)
+
+    if not isinstance(exc, firebase.FirebaseError):
+        try:
+            from google.auth.exceptions import TransportError
+        except ImportError:
+            TransportError = OSError
+        return isinstance(exc, (OSError, TransportError))  # requests' errors are OSErrors
+    if isinstance(exc, (
+        firebase.UnavailableError, firebase.InternalError, firebase.DeadlineExceededError,
+        firebase.UnknownError, firebase.ResourceExhaustedError,
+    )):
+        return True
+    return getattr(exc.http_response, "status_code", None) == 429
+
+
+razorpay_breaker = CircuitBreaker(
+    "razorpay", failure_threshold=5, recovery_timeout=30, slow_call_threshold=8,
+    counts_as_failure=_razorpay_server_side,
+)
+fcm_breaker = CircuitBreaker(
+    "fcm", failure_threshold=5, recovery_timeout=30, slow_call_threshold=10, counts_as_failure=_fcm_server_side,
+)
+twilio_breaker = CircuitBreaker(
+    "twilio", failure_threshold=5, recovery_timeout=60, slow_call_threshold=8, counts_as_failure=_server_side,
+)
+s3_breaker = CircuitBreaker(
+    "s3", failure_threshold=5, recovery_timeout=30, slow_call_threshold=5, counts_as_failure=_server_side,
+)
@@ -0,0 +1,169 @@
+import importlib.util
+import uuid
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from apps.orders.models import Order
+from . import db_router, locks
+from .db_router import (
+    DEFAULT, REPLICA, DatabaseRoutingMiddleware, PrimaryReplicaRouter, _routing_state, replica_configured,
+)
+from .logging import MASK, mask_string, scrub
+from .pools import get_redis_client
+from .resilience import _fcm_server_side
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@skipUnless(replica_configured(), "needs REPLICA_DATABASE_URL (a second local Postgres)")
+@override_settings(CACHES=LOCMEM, REPLICA_LAG_CHECK_INTERVAL=0, REPLICA_MAX_LAG_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    # Not TestCase: its wrapping transaction keeps every read on the primary
+    databases = {DEFAULT, REPLICA}
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.user = get_user_model().objects.create_user(phone=f"9{uuid.uuid4().int % 10**9:09d}")
+        self.lag = 0.0
+        for patcher in (
+            mock.patch.dict(db_router._lag, {"seconds": 0.0, "checked_at": None}),
+            mock.patch.object(db_router, "_measure_lag", side_effect=lambda: self.lag),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _enter_request(self, user=None, replica=True):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        state = DatabaseRoutingMiddleware._new_state(request)
+        state["replica"] = replica
+        token = _routing_state.set(state)
+        self.addCleanup(_routing_state.reset, token)
+        return request
+
+    def test_reads_outside_a_request_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+    def test_opted_in_reads_use_replica(self):
+        self._enter_request()
+        self.assertEqual(self.router.db_for_read(Order), REPLICA)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_reads_without_opt_in_use_primary(self):
+        self._enter_request(replica=False)
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+    def test_write_sends_rest_of_request_to_primary(self):
+        self._enter_request()
+        self.router.db_for_write(Order)
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+    def test_auth_lookups_use_primary(self):
+        self._enter_request()
+        self.assertEqual(self.router.db_for_read(get_user_model()), DEFAULT)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        self._enter_request()
+        self.lag = 30.0
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        self._enter_request()
+        self.lag = float("inf")
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+    def test_writer_is_pinned_on_next_request(self):
+        def view(request):
+            get_user_model().objects.filter(pk=self.user.pk).update(first_name="Pinned")
+            return HttpResponse()
+
+        request = RequestFactory().post("/")
+        request.user = self.user
+        DatabaseRoutingMiddleware(view)(request)
+
+        self._enter_request(user=self.user)
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+    def test_pin_checked_once_user_is_authenticated(self):
+        db_router.cache.set(db_router._pin_key(self.user.id), 1)
+        request = self._enter_request()
+
+        # e.g. a read before DRF's JWT auth has set request.user
+        self.assertEqual(self.router.db_for_read(Order), REPLICA)
+        request.user = self.user
+        self.assertEqual(self.router.db_for_read(Order), DEFAULT)
+
+
+class PiiMaskingTests(SimpleTestCase):
+    def test_plain_numbers_are_not_phones(self):
+        for text in ("status code: 500", "order 123456789012 paid", "amount 1500000.50", "took 12345678 ns"):
+            self.assertEqual(mask_string(text), text)
+
+    def test_country_code_numbers_are_masked(self):
+        self.assertEqual(mask_string("call +919876543210 now"), "call +91****** now")
+        self.assertEqual(mask_string("to +44 7911123456"), "to +44******")
+
+    def test_phone_pairs_are_masked(self):
+        self.assertEqual(mask_string("phone=9876543210"), "phone=9876******")
+
+    def test_secret_pairs_are_masked(self):
+        self.assertEqual(mask_string("otp: 1234 token=abc.def"), f"otp: {MASK} token={MASK}")
+
+    def test_containers_under_sensitive_keys_are_masked(self):
+        scrubbed = scrub({"Authorization": ["Bearer x"], "api_key": {"live": "k"}, "phone": "9876543210"})
+        self.assertEqual(scrubbed, {"Authorization": MASK, "api_key": MASK, "phone": "9876******"})
+
+
+@skipUnless(importlib.util.find_spec("firebase_admin"), "needs firebase_admin")
+class FcmBreakerTests(SimpleTestCase):
+    def test_outages_count(self):
+        from firebase_admin import exceptions, messaging
+
+        for exc in (
+            exceptions.UnavailableError("down"), exceptions.InternalError("boom"),
+            exceptions.DeadlineExceededError("slow"), messaging.QuotaExceededError("429"),
+            ConnectionError("reset"),
+        ):
+            self.assertTrue(_fcm_server_side(exc), exc)
+
+    def test_client_errors_do_not_count(self):
+        from firebase_admin import exceptions, messaging
+
+        for exc in (
+            exceptions.InvalidArgumentError("bad topic"), messaging.UnregisteredError("stale token"),
+            messaging.SenderIdMismatchError("wrong sender"), ValueError("bad message"),
+        ):
+            self.assertFalse(_fcm_server_side(exc), exc)
+
+
+def _redis_available():
+    try:
+        return get_redis_client().ping()
+    except Exception:
+        return False
+
+
+@skipUnless(_redis_available(), "needs Redis at REDIS_URL")
+class LockTests(SimpleTestCase):
+    def setUp(self):
+        self.key = f"test:lock:{uuid.uuid4().hex[:8]}"
+        self.addCleanup(get_redis_client().delete, self.key)
+
+    def test_held_lock_is_not_acquired_twice(self):
+        token = locks.acquire(self.key, ttl=60)
+        self.assertIsNotNone(token)
+        self.assertIsNone(locks.acquire(self.key, ttl=60))
+        self.assertTrue(locks.release(self.key, token))
+        self.assertIsNotNone(locks.acquire(self.key, ttl=60))
+
+    def test_expired_run_does_not_release_the_next_runs_lock(self):
+        stale = locks.acquire(self.key, ttl=60)
+        get_redis_client().delete(self.key)  # TTL ran out mid-drain
+        current = locks.acquire(self.key, ttl=60)
+
+        self.assertFalse(locks.release(self.key, stale))
+        self.assertEqual(get_redis_client().get(self.key), current)
@@ -1,13 +1,177 @@
+"""
+Rate limiting in Redis: one script call per check.
+
+RateLimiter.sliding_window(key, limit, period)
+    Sliding-window counter: the current and previous fixed windows, the
+    previous one weighted by how much of it still overlaps the last `period`.
+    Two integer keys per client, however high the limit.
+RateLimiter.token_bucket(key, capacity, refill_per_second)
+    Bursts up to `capacity`, then a steady `refill_per_second`. One hash per client.
+
+Both return (allowed, remaining, retry_after_seconds) and only count a hit
+that is allowed. The DRF throttles below replace rest_framework.throttling's
+(which read and rewrite a timestamp list in the cache on every request) and
+fail open if Redis is unavailable.
+"""
+import math
+import time
+import logging
+
+from rest_framework import throttling
+from rest_framework.exceptions import Throttled
+
+from apps.utils.pools import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: current window, previous window
+# ARGV: limit, window_ms, elapsed_ms (into the current window), cost
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local current = tonumber(redis.call("get", KEYS[1]) or "0")
+local previous = tonumber(redis.call("get", KEYS[2]) or "0")
+local overlap = previous * (window - elapsed) / window
+local used = overlap + current
+
+if used + cost > limit then
+    local excess = used + cost - limit
+    local wait = window - elapsed
+    if previous > 0 and excess <= overlap then
+        wait = math.ceil(excess * window / previous)
+    end
+    return {0, math.max(0, math.floor(limit - used)), wait}
+end
+
+redis.call("incrby", KEYS[1], cost)
+redis.call("pexpire", KEYS[1], window * 2)
+return {1, math.floor(limit - used - cost), 0}
+"""
+
+# KEYS: bucket
+# ARGV: capacity, refill per ms, now_ms, cost
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local state = redis.call("hmget", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+-- Hosts' clocks differ slightly: never refill backwards
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed, wait = 0, 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = math.ceil((cost - tokens) / rate)
+end
+
+redis.call("hset", KEYS[1], "tokens", tostring(tokens), "ts", math.max(now, ts))
+redis.call("pexpire", KEYS[1], math.ceil(capacity / rate) + 1000)
+return {allowed, math.floor(tokens), wait}
+"""
+
+_scripts = {}
+
+
+def _script(name, source):
+    script = _scripts.get(name)
+    if script is None:
+        script = _scripts[name] = get_redis_client().register_script(source)
+    return script
+
+
+def _decision(response):
+    allowed, remaining, wait_ms = response
+    return bool(allowed), int(remaining), int(wait_ms) / 1000
+
+
+class RateLimiter:
+
+    @staticmethod
+    def sliding_window(key, limit, period, cost=1):
+        """At most `limit` hits in any `period` seconds (approximated from two fixed windows)."""
+        window_ms = int(period * 1000)
+        now_ms = int(time.time() * 1000)
+        index, elapsed = divmod(now_ms, window_ms)
+        # `{key}` hash tag: both windows on one cluster slot
+        keys = [f"rl:{{{key}}}:{index}", f"rl:{{{key}}}:{index - 1}"]
+        return _decision(_script("sliding_window", SLIDING_WINDOW_LUA)(keys=keys, args=[limit, window_ms, elapsed, cost]))
+
+    @staticmethod
+    def reset_window(key, period):
+        window_ms = int(period * 1000)
+        index = int(time.time() * 1000) // window_ms
+        get_redis_client().delete(f"rl:{{{key}}}:{index}", f"rl:{{{key}}}:{index - 1}")
+
+    @staticmethod
+    def token_bucket(key, capacity, refill_per_second, cost=1):
+        args = [capacity, refill_per_second / 1000, int(time.time() * 1000), cost]
+        return _decision(_script("token_bucket", TOKEN_BUCKET_LUA)(keys=[f"tb:{{{key}}}"], args=args))
+
 
 def check_throttle(user_key, limit=5, period=60):
+    """Raises Throttled once `user_key` has made `limit` calls in the last `period` seconds."""
+    allowed, _remaining, retry_after = RateLimiter.sliding_window(f"throttle:{user_key}", limit, period)
+    if not allowed:
+        raise Throttled(wait=math.ceil(retry_after))
+
+
+class RedisRateThrottle(throttling.SimpleRateThrottle):
     """
-    Token Bucket Algorithm via Redis
+    SimpleRateThrottle with RateLimiter in place of the cache history. Listed
+    after a DRF throttle class, it keeps that class's scope, rate and cache key
+    (who is throttled) and, for ScopedRateThrottle, its per-view rate lookup.
     """
-    key = f"throttle:{user_key}"
-    current_count = cache.incr(key)
-    
-    if current_count == 1:
-        cache.expire(key, period)
-        
-    if current_count > limit:
-        raise ThrottlingException(f"Rate limit exceeded. Try again in {period}s.")
\ No newline at end of file
+    algorithm = "sliding_window"
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        try:
+            if self.algorithm == "token_bucket":
+                allowed, _remaining, self.retry_after = RateLimiter.token_bucket(
+                    key, self.num_requests, self.num_requests / self.duration,
+                )
+            else:
+                allowed, _remaining, self.retry_after = RateLimiter.sliding_window(key, self.num_requests, self.duration)
+        except Exception as e:
+            logger.error(f"Rate limiter unavailable for {self.scope}, allowing request: {e}")
+            return True
+        return allowed
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, RedisRateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, RedisRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, RedisRateThrottle):
+    pass
+
+
+class LocationPingThrottle(UserRateThrottle):
+    """GPS pings arrive in bursts after a dead zone; a bucket absorbs them and holds the steady rate."""
+    scope = "location_ping"
+    algorithm = "token_bucket"
+
+
+class AIAssistantThrottle(UserRateThrottle):
+    scope = "ai_assistant"
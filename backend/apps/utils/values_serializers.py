@@ -0,0 +1,118 @@
+"""
+Read-only fast path for list responses.
+
+A ValuesSerializer is compiled once per class from an existing ModelSerializer:
+every readable field becomes a (name, getter) pair that reads a queryset.values()
+row, so list endpoints skip model instantiation and DRF's per-object field
+binding / attribute walking. Conversions that change the JSON (DecimalField
+quantize-to-string, DateTimeField timezone + ISO format, ChoiceField) reuse the
+DRF field's own to_representation, which keeps the payload identical to the
+serializer it mirrors.
+
+- dotted sources map to values() lookups ("sku.sku" -> "sku__sku")
+- SerializerMethodFields and nested serializers need a `get_<name>(self, row)`
+- a source that is neither a model field nor a queryset annotation (e.g. an
+  optional annotation like effective_price) renders as None
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
+from rest_framework import serializers, relations
+
+# Fields whose to_representation is a no-op for values coming straight from the DB.
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.SlugField, serializers.URLField, serializers.EmailField,
+    serializers.IntegerField, serializers.BooleanField, serializers.ReadOnlyField,
+    relations.PrimaryKeyRelatedField,
+)
+
+_compile_lock = threading.Lock()
+
+
+def _passthrough(key):
+    def get(serializer, row):
+        return row.get(key)
+    return get
+
+
+def _converted(key, convert):
+    def get(serializer, row):
+        value = row.get(key)
+        return None if value is None else convert(value)
+    return get
+
+
+class ValuesSerializer:
+    serializer_class = None
+    # values() keys the get_<name> overrides read on top of the compiled sources
+    extra_values = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    @classmethod
+    def compile(cls):
+        """[(name, getter)] plus the values() keys they read, built on first use (needs the app registry)."""
+        plan = cls.__dict__.get('_plan')
+        if plan is not None:
+            return plan
+
+        with _compile_lock:
+            plan = cls.__dict__.get('_plan')
+            if plan is None:
+                plan = cls._build_plan()
+                cls._plan = plan
+        return plan
+
+    @classmethod
+    def _build_plan(cls):
+        getters, keys = [], list(cls.extra_values)
+
+        for name, field in cls.serializer_class().fields.items():
+            if field.write_only:
+                continue
+
+            method = getattr(cls, f'get_{name}', None)
+            if method is not None:
+                getters.append((name, method))
+                continue
+
+            if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(f"{cls.__name__} needs get_{name}(self, row) for '{name}'")
+
+            key = field.source.replace('.', '__')
+            keys.append(key)
+            if type(field) in PASSTHROUGH_FIELDS:
+                getters.append((name, _passthrough(key)))
+            else:
+                getters.append((name, _converted(key, field.to_representation)))
+
+        return {'getters': tuple(getters), 'keys': tuple(dict.fromkeys(keys))}
+
+    @classmethod
+    def value_keys(cls, queryset):
+        """Compiled keys that this queryset can actually select."""
+        model = queryset.model
+        annotations = queryset.query.annotations
+        selectable = []
+        for key in cls.compile()['keys']:
+            head = key.split('__', 1)[0]
+            if head in annotations:
+                selectable.append(key)
+                continue
+            try:
+                model._meta.get_field(head)
+            except FieldDoesNotExist:
+                continue
+            selectable.append(key)
+        return selectable
+
+    def values(self, queryset):
+        return queryset.values(*self.value_keys(queryset))
+
+    def to_representation(self, row):
+        return {name: get(self, row) for name, get in self.compile()['getters']}
+
+    def serialize(self, rows):
+        getters = self.compile()['getters']
+        return [{name: get(self, row) for name, get in getters} for row in rows]
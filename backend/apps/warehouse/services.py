@@ -135,7 +135,7 @@ class WarehouseOperationsService:
             inventory_item=inventory_item, transaction_type="add",
             quantity=quantity, reference=f"inward_putaway_by_{user.id}"
         )
-        transaction.on_commit(lambda: InventoryService._sync_redis_stock(inventory_item.id))
+        InventoryService._emit_stock_events({inventory_item.id: int(quantity)})
         return {"status": "success", "new_total": inventory_item.total_stock}
 
     @staticmethod
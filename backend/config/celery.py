@@ -2,9 +2,9 @@ import os
 import logging
 from celery import Celery
 from celery.schedules import crontab
-from celery.signals import before_task_publish, task_prerun, task_failure, worker_ready
-from kombu import Queue
+from celery.signals import before_task_publish, task_prerun, task_failure, worker_ready, worker_init
 from apps.core.middleware import get_correlation_id, _correlation_id
+from config.celery_topology import apply_worker_pool, task_queues, task_routes
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -13,22 +13,8 @@ app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 
-app.conf.task_routes = {
-    'apps.delivery.tasks.retry_auto_assign_rider': {'queue': 'high_priority'},
-    'apps.delivery.tasks.assign_rider_to_order': {'queue': 'high_priority'},
-    'apps.delivery.tasks.periodic_assign_unassigned_orders': {'queue': 'high_priority'},
-    
-    # Notifications tasks ko high priority me daalein taaki turant deliver ho
-    'apps.notifications.tasks.send_otp_sms': {'queue': 'high_priority'},
-    'apps.notifications.tasks.send_push_to_topic_task': {'queue': 'high_priority'},
-    'apps.notifications.tasks.send_push_to_user_task': {'queue': 'high_priority'},
-    
-    'apps.orders.tasks.send_order_confirmation_email': {'queue': 'high_priority'},
-    
-    'apps.core.tasks.*': {'queue': 'default'},
-    
-    'apps.assistant.views.*': {'queue': 'low_priority'},
-}
+app.conf.task_routes = task_routes()
+app.conf.task_queues = task_queues()
 
 app.conf.task_default_queue = 'default'
 app.conf.task_default_exchange = 'default'
@@ -54,6 +40,10 @@ app.conf.task_soft_time_limit = 3000
 
 app.conf.worker_max_tasks_per_child = 100
 
+# Per-queue concurrency / prefetch / recycling (see config/celery_topology.py)
+if os.getenv('CELERY_WORKER_POOL'):
+    apply_worker_pool(app.conf, os.getenv('CELERY_WORKER_POOL'))
+
 
 if app.conf.get('CELERY_RESULT_BACKEND'):
     app.conf.result_expires = 3600  
@@ -112,6 +102,12 @@ def handle_task_failure(sender=None, task_id=None, exception=None, args=None, kw
         }
     )
 
+@worker_init.connect
+def close_parent_db_pools(**kwargs):
+    """A psycopg pool opened in the parent must not be inherited by the prefork children."""
+    from apps.utils.pools import close_db_pools
+    close_db_pools()
+
 @worker_ready.connect
 def worker_ready_handler(sender=None, **kwargs):
     """Log when worker is ready to process tasks."""
@@ -122,43 +118,63 @@ app.conf.beat_schedule = {
     'reconcile-inventory-every-10-mins': {
         'task': 'apps.core.tasks.reconcile_inventory_redis_db',
         'schedule': crontab(minute='*/10'),
-        'options': {'queue': 'default', 'expires': 600},
+        'options': {'expires': 600},
     },
     'monitor-stuck-orders-every-5-mins': {
         'task': 'apps.core.tasks.monitor_stuck_orders',
         'schedule': crontab(minute='*/5'),
-        'options': {'queue': 'default', 'expires': 300},
+        'options': {'expires': 300},
+    },
+    'reconcile-stuck-payments-every-5-mins': {
+        'task': 'apps.payments.tasks.reconcile_stuck_payments',
+        'schedule': crontab(minute='*/5'),
+        'options': {'expires': 300},
     },
     'assign-unassigned-orders-every-5-mins': {
         'task': 'apps.delivery.tasks.periodic_assign_unassigned_orders',
         'schedule': crontab(minute='*/5'),
-        'options': {'queue': 'high_priority', 'expires': 300},
+        'options': {'expires': 300},
     },
     'process-rider-payouts-daily': {
         'task': 'apps.riders.tasks.process_daily_payouts',
         'schedule': crontab(hour=1, minute=0),
-        'options': {'queue': 'default', 'expires': 86400},
+        'options': {'expires': 86400},
+    },
+    'consume-stock-events-every-5-secs': {
+        'task': 'apps.inventory.tasks.consume_stock_events',
+        'schedule': 5.0,
+        'options': {'expires': 5},
+    },
+    'release-expired-reservations-every-min': {
+        'task': 'apps.orders.tasks.release_expired_reservations',
+        'schedule': crontab(minute='*'),
+        'options': {'expires': 60},
     },
     'health-check-heartbeat': {
         'task': 'apps.core.tasks.beat_heartbeat',
         'schedule': crontab(minute='*'),
-        'options': {'queue': 'default', 'expires': 60},
+        'options': {'expires': 60},
+    },
+    # Batch consumers drain on enqueue; these sweep whatever a lost drain left behind
+    'drain-push-batches-every-30-secs': {
+        'task': 'apps.notifications.tasks.send_push_batch',
+        'schedule': 30.0,
+        'options': {'expires': 30},
+    },
+    'drain-audit-batches-every-30-secs': {
+        'task': 'apps.audit.tasks.write_audit_logs',
+        'schedule': 30.0,
+        'options': {'expires': 30},
+    },
+    # Sweeps webhook events whose kick was lost and retries failed ones
+    'drain-webhook-inbox-every-30-secs': {
+        'task': 'apps.payments.tasks.process_webhook_events',
+        'schedule': 30.0,
+        'options': {'expires': 30},
     },
 }
 
 
-app.conf.task_routes = {
-    'apps.delivery.tasks.retry_auto_assign_rider': {'queue': 'high_priority'},
-    'apps.delivery.tasks.assign_rider_to_order': {'queue': 'high_priority'},
-    'apps.delivery.tasks.periodic_assign_unassigned_orders': {'queue': 'high_priority'},
-    'apps.notifications.tasks.send_otp_sms': {'queue': 'high_priority'},
-    'apps.orders.tasks.send_order_confirmation_email': {'queue': 'high_priority'},
-    
-    'apps.core.tasks.*': {'queue': 'default'},
-    
-    'apps.assistant.views.*': {'queue': 'low_priority'},
-}
-
 
 logging.basicConfig(
     level=logging.INFO,
@@ -0,0 +1,144 @@
+"""
+Celery worker topology: which queue every task goes to, and how the worker
+pool serving each queue is tuned.
+
+Start one worker per pool:
+
+    CELERY_WORKER_POOL=notifications celery -A config.celery worker -l info
+
+A worker started without CELERY_WORKER_POOL consumes every queue with the
+default policy (local dev, docker-compose). --concurrency and other CLI flags
+still override the pool's values.
+
+Policies:
+- rider_assignment: latency critical, short tasks. prefetch 1 so one slow
+  assignment never holds back the next order.
+- notifications: I/O bound (FCM, Twilio, SMTP). Wide concurrency and a deeper
+  prefetch; push sends are batched through BatchTask.
+- payments: gateway calls that must not be lost. prefetch 1, acks late.
+- reconciliation: long DB scans, few at a time, recycled often.
+- reporting: payouts and reports; memory heavy, recycled after a few tasks.
+"""
+from kombu import Queue
+
+RIDER_ASSIGNMENT = "rider_assignment"
+NOTIFICATIONS = "notifications"
+PAYMENTS = "payments"
+RECONCILIATION = "reconciliation"
+REPORTING = "reporting"
+DEFAULT = "default"
+
+# Queue names used before this topology. The default pool keeps draining them so
+# messages published by a not-yet-redeployed web process are not stranded.
+LEGACY_QUEUES = ("high_priority", "low_priority")
+
+# max_memory_per_child is in KiB; time limits in seconds
+WORKER_POOLS = {
+    RIDER_ASSIGNMENT: {
+        "queues": (RIDER_ASSIGNMENT,),
+        "concurrency": 8,
+        "prefetch_multiplier": 1,
+        "max_tasks_per_child": 1000,
+        "max_memory_per_child": 256_000,
+        "soft_time_limit": 45,
+        "time_limit": 60,
+    },
+    NOTIFICATIONS: {
+        "queues": (NOTIFICATIONS,),
+        "concurrency": 16,
+        "prefetch_multiplier": 8,
+        "max_tasks_per_child": 5000,
+        "max_memory_per_child": 256_000,
+        "soft_time_limit": 60,
+        "time_limit": 90,
+    },
+    PAYMENTS: {
+        "queues": (PAYMENTS,),
+        "concurrency": 4,
+        "prefetch_multiplier": 1,
+        "max_tasks_per_child": 1000,
+        "max_memory_per_child": 256_000,
+        "soft_time_limit": 90,
+        "time_limit": 120,
+    },
+    RECONCILIATION: {
+        "queues": (RECONCILIATION,),
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "max_tasks_per_child": 50,
+        "max_memory_per_child": 512_000,
+        "soft_time_limit": 3000,
+        "time_limit": 3600,
+    },
+    REPORTING: {
+        "queues": (REPORTING,),
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "max_tasks_per_child": 20,
+        "max_memory_per_child": 768_000,
+        "soft_time_limit": 3000,
+        "time_limit": 3600,
+    },
+    DEFAULT: {
+        "queues": (DEFAULT,) + LEGACY_QUEUES,
+        "concurrency": 4,
+        "prefetch_multiplier": 1,
+        "max_tasks_per_child": 100,
+        "max_memory_per_child": 384_000,
+        "soft_time_limit": 3000,
+        "time_limit": 3600,
+    },
+}
+
+# Single source of truth for routing. Tasks must not pass queue= in their decorator:
+# Celery prefers the task's own option over task_routes.
+TASK_QUEUES = {
+    'apps.delivery.tasks.retry_auto_assign_rider': RIDER_ASSIGNMENT,
+    'apps.delivery.tasks.assign_rider_to_order': RIDER_ASSIGNMENT,
+    'apps.delivery.tasks.periodic_assign_unassigned_orders': RIDER_ASSIGNMENT,
+
+    'apps.notifications.tasks.*': NOTIFICATIONS,
+    'apps.orders.tasks.send_order_confirmation_email': NOTIFICATIONS,
+    'apps.inventory.tasks.notify_back_in_stock': NOTIFICATIONS,
+
+    'apps.payments.tasks.reconcile_stuck_payments': RECONCILIATION,
+    'apps.payments.tasks.*': PAYMENTS,
+
+    'apps.core.tasks.reconcile_inventory_redis_db': RECONCILIATION,
+    'apps.core.tasks.monitor_stuck_orders': RECONCILIATION,
+
+    'apps.riders.tasks.*': REPORTING,
+    'apps.assistant.views.*': REPORTING,
+
+    'apps.audit.tasks.*': DEFAULT,
+    'apps.core.tasks.*': DEFAULT,
+    'apps.inventory.tasks.*': DEFAULT,
+    'apps.orders.tasks.*': DEFAULT,
+}
+
+
+def task_routes():
+    # Exact names win over globs; globs are tried in the order listed
+    return {name: {'queue': queue} for name, queue in TASK_QUEUES.items()}
+
+
+def task_queues(pool_name=None):
+    """Queues to declare and consume: the named pool's, or all of them."""
+    pools = [WORKER_POOLS[pool_name]] if pool_name else WORKER_POOLS.values()
+    names = dict.fromkeys(queue for pool in pools for queue in pool["queues"])
+    return tuple(Queue(name, routing_key=name) for name in names)
+
+
+def apply_worker_pool(conf, pool_name):
+    """Applies one pool's policy to this process's Celery config (before the worker starts)."""
+    if pool_name not in WORKER_POOLS:
+        raise ValueError(f"Unknown CELERY_WORKER_POOL '{pool_name}'. Expected one of: {', '.join(WORKER_POOLS)}")
+
+    policy = WORKER_POOLS[pool_name]
+    conf.task_queues = task_queues(pool_name)
+    conf.worker_concurrency = policy["concurrency"]
+    conf.worker_prefetch_multiplier = policy["prefetch_multiplier"]
+    conf.worker_max_tasks_per_child = policy["max_tasks_per_child"]
+    conf.worker_max_memory_per_child = policy["max_memory_per_child"]
+    conf.task_soft_time_limit = policy["soft_time_limit"]
+    conf.task_time_limit = policy["time_limit"]
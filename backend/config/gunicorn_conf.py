@@ -53,6 +53,11 @@ def on_starting(server):
     print(f"[GUNICORN] Worker class: {worker_class}")
     print(f"[GUNICORN] Timeout: {timeout}s, Graceful timeout: {graceful_timeout}s")
 
+def pre_fork(server, worker):
+    """preload_app imports Django in the master; never hand its DB pool to a worker."""
+    from apps.utils.pools import close_db_pools
+    close_db_pools()
+
 def on_exit(server):
     """Called just before exiting Gunicorn."""
     print("[GUNICORN] Server shutting down")
@@ -1,14 +1,11 @@
 import os
 import sys
-import json
 import logging
 from pathlib import Path
 from datetime import timedelta
 
 import dj_database_url
 import sentry_sdk
-import firebase_admin
-from firebase_admin import credentials
 from sentry_sdk.integrations.django import DjangoIntegration
 from sentry_sdk.integrations.redis import RedisIntegration
 from sentry_sdk.integrations.celery import CeleryIntegration
@@ -126,6 +123,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "apps.core.middleware.CorrelationIDMiddleware",
+    "apps.utils.db_router.DatabaseRoutingMiddleware",
     "apps.core.middleware.GlobalKillSwitchMiddleware",
     "apps.core.middleware.LocationContextMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -159,6 +157,51 @@ if not DATABASES["default"]:
             "PORT": os.getenv("PGPORT", os.getenv("POSTGRES_PORT", "5432")),
         }
 
+# web (gunicorn/uvicorn worker) | channels | celery | beat. Sizes every pool below.
+PROCESS_TYPE = os.getenv("PROCESS_TYPE", "web")
+
+# psycopg3 pool per process: (min_size, max_size). Web workers share one pool
+# across the ASGI thread executors instead of one persistent connection per thread.
+DB_POOL_SIZES = {
+    "web": (2, 10),
+    "channels": (1, 4),
+    "celery": (1, 2),
+    "beat": (1, 1),
+}
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "true").lower() in ("true", "1", "yes")
+
+if DB_POOL_ENABLED and DATABASES["default"]:
+    pool_min, pool_max = DB_POOL_SIZES.get(PROCESS_TYPE, DB_POOL_SIZES["web"])
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # required by Django when pooling
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", pool_min)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", pool_max)),
+        "timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+        "max_idle": 300,
+        "name": f"quickdash-{PROCESS_TYPE}",
+    }
+
+# Optional read replica (see apps/utils/db_router.py). Point it at a second local
+# Postgres to exercise the split; run `migrate --database=replica` there first.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+if REPLICA_DATABASE_URL and DATABASES["default"]:
+    DATABASES["replica"] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=DATABASES["default"].get("CONN_MAX_AGE", 0),
+        conn_health_checks=True,
+        engine="django.contrib.gis.db.backends.postgis",
+    )
+    replica_options = dict(DATABASES["default"].get("OPTIONS", {}))
+    if "pool" in replica_options:
+        replica_options["pool"] = dict(replica_options["pool"], name=f"quickdash-{PROCESS_TYPE}-replica")
+    DATABASES["replica"]["OPTIONS"] = replica_options
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["apps.utils.db_router.PrimaryReplicaRouter"]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 2))
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
+
 if "default" in DATABASES and DATABASES["default"]:
     db_config = DATABASES["default"]
     logger.info(f"Database configured: {db_config.get('HOST')}:{db_config.get('PORT')}/{db_config.get('NAME')}")
@@ -189,6 +232,11 @@ if not REDIS_URL and not DEBUG:
     logger.critical("REDIS_URL environment variable is REQUIRED in production")
     sys.exit(1)
 
+# Per-process cap for each pool in apps.utils.pools (cache, inventory, tickets, throttles).
+REDIS_POOL_SIZES = {"web": 50, "channels": 50, "celery": 10, "beat": 5}
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", REDIS_POOL_SIZES.get(PROCESS_TYPE, 50)))
+REDIS_POOL_TIMEOUT = int(os.getenv("REDIS_POOL_TIMEOUT", 5))
+
 if REDIS_URL:
     logger.info(f"Redis configured")
     
@@ -205,6 +253,7 @@ if REDIS_URL:
             "LOCATION": REDIS_URL,
             "OPTIONS": {
                 "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_FACTORY": "apps.utils.pools.SharedPoolConnectionFactory",
                 "SOCKET_CONNECT_TIMEOUT": 5,
                 "SOCKET_TIMEOUT": 5,
                 "RETRY_ON_TIMEOUT": True,
@@ -216,7 +265,8 @@ if REDIS_URL:
         "default": {
             "BACKEND": "channels_redis.core.RedisChannelLayer",
             "CONFIG": {
-                "hosts": [REDIS_URL],
+                # channels_redis keeps its own asyncio pool per loop; bound it the same way.
+                "hosts": [{"address": REDIS_URL, "max_connections": REDIS_POOL_MAX_CONNECTIONS}],
                 "capacity": 1500,
                 "expiry": 10,
             },
@@ -234,6 +284,30 @@ else:
     CELERY_RESULT_BACKEND = None
     CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
 
+# Conditional GET for versioned resources (apps.utils.http_cache). The salt is folded into
+# every ETag so a deploy that changes payload shape or hardcoded values invalidates them.
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 60))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", 300))
+HTTP_CACHE_ETAG_SALT = os.getenv("RELEASE_VERSION", "")
+
+# How often each process checks catalog_version for a newer category tree (apps.catalog.services).
+CATEGORY_TREE_CHECK_INTERVAL = int(os.getenv("CATEGORY_TREE_CHECK_INTERVAL", 2))
+
+# Per-process copy of kill switch / maintenance flags, StoreSettings and OrderConfiguration
+# (apps.core.runtime_config). Writes are pushed over pub/sub; the TTL bounds a missed message.
+RUNTIME_CONFIG_TTL = int(os.getenv("RUNTIME_CONFIG_TTL", 10))
+
+# How long each process trusts its cached circuit breaker states (apps.utils.resilience).
+CIRCUIT_BREAKER_REFRESH_INTERVAL = float(os.getenv("CIRCUIT_BREAKER_REFRESH_INTERVAL", 1))
+
+# How long a duplicate idempotent request waits for the original's response before a 409 (apps.utils.idempotency).
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))
+
+# Revoked JWTs (apps.accounts.revocation): how often each process pulls new logouts, i.e. the
+# longest a logged-out token can still pass on another process, and how often the filter is rebuilt.
+REVOCATION_CHECK_INTERVAL = float(os.getenv("REVOCATION_CHECK_INTERVAL", 1))
+REVOCATION_REBUILD_INTERVAL = int(os.getenv("REVOCATION_REBUILD_INTERVAL", 3600))
+
 
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
@@ -256,6 +330,12 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 ]
 
 
+# JSON lines with PII masking, written by a background listener thread (apps/utils/logging.py).
+# Plain text on the request thread when off (local development).
+LOG_JSON = os.getenv("LOG_JSON", "false" if DEBUG else "true").lower() in ("true", "1", "yes")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_HANDLER = "queue" if LOG_JSON else "console"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -276,20 +356,34 @@ LOGGING = {
             "formatter": "simple",
         },
     },
+    "root": {
+        "handlers": [LOG_HANDLER],
+        "level": "INFO",
+    },
     "loggers": {
         "django": {
-            "handlers": ["console"],
+            "handlers": [LOG_HANDLER],
             "level": "INFO" if not DEBUG else "DEBUG",
             "propagate": False,
         },
         "celery": {
-            "handlers": ["console"],
+            "handlers": [LOG_HANDLER],
             "level": "INFO",
             "propagate": False,
         },
     },
 }
 
+if LOG_JSON:
+    LOGGING["handlers"]["queue"] = {
+        "level": "INFO",
+        "()": "apps.utils.logging.NonBlockingQueueHandler",
+        "stream": "ext://sys.stdout",
+        "queue_size": LOG_QUEUE_SIZE,
+    }
+    # Keep the Celery worker on this pipeline instead of its own root handler
+    CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+
 
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
@@ -309,19 +403,29 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.accounts.authentication.SecureJWTAuthentication",
     ),
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.ScopedRateThrottle",
+        "apps.utils.throttling.AnonRateThrottle",
+        "apps.utils.throttling.UserRateThrottle",
+        "apps.utils.throttling.ScopedRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "100/day",
         "user": "1000/day",
         "otp_send": "10/min",
         "registration": "10/min",
+        "location_ping": "30/min",
+        "ai_assistant": "20/min",
     },
+    "DEFAULT_RENDERER_CLASSES": [
+        "apps.utils.renderers.ORJSONRenderer",
+    ] + (["rest_framework.renderers.BrowsableAPIRenderer"] if DEBUG else []),
+    "DEFAULT_PARSER_CLASSES": [
+        "apps.utils.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_FILTER_BACKENDS": [
@@ -342,6 +446,13 @@ RIDER_FIXED_PAY_PER_ORDER = int(os.getenv("RIDER_FIXED_PAY_PER_ORDER", 50))
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "")
 RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+# Points the Razorpay client elsewhere (e.g. a local fake gateway); empty uses the SDK's default
+RAZORPAY_BASE_URL = os.getenv("RAZORPAY_BASE_URL", "")
+# Stuck payment reconciliation: parallel gateway lookups and the shared request rate (per second)
+PAYMENT_RECONCILE_CONCURRENCY = int(os.getenv("PAYMENT_RECONCILE_CONCURRENCY", 8))
+PAYMENT_RECONCILE_RATE = float(os.getenv("PAYMENT_RECONCILE_RATE", 10))
+
+RESERVATION_TTL_SECONDS = int(os.getenv("RESERVATION_TTL_SECONDS", 900))
 
 
 SMS_PROVIDER = os.getenv("SMS_PROVIDER", "dummy")
@@ -352,6 +463,8 @@ SMS_PROVIDER_URL = os.getenv("SMS_PROVIDER_URL", "")
 
 OTP_EXPIRY_SECONDS = int(os.getenv("OTP_EXPIRY_SECONDS", 300))
 OTP_RESEND_COOLDOWN = int(os.getenv("OTP_RESEND_COOLDOWN", 60))
+# OTP state lives in Redis; also write PhoneOTP / OTPAbuseLog rows for the admin
+OTP_DB_AUDIT = os.getenv("OTP_DB_AUDIT", "false").lower() in ("true", "1", "yes")
 
 
 if os.getenv("SENTRY_DSN"):
@@ -375,24 +488,6 @@ logger.info(f"Allowed Hosts: {ALLOWED_HOSTS}")
 logger.info(f"CSRF Trusted Origins: {CSRF_TRUSTED_ORIGINS}")
 logger.info(f"Database: {DATABASES.get('default', {}).get('HOST', 'unknown')}")
 
-
-if not firebase_admin._apps:
-    try:
-        firebase_json_str = os.getenv('FIREBASE_CREDENTIALS_JSON')
-        if firebase_json_str:
-            cred_dict = json.loads(firebase_json_str)
-            cred = credentials.Certificate(cred_dict)
-            logger.info("🔥 Firebase Admin Initialized using Environment Variable (.env).")
-        else:
-            FIREBASE_CREDENTIALS_PATH = os.path.join(BASE_DIR, 'serviceAccountKey.json')
-            cred = credentials.Certificate(FIREBASE_CREDENTIALS_PATH)
-            logger.info("🔥 Firebase Admin Initialized using local file.")
-            
-        firebase_admin.initialize_app(cred)
-    except Exception as e:
-        logger.error(f"❌ Firebase Admin Initialization failed: {e}")
-
-
 SIMPLE_JWT = {
     "SIGNING_KEY": os.getenv("JWT_SIGNING_KEY", SECRET_KEY),
     "ALGORITHM": "HS256",
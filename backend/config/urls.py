@@ -20,7 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
-from apps.core.views import health_check, AppConfigAPIView
+from apps.core.views import health_check
+from apps.core.async_views import AsyncAppConfigAPIView
 
 admin.site.site_header = "QuickDash Master Admin"
 admin.site.site_title = "QuickDash Portal"
@@ -35,7 +36,7 @@ urlpatterns = [
     
     path('admin/', admin.site.urls),
     
-    path('api/config/', AppConfigAPIView.as_view()),
+    path('api/config/', AsyncAppConfigAPIView.as_view()),
 
     path('api/v1/customers/', include('apps.customers.urls')),
     path('api/v1/auth/', include('apps.accounts.urls')),